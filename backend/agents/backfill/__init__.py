@@ -0,0 +1,3 @@
+from .service import BackfillService
+
+__all__ = ["BackfillService"]
@@ -0,0 +1,41 @@
+"""
+Corpus-wide backfill after a model change
+Run with: python -m agents.backfill.run --stage classification
+      or: python -m agents.backfill.run --stage index --rate 20 --workers 4
+
+Progress is checkpointed under BACKFILL_CHECKPOINT_PATH; rerunning the same command resumes.
+"""
+import argparse
+import json
+import logging
+from agents.backfill.service import BackfillService
+
+
+def main():
+    """
+    Backfill a stage, or show its checkpoint with --status
+    """
+    parser = argparse.ArgumentParser(description="Re-run classification or indexing for outdated documents")
+    parser.add_argument("--stage", required=True, choices=BackfillService.STAGES, help="Stage to bring up to the active model")
+    parser.add_argument("--batch-size", type=int, help="Documents per batch (default BACKFILL_BATCH_SIZE)")
+    parser.add_argument("--workers", type=int, help="Batches processed concurrently (default BACKFILL_WORKERS)")
+    parser.add_argument("--rate", type=float, help="Maximum documents per second, 0 for unlimited (default BACKFILL_RATE_LIMIT)")
+    parser.add_argument("--limit", type=int, help="Stop after this many documents")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and rescan from the first document")
+    parser.add_argument("--status", action="store_true", help="Print the checkpoint for the active version and exit")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(message)s")
+    
+    service = BackfillService(batch_size=args.batch_size, workers=args.workers, rate_limit=args.rate)
+    if args.status:
+        version = service.target_version(args.stage)
+        print(json.dumps(service.load_checkpoint(args.stage, version) or {"stage": args.stage, "version": version, "started": False}, indent=2))
+        return
+    
+    state = service.run(args.stage, limit=args.limit, restart=args.restart)
+    print(json.dumps(state, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Backfill Agent Service
+Re-runs classification or indexing over the existing corpus after a new model is activated
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import select, exists, func
+from database.connection import SessionLocal
+from database.models import Document, DocumentClassification, SearchIndex
+from common.registry import model_registry
+from config.settings import settings
+from agents.ocr.service import OCRService
+from agents.classifier.service import ClassifierService
+from agents.search.service import SearchService
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` units per second on average, in bursts of up to `capacity`
+    """
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, amount: float):
+        """
+        Take `amount` units, sleeping until the bucket has refilled enough. A rate of 0 disables limiting.
+        """
+        if self.rate <= 0:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Going into debt lets a batch larger than the bucket through after a proportional wait
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        
+        if wait:
+            time.sleep(wait)
+
+
+class BackfillService:
+    """
+    Service that brings every document's classification or search index up to the active model version.
+    Pending documents are found with a keyset-paginated query, processed in parallel batches and
+    checkpointed so an interrupted run resumes where it stopped.
+    """
+    
+    STAGES = ["classification", "index"]
+    
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = None,
+        workers: int = None,
+        rate_limit: float = None,
+        checkpoint_path: str = None
+    ):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size or settings.BACKFILL_BATCH_SIZE)
+        self.workers = max(1, workers or settings.BACKFILL_WORKERS)
+        self.rate_limit = settings.BACKFILL_RATE_LIMIT if rate_limit is None else rate_limit
+        self.checkpoint_path = checkpoint_path or settings.BACKFILL_CHECKPOINT_PATH
+    
+    def run(self, stage: str, limit: int = None, restart: bool = False) -> dict:
+        """
+        Process pending documents for a stage until none are left, `limit` documents have been
+        submitted, or the active model changes. Returns the final checkpoint.
+        """
+        self._check_stage(stage)
+        version = self.target_version(stage)
+        
+        state = None if restart else self.load_checkpoint(stage, version)
+        if state is None:
+            state = {
+                "stage": stage,
+                "version": version,
+                "last_id": 0,
+                "processed": 0,
+                "failed": 0,
+                "failed_ids": [],
+                "completed": False,
+                "started_at": datetime.utcnow().isoformat()
+            }
+        elif state["completed"]:
+            # Documents uploaded since the last run are still picked up from the checkpoint onwards
+            state["completed"] = False
+        
+        logger.info("Backfilling %s to %s from document %s", stage, version, state["last_id"])
+        
+        bucket = TokenBucket(self.rate_limit, capacity=max(self.rate_limit, self.batch_size))
+        in_flight = deque()  # (last document id, future) in id order
+        cursor = state["last_id"]
+        submitted = 0
+        exhausted = False
+        start = time.monotonic()
+        
+        db = self.session_factory()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"backfill-{stage}") as executor:
+                while limit is None or submitted < limit:
+                    if self.target_version(stage) != version:
+                        logger.warning("Active %s version changed from %s; stopping, rerun to continue", stage, version)
+                        break
+                    
+                    batch_size = self.batch_size if limit is None else min(self.batch_size, limit - submitted)
+                    document_ids = self.pending_ids(db, stage, version, cursor, batch_size)
+                    if not document_ids:
+                        exhausted = True
+                        break
+                    
+                    bucket.acquire(len(document_ids))
+                    in_flight.append((document_ids[-1], executor.submit(self._process_batch, stage, document_ids)))
+                    cursor = document_ids[-1]
+                    submitted += len(document_ids)
+                    
+                    # Bound the work queued ahead and checkpoint batches as they finish in order
+                    while in_flight and (len(in_flight) > self.workers or in_flight[0][1].done()):
+                        self._record(state, *in_flight.popleft(), start)
+                
+                while in_flight:
+                    self._record(state, *in_flight.popleft(), start)
+            state["completed"] = exhausted
+        finally:
+            db.close()
+            self.save_checkpoint(state)
+        
+        logger.info(
+            "Backfill of %s to %s %s: %d processed, %d failed",
+            stage, version, "completed" if state["completed"] else "stopped", state["processed"], state["failed"]
+        )
+        return state
+    
+    def target_version(self, stage: str) -> str:
+        """
+        Version a stage's results are brought up to: the active model, or its built-in fallback
+        """
+        if stage == "classification":
+            return model_registry.current_version("classifier") or ClassifierService.MODEL_VERSION
+        return SearchService.current_index_version()
+    
+    def pending_ids(self, db, stage: str, version: str, after_id: int, limit: int) -> list:
+        """
+        Next page of ids of documents with OCR text whose latest result for the stage is missing
+        or from another version. Keyset pagination on the primary key keeps every page an index range scan.
+        """
+        if stage == "classification":
+            # The latest row is the one served; older rows are history
+            latest_version = select(DocumentClassification.model_version).where(
+                DocumentClassification.document_id == Document.id
+            ).order_by(DocumentClassification.id.desc()).limit(1).correlate(Document).scalar_subquery()
+            outdated = func.coalesce(latest_version, "") != version
+        else:
+            outdated = ~exists().where(
+                SearchIndex.document_id == Document.id,
+                SearchIndex.index_version == version
+            )
+        
+        rows = db.query(Document.id).filter(
+            Document.id > after_id,
+            Document.ocr_results.any(),
+            outdated
+        ).order_by(Document.id).limit(limit)
+        return [row.id for row in rows]
+    
+    def load_checkpoint(self, stage: str, version: str) -> dict:
+        """
+        Saved progress of a backfill to a version, or None if it has not been started
+        """
+        try:
+            with open(self._checkpoint_file(stage, version)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def save_checkpoint(self, state: dict):
+        """
+        Write progress atomically so a crash never leaves a truncated checkpoint
+        """
+        os.makedirs(self.checkpoint_path, exist_ok=True)
+        state["updated_at"] = datetime.utcnow().isoformat()
+        path = self._checkpoint_file(state["stage"], state["version"])
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, path)
+    
+    def _record(self, state: dict, last_id: int, future, start: float):
+        """
+        Fold a finished batch into the checkpoint. Batches are recorded in id order, so the
+        checkpoint never skips past a batch that is still running.
+        """
+        result = future.result()
+        state["last_id"] = last_id
+        state["processed"] += result["processed"]
+        state["failed"] += len(result["failed"])
+        # Failed documents stay pending; a --restart run retries them along with anything missed
+        state["failed_ids"] = (state["failed_ids"] + result["failed"])[-1000:]
+        self.save_checkpoint(state)
+        
+        elapsed = time.monotonic() - start
+        logger.info(
+            "%s: up to document %d, %d processed, %d failed (%.1f docs/s)",
+            state["stage"], last_id, state["processed"], state["failed"], state["processed"] / elapsed if elapsed else 0
+        )
+    
+    def _process_batch(self, stage: str, document_ids: list) -> dict:
+        """
+        Run a stage for a batch in its own session. If the batch fails, its documents are
+        retried one by one so a single bad document does not fail the rest.
+        """
+        try:
+            return {"processed": self._run_stage(stage, document_ids), "failed": []}
+        except Exception:
+            logger.exception("Backfill batch ending at document %d failed; retrying documents individually", document_ids[-1])
+        
+        processed, failed = 0, []
+        for document_id in document_ids:
+            try:
+                processed += self._run_stage(stage, [document_id])
+            except Exception as e:
+                logger.warning("Backfill of %s failed for document %d: %s", stage, document_id, e)
+                failed.append(document_id)
+        return {"processed": processed, "failed": failed}
+    
+    def _run_stage(self, stage: str, document_ids: list) -> int:
+        """
+        Classify or index documents with one bulk write and commit
+        """
+        db = self.session_factory()
+        try:
+            documents = db.query(Document).filter(Document.id.in_(document_ids)).order_by(Document.id).all()
+            texts = OCRService(db).load_texts(document_ids)
+            texts = [texts.get(document.id, "") for document in documents]
+            
+            if stage == "classification":
+                ClassifierService(db).classify_texts(documents, texts)
+            else:
+                SearchService(db).index_texts(documents, texts)
+            db.commit()
+            return len(documents)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def _checkpoint_file(self, stage: str, version: str) -> str:
+        """
+        One checkpoint per stage and target version, so a new model starts a fresh backfill
+        """
+        return os.path.join(self.checkpoint_path, f"{stage}-{version}.json")
+    
+    def _check_stage(self, stage: str):
+        """
+        Reject unknown stage names
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage {stage}. Available stages: {', '.join(self.STAGES)}")
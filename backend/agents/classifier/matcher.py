@@ -0,0 +1,111 @@
+"""
+Keyword matcher for the Classification Agent
+Word-level Aho-Corasick automaton over the category taxonomy: every keyword
+(including multi-word phrases) is found in a single pass over the text
+"""
+import re
+from collections import Counter, deque
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def normalize_word(word: str) -> str:
+    """
+    Lowercase a word and fold simple plurals, applied identically to keywords and text
+    """
+    word = word.lower()
+    if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    """
+    Split text into normalized words; punctuation and underscores are boundaries
+    """
+    # Same folding as normalize_word, inlined: this runs once per word of every document
+    return [
+        word[:-1] if len(word) > 4 and word[-1] == "s" and word[-2] != "s" else word
+        for word in WORD_PATTERN.findall(text.lower())
+    ]
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern matcher compiled from a {category: [keywords]} taxonomy.
+    Matching works on whole words, so "bill" does not match "billion".
+    """
+    
+    def __init__(self, taxonomy: dict):
+        # Trie over words: transitions, failure links and keyword labels per node
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        
+        for category, keywords in taxonomy.items():
+            for keyword in keywords:
+                words = tokenize(keyword)
+                if words:
+                    self._add(words, (category, keyword))
+        self._build()
+    
+    def _add(self, words: list, label: tuple):
+        """
+        Insert a keyword's words into the trie
+        """
+        node = 0
+        for word in words:
+            next_node = self._goto[node].get(word)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][word] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(label)
+    
+    def _build(self):
+        """
+        Compute failure links breadth-first and merge outputs along them
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+    
+    def count(self, text: str) -> Counter:
+        """
+        Hit counts per (category, keyword) in a single pass over the text
+        """
+        hits = Counter()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for word in tokenize(text):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            if output[node]:
+                hits.update(output[node])
+        return hits
+
+
+_matchers = {}
+
+
+def get_matcher(taxonomy: dict, version: str) -> KeywordMatcher:
+    """
+    Matcher for a taxonomy version, compiled once per process
+    """
+    matcher = _matchers.get(version)
+    if matcher is None:
+        matcher = KeywordMatcher(taxonomy)
+        _matchers[version] = matcher
+    return matcher
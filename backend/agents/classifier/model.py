@@ -0,0 +1,220 @@
+"""
+Local linear text classifier for the Classification Agent
+Hashing TF-IDF features in a sparse matrix, scored for a whole batch with one matrix multiply.
+Artifacts are a directory holding model.json plus the weights as .npy files.
+"""
+import os
+import json
+import zlib
+import hashlib
+from collections import Counter
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from common.registry import model_registry
+from agents.classifier.matcher import tokenize
+
+DEFAULT_FEATURES = 2 ** 18
+
+
+def model_input(filename: str, text: str) -> str:
+    """
+    Text the model sees for a document; shared by training and inference
+    """
+    return f"{filename or ''}\n{text or ''}"
+
+
+def featurize(texts: list, n_features: int, ngram_max: int = 2, idf: np.ndarray = None) -> sparse.csr_matrix:
+    """
+    Hash word n-grams of each text into a CSR matrix of sublinear term frequencies.
+    With idf the rows are TF-IDF weighted and L2-normalized.
+    """
+    mask = n_features - 1  # n_features is a power of two
+    indptr = [0]
+    indices = []
+    counts = []
+    
+    for text in texts:
+        words = tokenize(text)
+        grams = Counter(words)
+        for n in range(2, ngram_max + 1):
+            grams.update(" ".join(gram) for gram in zip(*(words[k:] for k in range(n))))
+        
+        # crc32 rather than hash(): stable across processes and restarts
+        hashed = np.fromiter((zlib.crc32(gram.encode()) & mask for gram in grams), dtype=np.int64, count=len(grams))
+        gram_counts = np.fromiter(grams.values(), dtype=np.int64, count=len(grams))
+        
+        # Colliding grams share a column; sum their counts
+        columns, inverse = np.unique(hashed, return_inverse=True)
+        indices.append(columns)
+        counts.append(np.bincount(inverse, weights=gram_counts, minlength=len(columns)))
+        indptr.append(indptr[-1] + len(columns))
+    
+    data = np.concatenate(counts).astype(np.float32) if counts else np.zeros(0, dtype=np.float32)
+    matrix = sparse.csr_matrix(
+        (1.0 + np.log(data, out=data), np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64), indptr),
+        shape=(len(texts), n_features)
+    )
+    
+    if idf is not None:
+        matrix.data *= idf[matrix.indices]
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+    
+    return matrix
+
+
+class LinearTextModel:
+    """
+    Multinomial linear model over hashed TF-IDF features
+    """
+    
+    ARTIFACT_FILE = "model.json"
+    WEIGHT_FILES = ("coef", "intercept", "idf")
+    
+    def __init__(
+        self,
+        version: str,
+        classes: list,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        idf: np.ndarray,
+        n_features: int,
+        ngram_max: int = 2,
+        info: dict = None
+    ):
+        self.version = version
+        self.classes = list(classes)
+        self.coef = coef  # (n_features, n_classes)
+        self.intercept = intercept  # (n_classes,)
+        self.idf = idf  # (n_features,)
+        self.n_features = n_features
+        self.ngram_max = ngram_max
+        self.info = info or {}
+    
+    def predict_proba(self, texts: list) -> np.ndarray:
+        """
+        Class probabilities for a batch of texts, shape (len(texts), len(classes))
+        """
+        features = featurize(texts, self.n_features, self.ngram_max, self.idf)
+        scores = np.asarray(features @ self.coef) + self.intercept
+        
+        # Softmax, shifted for numerical stability
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+    
+    def save(self, path: str):
+        """
+        Write the artifact directory
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self.WEIGHT_FILES:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name), dtype=np.float32))
+        
+        with open(os.path.join(path, self.ARTIFACT_FILE), "w") as f:
+            json.dump({
+                "version": self.version,
+                "classes": self.classes,
+                "n_features": self.n_features,
+                "ngram_max": self.ngram_max,
+                **self.info
+            }, f, indent=2)
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LinearTextModel":
+        """
+        Load an artifact directory; weights are memory-mapped read-only by default
+        """
+        with open(os.path.join(path, cls.ARTIFACT_FILE)) as f:
+            spec = json.load(f)
+        
+        weights = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in cls.WEIGHT_FILES
+        }
+        info = {key: value for key, value in spec.items() if key not in ("version", "classes", "n_features", "ngram_max")}
+        return cls(
+            spec["version"],
+            spec["classes"],
+            weights["coef"],
+            weights["intercept"],
+            weights["idf"],
+            spec["n_features"],
+            spec.get("ngram_max", 2),
+            info
+        )
+    
+    @staticmethod
+    def is_artifact(path: str) -> bool:
+        """
+        Whether a directory holds a model artifact
+        """
+        return bool(path) and os.path.isfile(os.path.join(path, LinearTextModel.ARTIFACT_FILE))
+    
+    def memory_bytes(self) -> int:
+        """
+        Size of the weights; memory-mapped pages are shared by every process using this version
+        """
+        return sum(getattr(self, name).nbytes for name in self.WEIGHT_FILES)
+
+
+def predict_texts(texts: list, version: str = None) -> tuple:
+    """
+    Process-pool entry point: (version, classes, probabilities) for a batch of model inputs.
+    Workers load the requested version from the registry, so they score with the same model as the caller.
+    """
+    model = model_registry.get("classifier", version)
+    if model is None:
+        raise ValueError("No classification model available")
+    return model.version, model.classes, model.predict_proba(texts)
+
+
+def train_model(texts: list, labels: list, n_features: int = DEFAULT_FEATURES, ngram_max: int = 2, version: str = None) -> LinearTextModel:
+    """
+    Fit a multinomial logistic regression on CPU and export it as a LinearTextModel
+    """
+    from sklearn.linear_model import LogisticRegression
+    
+    classes = sorted(set(labels))
+    if len(classes) < 2:
+        raise ValueError("Training data needs at least two categories")
+    
+    counts = featurize(texts, n_features, ngram_max)
+    document_frequency = np.bincount(counts.indices, minlength=n_features)
+    idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+    features = featurize(texts, n_features, ngram_max, idf)
+    
+    classifier = LogisticRegression(max_iter=1000)
+    classifier.fit(features, labels)
+    
+    coef = classifier.coef_.T.astype(np.float32)
+    intercept = classifier.intercept_.astype(np.float32)
+    if len(classes) == 2:
+        # Binary fits have one weight vector for the second class; expand to two softmax columns
+        coef = np.hstack([np.zeros_like(coef), coef])
+        intercept = np.array([0.0, intercept[0]], dtype=np.float32)
+    
+    if version is None:
+        digest = hashlib.sha256(coef.tobytes()).hexdigest()[:8]
+        version = f"linear-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{digest}"
+    
+    return LinearTextModel(
+        version,
+        list(classifier.classes_),
+        coef,
+        intercept,
+        idf,
+        n_features,
+        ngram_max,
+        {
+            "trained_at": datetime.utcnow().isoformat(),
+            "training_documents": len(texts),
+            "training_accuracy": round(float(classifier.score(features, labels)), 4)
+        }
+    )
+
+
+model_registry.register_loader("classifier", LinearTextModel.load, LinearTextModel.memory_bytes)
@@ -2,8 +2,19 @@
 Document Classification Agent Service
 Classifies documents into categories using ML models
 """
+from collections import Counter
+from typing import List
+import numpy as np
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from database.models import Document, DocumentClassification, OCRResult
+from database.models import Document, DocumentClassification
+from common.concurrency import offload, run_cpu_bound
+from common.cache import stage_cache, content_key
+from config.settings import settings
+from agents.ocr.service import OCRService
+from agents.classifier.matcher import get_matcher
+from common.registry import model_registry
+from agents.classifier.model import predict_texts, model_input
 
 
 class ClassifierService:
@@ -11,19 +22,52 @@ class ClassifierService:
     Service for document classification using ML models
     """
     
+    TAXONOMY_VERSION = "kmrl-1"  # Bump whenever CATEGORIES changes
+    MODEL_VERSION = f"keywords-{TAXONOMY_VERSION}"  # Used when no trained model artifact is available
+    
+    FILENAME_WEIGHT = 3  # A keyword in the filename counts as this many hits in the text
+    CONFIDENT_HITS = 5  # Weighted hits at which the top category reaches full confidence
+    
     CATEGORIES = {
-        "contract": ["legal", "agreement", "mou"],
-        "invoice": ["bill", "payment", "receipt"],
-        "report": ["analysis", "summary", "technical"],
-        "correspondence": ["letter", "email", "memo"],
-        "technical": ["specification", "manual", "drawing"],
-        "administrative": ["form", "application", "certificate"]
+        "contract": [
+            "legal", "agreement", "mou", "contract", "memorandum of understanding", "tender",
+            "bid", "purchase order", "letter of award", "amendment", "addendum", "lease",
+            "annual maintenance contract", "amc", "concession", "indemnity", "arbitration"
+        ],
+        "invoice": [
+            "bill", "payment", "receipt", "invoice", "tax invoice", "gst", "gstin", "amount due",
+            "credit note", "debit note", "voucher", "remittance", "quotation", "estimate", "ra bill"
+        ],
+        "report": [
+            "analysis", "summary", "technical", "report", "audit", "inspection report",
+            "incident report", "progress report", "monthly report", "ridership", "performance review",
+            "root cause analysis", "findings"
+        ],
+        "correspondence": [
+            "letter", "email", "memo", "circular", "notice", "office order", "reply",
+            "subject", "dear sir", "regards", "forwarded"
+        ],
+        "technical": [
+            "specification", "manual", "drawing", "schematic", "rolling stock", "bogie", "pantograph",
+            "signalling", "cbtc", "traction", "overhead equipment", "ohe", "track", "depot",
+            "maintenance schedule", "job card", "work order", "design basis report", "sop"
+        ],
+        "administrative": [
+            "form", "application", "certificate", "leave", "attendance", "recruitment",
+            "appointment order", "transfer order", "training", "policy", "minutes of meeting",
+            "board meeting", "approval"
+        ],
+        "safety": [
+            "safety", "hazard", "accident", "near miss", "fire", "evacuation", "permit to work",
+            "risk assessment", "cmrs", "safety certificate", "emergency"
+        ]
     }
     
     def __init__(self, db: Session):
         self.db = db
     
-    async def classify(self, document_id: int) -> dict:
+    @offload
+    def classify(self, document_id: int) -> dict:
         """
         Classify a document
         """
@@ -32,32 +76,129 @@ class ClassifierService:
         if not document:
             raise ValueError(f"Document {document_id} not found")
         
-        ocr_result = self.db.query(OCRResult).filter(
-            OCRResult.document_id == document_id
-        ).first()
+        text = OCRService(self.db).load_text(document_id)
         
-        # TODO: Implement actual classification using ML model
-        # This is a placeholder that simulates classification
-        classification_result = self._simulate_classification(
-            document.original_filename,
-            ocr_result.extracted_text if ocr_result else ""
+        classification_result = self.classify_text(
+            document,
+            text or ""
         )
-        
-        # Save classification result
-        classification = DocumentClassification(
-            document_id=document_id,
-            category=classification_result["category"],
-            subcategory=classification_result["subcategory"],
-            confidence_score=classification_result["confidence"],
-            tags=classification_result["tags"],
-            model_version="v1.0.0"
-        )
-        
-        self.db.add(classification)
         self.db.commit()
         
         return classification_result
     
+    @offload
+    def classify_batch(self, document_ids: List[int]) -> list:
+        """
+        Classify several documents: OCR text is loaded in one query, each batch of
+        CLASSIFY_BATCH_SIZE documents is scored with one matrix multiply and bulk inserted
+        """
+        document_ids = list(dict.fromkeys(document_ids))
+        documents = {
+            document.id: document
+            for document in self.db.query(Document).filter(Document.id.in_(document_ids)).all()
+        }
+        texts = OCRService(self.db).load_texts(list(documents))
+        
+        found = [documents[document_id] for document_id in document_ids if document_id in documents]
+        classified = {}
+        batch_size = max(1, settings.CLASSIFY_BATCH_SIZE)
+        for i in range(0, len(found), batch_size):
+            batch = found[i:i + batch_size]
+            results = self.classify_texts(batch, [texts.get(document.id, "") for document in batch])
+            self.db.commit()
+            classified.update((document.id, result) for document, result in zip(batch, results))
+        
+        return [
+            {"document_id": document_id, "status": "completed", **classified[document_id]}
+            if document_id in classified
+            else {"document_id": document_id, "status": "failed", "error": f"Document {document_id} not found"}
+            for document_id in document_ids
+        ]
+    
+    def classify_text(self, document: Document, text: str, use_cache: bool = True) -> dict:
+        """
+        Classify a loaded document from its text and stage the result in the session.
+        Results are reused from the stage cache for the same filename, text and model version.
+        The caller is responsible for committing.
+        """
+        return self.classify_texts([document], [text], use_cache=use_cache)[0]
+    
+    def classify_texts(self, documents: list, texts: list, use_cache: bool = True) -> list:
+        """
+        Classify loaded documents together and stage the results with one bulk insert.
+        The caller is responsible for committing.
+        """
+        # One registry lookup per batch: a hot swap mid-batch does not mix versions
+        model = model_registry.get("classifier")
+        model_version = model.version if model else self.MODEL_VERSION
+        
+        keys = [content_key(document.original_filename, text) for document, text in zip(documents, texts)]
+        results = [
+            stage_cache.get(key, "classification", model_version) if use_cache else None
+            for key in keys
+        ]
+        pending = [i for i, result in enumerate(results) if not result]
+        if pending:
+            model_version, predicted = self._predict(
+                model,
+                [documents[i].original_filename for i in pending],
+                [texts[i] for i in pending]
+            )
+            for i, result in zip(pending, predicted):
+                results[i] = result
+                stage_cache.put(keys[i], "classification", model_version, result)
+        
+        # Save classification results
+        self.db.execute(insert(DocumentClassification), [
+            {
+                "document_id": document.id,
+                "category": result["category"],
+                "subcategory": result["subcategory"],
+                "confidence_score": result["confidence"],
+                "tags": result["tags"],
+                "model_version": result["model_version"]
+            }
+            for document, result in zip(documents, results)
+        ])
+        
+        return results
+    
+    def _predict(self, model, filenames: list, texts: list) -> tuple:
+        """
+        Score texts with the local model, or the keyword matcher when no model is trained.
+        Returns the model version that produced the results along with them.
+        """
+        if model is None:
+            return self.MODEL_VERSION, [
+                {
+                    **run_cpu_bound(type(self)._classify_keywords, filename, text, work_size=len(text)),
+                    "model_version": self.MODEL_VERSION
+                }
+                for filename, text in zip(filenames, texts)
+            ]
+        
+        inputs = [model_input(filename, text) for filename, text in zip(filenames, texts)]
+        version, classes, probabilities = run_cpu_bound(
+            predict_texts,
+            inputs,
+            model.version,
+            work_size=sum(len(text) for text in inputs)
+        )
+        
+        results = []
+        top = np.argmax(probabilities, axis=1)
+        for filename, text, row, index in zip(filenames, texts, probabilities, top):
+            category = classes[index]
+            keywords = type(self)._category_keywords(filename, text, category)
+            results.append({
+                "category": category,
+                "subcategory": keywords[0] if keywords else "unclassified",
+                "confidence": int(round(float(row[index]) * 100)),
+                "tags": list(dict.fromkeys([category] + keywords))[:5],
+                "model_version": version
+            })
+        return version, results
+    
     async def get_categories(self) -> list:
         """
         Get available categories
@@ -70,13 +211,15 @@ class ClassifierService:
             for category, subcats in self.CATEGORIES.items()
         ]
     
-    async def get_result(self, document_id: int) -> dict:
+    @offload
+    def get_result(self, document_id: int) -> dict:
         """
         Get classification result for a document
         """
+        # Latest result; earlier classifications are kept as history
         result = self.db.query(DocumentClassification).filter(
             DocumentClassification.document_id == document_id
-        ).first()
+        ).order_by(DocumentClassification.id.desc()).first()
         
         if not result:
             return None
@@ -86,31 +229,53 @@ class ClassifierService:
             "category": result.category,
             "subcategory": result.subcategory,
             "confidence": result.confidence_score,
-            "tags": result.tags
+            "tags": result.tags,
+            "model_version": result.model_version
         }
     
-    def _simulate_classification(self, filename: str, text: str) -> dict:
+    @classmethod
+    def _category_keywords(cls, filename: str, text: str, category: str) -> list:
+        """
+        Keywords of a category found in the document, most frequent first
+        """
+        matcher = get_matcher(cls.CATEGORIES, cls.TAXONOMY_VERSION)
+        hits = matcher.count(filename) + matcher.count(text)
+        return [keyword for (hit_category, keyword), _ in hits.most_common() if hit_category == category]
+    
+    @classmethod
+    def _classify_keywords(cls, filename: str, text: str) -> dict:
         """
-        Placeholder for actual classification implementation
-        In production, this would use trained ML models
+        Score every category from keyword hit counts in a single pass over the text
         """
-        # Simple keyword-based classification for demonstration
-        text_lower = (filename + " " + text).lower()
+        matcher = get_matcher(cls.CATEGORIES, cls.TAXONOMY_VERSION)
+        
+        hits = matcher.count(text)
+        for label, count in matcher.count(filename).items():
+            hits[label] += count * cls.FILENAME_WEIGHT
+        
+        if not hits:
+            return {
+                "category": "general",
+                "subcategory": "unclassified",
+                "confidence": 50,
+                "tags": ["general"]
+            }
+        
+        scores = Counter()
+        for (category, _), count in hits.items():
+            scores[category] += count
+        
+        (category, score), = scores.most_common(1)
+        keywords = [keyword for (hit_category, keyword), _ in hits.most_common() if hit_category == category]
         
-        for category, keywords in self.CATEGORIES.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return {
-                        "category": category,
-                        "subcategory": keyword,
-                        "confidence": 75,
-                        "tags": [category, keyword]
-                    }
+        # Confidence grows with the category's share of all hits and with the amount of evidence
+        share = score / sum(scores.values())
+        evidence = min(1.0, score / cls.CONFIDENT_HITS)
+        confidence = int(round(50 + 49 * share * evidence))
         
-        # Default classification
         return {
-            "category": "general",
-            "subcategory": "unclassified",
-            "confidence": 50,
-            "tags": ["general"]
+            "category": category,
+            "subcategory": keywords[0],
+            "confidence": confidence,
+            "tags": list(dict.fromkeys([category] + keywords))[:5]
         }
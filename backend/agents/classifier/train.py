@@ -0,0 +1,98 @@
+"""
+Offline training for the local classification model
+Run with: python -m agents.classifier.train --data labelled.jsonl
+      or: python -m agents.classifier.train --from-db --min-confidence 80
+
+Training data is JSON lines with "text", "category" and optionally "filename".
+The model is published to the model registry and activated unless --no-activate is given.
+"""
+import argparse
+import json
+import logging
+from common.registry import model_registry
+from agents.classifier.model import train_model, model_input, DEFAULT_FEATURES
+
+logger = logging.getLogger(__name__)
+
+
+def load_jsonl(path: str) -> tuple:
+    """
+    Read (texts, labels) from a JSON lines file
+    """
+    texts, labels = [], []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            texts.append(model_input(record.get("filename"), record["text"]))
+            labels.append(record["category"])
+    return texts, labels
+
+
+def load_from_db(min_confidence: int) -> tuple:
+    """
+    Read (texts, labels) from stored classifications, e.g. to bootstrap from the keyword matcher
+    or from manually reviewed results
+    """
+    from database.connection import SessionLocal
+    from database.models import Document, DocumentClassification
+    from agents.ocr.service import OCRService
+    
+    db = SessionLocal()
+    try:
+        rows = db.query(Document.id, Document.original_filename, DocumentClassification.category).join(
+            DocumentClassification, DocumentClassification.document_id == Document.id
+        ).filter(
+            DocumentClassification.confidence_score >= min_confidence,
+            DocumentClassification.is_stale.is_(False)
+        ).all()
+        
+        texts_by_document = OCRService(db).load_texts([row.id for row in rows])
+        texts, labels = [], []
+        for row in rows:
+            if row.id in texts_by_document:
+                texts.append(model_input(row.original_filename, texts_by_document[row.id]))
+                labels.append(row.category)
+        return texts, labels
+    finally:
+        db.close()
+
+
+def main():
+    """
+    Train a model, publish it to the registry and activate it
+    """
+    parser = argparse.ArgumentParser(description="Train the local document classifier")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="JSON lines file with text, category and optional filename")
+    source.add_argument("--from-db", action="store_true", help="Use stored classifications as labels")
+    parser.add_argument("--min-confidence", type=int, default=80, help="Minimum confidence of stored labels (--from-db)")
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES, help="Hashed feature space size (power of two)")
+    parser.add_argument("--version", help="Model version (default: derived from time and weights)")
+    parser.add_argument("--no-activate", action="store_true", help="Publish without making it the active version")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    
+    if args.features & (args.features - 1):
+        parser.error("--features must be a power of two")
+    
+    texts, labels = load_jsonl(args.data) if args.data else load_from_db(args.min_confidence)
+    logger.info("Training on %d documents, %d categories", len(texts), len(set(labels)))
+    
+    model = train_model(texts, labels, n_features=args.features, version=args.version)
+    if model.version in model_registry.versions("classifier"):
+        raise SystemExit(f"Model version {model.version} already exists")
+    
+    output = model_registry.artifact_path("classifier", model.version)
+    model.save(output)
+    logger.info("Saved model %s to %s (training accuracy %.3f)", model.version, output, model.info["training_accuracy"])
+    
+    if not args.no_activate:
+        # Running API workers pick up the new version on their next poll of the registry
+        model_registry.activate("classifier", model.version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from .service import DedupService
+
+__all__ = ["DedupService"]
@@ -0,0 +1,39 @@
+"""
+Near-duplicate clustering of the existing corpus
+Run with: python -m agents.dedup.cluster
+      or: python -m agents.dedup.cluster --threshold 0.9
+
+Signs indexed documents that have no current signature, then stores a cluster id on every
+document with near-duplicates. Rerunning recomputes the clusters from scratch.
+"""
+import json
+import time
+import logging
+import argparse
+from database.connection import SessionLocal
+from agents.dedup.service import DedupService
+
+
+def main():
+    """
+    Cluster the corpus and print a summary
+    """
+    parser = argparse.ArgumentParser(description="Group documents into near-duplicate clusters")
+    parser.add_argument("--threshold", type=float, help="Estimated Jaccard similarity for a near-duplicate (default DEDUP_THRESHOLD)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents signed per transaction")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        summary = DedupService(db).cluster(threshold=args.threshold, batch_size=args.batch_size)
+    finally:
+        db.close()
+    summary["seconds"] = round(time.perf_counter() - start, 1)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+MinHash signatures and LSH banding for near-duplicate detection
+A document is represented by the set of its word shingles. The fraction of equal values in two
+MinHash signatures estimates the Jaccard similarity of those sets, so rescans of the same page
+with a few OCR differences stay close while different documents do not.
+
+Signatures are split into bands; documents whose signatures agree on every value of at least one
+band share a bucket, which turns lookups into a few indexed equality matches instead of a scan.
+With b bands of r rows, pairs above roughly (1/b)^(1/r) similarity become candidates.
+"""
+import re
+import zlib
+import hashlib
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """
+    Hashed word n-grams of lowercased text; a text shorter than one shingle is a single shingle
+    """
+    words = WORD.findall((text or "").lower())
+    if not words:
+        return set()
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash with num_perm universal hash functions (a * x + b) mod p over 32-bit shingle hashes.
+    The seed fixes the functions, so signatures stay comparable across processes and runs.
+    """
+    
+    CHUNK_SHINGLES = 4096  # Bounds the (shingles x num_perm) intermediate matrix
+    
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"{num_perm} MinHash values cannot be split into {bands} equal bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        # Signatures and buckets are only comparable between identical settings
+        self.version = f"minhash-{num_perm}-b{bands}-w{shingle_size}-s{seed}"
+    
+    def signature(self, text: str) -> np.ndarray:
+        """
+        uint32 signature of length num_perm, or None for text without words
+        """
+        hashes = np.fromiter(shingles(text, self.shingle_size), dtype=np.uint64)
+        if not len(hashes):
+            return None
+        
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        for first in range(0, len(hashes), self.CHUNK_SHINGLES):
+            chunk = hashes[first:first + self.CHUNK_SHINGLES, None]
+            # uint64 products wrap around; they are still well-mixed hash values
+            values = ((chunk * self.a + self.b) % MERSENNE_PRIME) & MAX_HASH
+            np.minimum(signature, values.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+    
+    def buckets(self, signature: np.ndarray) -> list:
+        """
+        One signed 64-bit bucket key per band, stable across processes
+        """
+        rows = self.num_perm // self.bands
+        return [
+            int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(), "big", signed=True)
+            for band in range(self.bands)
+        ]
+
+
+def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    Estimated Jaccard similarity of a signature to each row of a signature matrix
+    """
+    return (np.asarray(others) == signature).mean(axis=-1)
+
+
+class UnionFind:
+    """
+    Disjoint sets of document ids; each set is represented by its smallest id
+    """
+    
+    def __init__(self):
+        self.parent = {}
+    
+    def find(self, item: int) -> int:
+        """
+        Representative of the item's set, compressing the path on the way
+        """
+        root = self.parent.setdefault(item, item)
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+    
+    def union(self, first: int, second: int):
+        """
+        Merge the sets of two items under the smaller representative
+        """
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+    
+    def groups(self) -> dict:
+        """
+        {representative: sorted members} for sets of two or more items
+        """
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return {root: sorted(members) for root, members in groups.items() if len(members) > 1}
@@ -0,0 +1,246 @@
+"""
+Near-duplicate Detection Agent Service
+Flags rescans of the same paper document by MinHash similarity of their OCR text, and groups the
+corpus into near-duplicate clusters
+"""
+import itertools
+import numpy as np
+from sqlalchemy import insert, update, select, func, and_, or_
+from sqlalchemy.orm import Session
+from database.models import Document, SearchIndex, DocumentSignature, SignatureBucket
+from config.settings import settings
+from common.concurrency import offload
+from agents.dedup.lsh import MinHasher, UnionFind, similarity
+
+_minhasher = None
+
+
+def get_minhasher() -> MinHasher:
+    """
+    Process-wide MinHasher for the configured signature size, bands and shingle size
+    """
+    global _minhasher
+    if _minhasher is None:
+        _minhasher = MinHasher(
+            num_perm=settings.DEDUP_NUM_PERM,
+            bands=settings.DEDUP_BANDS,
+            shingle_size=settings.DEDUP_SHINGLE_WORDS
+        )
+    return _minhasher
+
+
+class DedupService:
+    """
+    Service for near-duplicate detection over LSH buckets of MinHash signatures
+    """
+    
+    CHUNK_IDS = 500  # Ids per IN (...) list, within bind parameter limits
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.hasher = get_minhasher()
+    
+    def sign_texts(self, document_ids: list, texts: list) -> int:
+        """
+        Store signatures and LSH buckets for documents' texts, replacing earlier ones.
+        Texts without words get none. Returns the number signed. The caller is responsible for committing.
+        """
+        self.db.query(SignatureBucket).filter(SignatureBucket.document_id.in_(document_ids)).delete(synchronize_session=False)
+        self.db.query(DocumentSignature).filter(DocumentSignature.document_id.in_(document_ids)).delete(synchronize_session=False)
+        
+        signatures, buckets = [], []
+        for document_id, text in zip(document_ids, texts):
+            signature = self.hasher.signature(text)
+            if signature is None:
+                continue
+            signatures.append({
+                "document_id": document_id,
+                "signature": signature.tobytes(),
+                "signature_version": self.hasher.version
+            })
+            buckets.extend(
+                {"document_id": document_id, "band": band, "bucket": bucket}
+                for band, bucket in enumerate(self.hasher.buckets(signature))
+            )
+        
+        if signatures:
+            self.db.execute(insert(DocumentSignature), signatures)
+            self.db.execute(insert(SignatureBucket), buckets)
+        return len(signatures)
+    
+    @offload
+    def find_near_duplicates(self, document_id: int, threshold: float = None, limit: int = 20) -> list:
+        """
+        Near-duplicates of a document, or None if it has no signature yet
+        """
+        return self.near_duplicates(document_id, threshold, limit)
+    
+    def near_duplicates(self, document_id: int, threshold: float = None, limit: int = 20) -> list:
+        """
+        Documents whose estimated similarity to this one reaches threshold (DEDUP_THRESHOLD),
+        most similar first. Candidates come from shared LSH buckets, so the cost depends on
+        the number of candidates rather than the size of the corpus.
+        """
+        threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+        row = self.db.query(DocumentSignature).filter(
+            DocumentSignature.document_id == document_id,
+            DocumentSignature.signature_version == self.hasher.version
+        ).first()
+        if row is None:
+            return None
+        
+        signature = np.frombuffer(row.signature, dtype=np.uint32)
+        candidates = [
+            candidate_id
+            for candidate_id, in self.db.query(SignatureBucket.document_id).filter(
+                # One index range per band; a row-value IN list is not matched against the index by every database
+                or_(*(
+                    and_(SignatureBucket.band == band, SignatureBucket.bucket == bucket)
+                    for band, bucket in enumerate(self.hasher.buckets(signature))
+                )),
+                SignatureBucket.document_id != document_id
+            ).distinct()
+        ]
+        if not candidates:
+            return []
+        
+        rows = self.db.query(DocumentSignature.document_id, DocumentSignature.signature, Document.original_filename).join(
+            Document, Document.id == DocumentSignature.document_id
+        ).filter(
+            DocumentSignature.document_id.in_(candidates),
+            DocumentSignature.signature_version == self.hasher.version
+        ).all()
+        if not rows:
+            return []
+        
+        scores = similarity(signature, np.stack([np.frombuffer(candidate.signature, dtype=np.uint32) for candidate in rows]))
+        matches = sorted(
+            (
+                {"id": candidate.document_id, "filename": candidate.original_filename, "similarity": round(float(score), 4)}
+                for candidate, score in zip(rows, scores)
+                if score >= threshold
+            ),
+            key=lambda match: (-match["similarity"], match["id"])
+        )
+        return matches[:limit]
+    
+    def sign_pending(self, batch_size: int = 500) -> int:
+        """
+        Sign indexed documents that have no signature of the current version, in keyset-paginated
+        batches committed one at a time. Returns the number signed.
+        """
+        signed = 0
+        after_id = 0
+        while True:
+            rows = self.db.query(SearchIndex.document_id, SearchIndex.indexed_text).outerjoin(
+                DocumentSignature, DocumentSignature.document_id == SearchIndex.document_id
+            ).filter(
+                SearchIndex.document_id > after_id,
+                (DocumentSignature.document_id.is_(None)) | (DocumentSignature.signature_version != self.hasher.version)
+            ).order_by(SearchIndex.document_id).limit(batch_size).all()
+            if not rows:
+                return signed
+            
+            signed += self.sign_texts([row.document_id for row in rows], [row.indexed_text for row in rows])
+            self.db.commit()
+            after_id = rows[-1].document_id
+    
+    def cluster(self, threshold: float = None, batch_size: int = 500) -> dict:
+        """
+        Group the whole corpus into near-duplicate clusters: sign pending documents, compare the
+        members of every shared LSH bucket, union the pairs that reach threshold and store each
+        document's cluster id (the smallest document id in its cluster).
+        """
+        threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+        signed = self.sign_pending(batch_size)
+        
+        # Every candidate pair shares at least one bucket with two or more documents
+        shared = select(SignatureBucket.band, SignatureBucket.bucket).group_by(
+            SignatureBucket.band, SignatureBucket.bucket
+        ).having(func.count() > 1).subquery()
+        rows = self.db.query(SignatureBucket.band, SignatureBucket.bucket, SignatureBucket.document_id).join(
+            shared, and_(SignatureBucket.band == shared.c.band, SignatureBucket.bucket == shared.c.bucket)
+        ).order_by(SignatureBucket.band, SignatureBucket.bucket, SignatureBucket.document_id).yield_per(10000)
+        groups = [
+            [document_id for _, _, document_id in members]
+            for _, members in itertools.groupby(rows, key=lambda row: (row.band, row.bucket))
+        ]
+        
+        signatures = self._load_signatures({document_id for members in groups for document_id in members})
+        union_find = UnionFind()
+        for members in groups:
+            # Each member joins the most similar earlier representative, or becomes one
+            representatives = []
+            for document_id in members:
+                signature = signatures.get(document_id)
+                if signature is None:
+                    continue
+                if representatives:
+                    scores = similarity(signature, np.stack([signatures[other] for other in representatives]))
+                    best = int(scores.argmax())
+                    if scores[best] >= threshold:
+                        union_find.union(representatives[best], document_id)
+                        continue
+                representatives.append(document_id)
+        
+        clusters = union_find.groups()
+        self.db.query(DocumentSignature).filter(DocumentSignature.cluster_id.isnot(None)).update(
+            {DocumentSignature.cluster_id: None}, synchronize_session=False
+        )
+        assignments = [
+            {"document_id": document_id, "cluster_id": cluster_id}
+            for cluster_id, members in clusters.items()
+            for document_id in members
+        ]
+        if assignments:
+            self.db.execute(update(DocumentSignature), assignments)
+        self.db.commit()
+        
+        return {
+            "signed": signed,
+            "candidate_buckets": len(groups),
+            "clusters": len(clusters),
+            "clustered_documents": len(assignments)
+        }
+    
+    @offload
+    def list_clusters(self, skip: int = 0, limit: int = 20) -> dict:
+        """
+        Near-duplicate clusters from the last clustering run, largest first
+        """
+        size = func.count(DocumentSignature.document_id)
+        page = self.db.query(DocumentSignature.cluster_id, size).filter(
+            DocumentSignature.cluster_id.isnot(None)
+        ).group_by(DocumentSignature.cluster_id).order_by(size.desc(), DocumentSignature.cluster_id).offset(skip).limit(limit).all()
+        total = self.db.query(func.count(func.distinct(DocumentSignature.cluster_id))).scalar()
+        
+        members = {}
+        if page:
+            for cluster_id, document_id, filename in self.db.query(
+                DocumentSignature.cluster_id, Document.id, Document.original_filename
+            ).join(Document, Document.id == DocumentSignature.document_id).filter(
+                DocumentSignature.cluster_id.in_([cluster_id for cluster_id, _ in page])
+            ).order_by(Document.id):
+                members.setdefault(cluster_id, []).append({"id": document_id, "filename": filename})
+        
+        return {
+            "clusters": [
+                {"cluster_id": cluster_id, "size": count, "documents": members.get(cluster_id, [])}
+                for cluster_id, count in page
+            ],
+            "total": total
+        }
+    
+    def _load_signatures(self, document_ids: set) -> dict:
+        """
+        Current-version signatures by document id, loaded in chunks
+        """
+        document_ids = sorted(document_ids)
+        signatures = {}
+        for first in range(0, len(document_ids), self.CHUNK_IDS):
+            for document_id, signature in self.db.query(DocumentSignature.document_id, DocumentSignature.signature).filter(
+                DocumentSignature.document_id.in_(document_ids[first:first + self.CHUNK_IDS]),
+                DocumentSignature.signature_version == self.hasher.version
+            ):
+                signatures[document_id] = np.frombuffer(signature, dtype=np.uint32)
+        return signatures
@@ -1,3 +1,4 @@
 from .service import IngestionService
+from .resumable import ResumableUploadService
 
-__all__ = ["IngestionService"]
+__all__ = ["IngestionService", "ResumableUploadService"]
@@ -0,0 +1,341 @@
+"""
+Resumable Upload Support for the Ingestion Agent
+Lets clients send large files in chunks and resume after a dropped connection
+"""
+import os
+import json
+import uuid
+import fcntl
+import hashlib
+import threading
+from datetime import datetime
+from typing import AsyncIterator
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from agents.ingestion.service import IngestionService
+from config.settings import settings
+
+
+class UploadOffsetMismatch(ValueError):
+    """
+    Raised when a chunk does not start at the session's current offset
+    """
+    
+    def __init__(self, expected: int, received: int):
+        super().__init__(f"Upload offset mismatch: expected {expected}, received {received}")
+        self.expected = expected
+        self.received = received
+
+
+class UploadInProgress(ValueError):
+    """
+    Raised when another request is already appending to the session
+    """
+    
+    def __init__(self, upload_id: str):
+        super().__init__(f"Upload {upload_id} is already receiving a chunk")
+        self.upload_id = upload_id
+
+
+class ChunkStore:
+    """
+    On-disk store for in-progress uploads.
+    Each session is a directory holding the partial data file and a small JSON state file.
+    """
+    
+    DATA_FILE = "data.part"
+    STATE_FILE = "state.json"
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def create(self, filename: str, total_size: int) -> dict:
+        """
+        Create a new upload session
+        """
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._session_dir(upload_id))
+        open(self.data_path(upload_id), "wb").close()
+        
+        state = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "total_size": total_size,
+            "offset": 0,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        self.save(state)
+        return state
+    
+    def load(self, upload_id: str) -> dict:
+        """
+        Load session state, or None if the session does not exist.
+        An offset beyond the data actually on disk (lost in a crash) is moved back to the file size.
+        """
+        try:
+            with open(os.path.join(self._session_dir(upload_id), self.STATE_FILE)) as f:
+                state = json.load(f)
+            size = os.path.getsize(self.data_path(upload_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        
+        if size < state["offset"]:
+            state["offset"] = size
+            self.save(state)
+        return state
+    
+    def save(self, state: dict):
+        """
+        Persist session state atomically and durably
+        """
+        state_path = os.path.join(self._session_dir(state["upload_id"]), self.STATE_FILE)
+        temp_path = state_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, state_path)
+    
+    def data_path(self, upload_id: str) -> str:
+        """
+        Path of the partial data file for a session
+        """
+        return os.path.join(self._session_dir(upload_id), self.DATA_FILE)
+    
+    def delete(self, upload_id: str):
+        """
+        Remove a session and any partial data
+        """
+        session_dir = self._session_dir(upload_id)
+        for name in (self.DATA_FILE, self.STATE_FILE, self.STATE_FILE + ".tmp"):
+            try:
+                os.remove(os.path.join(session_dir, name))
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(session_dir)
+        except OSError:
+            pass
+    
+    def _session_dir(self, upload_id: str) -> str:
+        """
+        Directory for a session; upload ids are hex strings, anything else is rejected
+        """
+        if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+            raise ValueError(f"Invalid upload id {upload_id}")
+        return os.path.join(self.root, upload_id)
+
+
+class ResumableUploadService:
+    """
+    Service for chunked, resumable uploads
+    """
+    
+    # Running SHA-256 per session: upload_id -> (hashed_offset, hasher).
+    # Shared across requests in this process so chunks extend the hash instead of re-reading the file.
+    _hashers = {}
+    _hashers_lock = threading.Lock()
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.ingestion_service = IngestionService(db)
+        self.store = ChunkStore(os.path.join(settings.STORAGE_PATH, ".uploads"))
+    
+    async def create_session(self, filename: str, total_size: int) -> dict:
+        """
+        Start a resumable upload
+        """
+        errors = []
+        
+        extension_error = IngestionService.extension_error(os.path.splitext(filename)[1].lower())
+        if extension_error:
+            errors.append(extension_error)
+        
+        if total_size <= 0:
+            errors.append("File is empty")
+        elif total_size > IngestionService.MAX_FILE_SIZE:
+            errors.append(f"File size exceeds maximum allowed size of {IngestionService.MAX_FILE_SIZE / (1024*1024)}MB")
+        
+        if errors:
+            raise ValueError(f"File validation failed: {errors}")
+        
+        state = await run_in_threadpool(self.store.create, filename, total_size)
+        self._set_hasher(state["upload_id"], 0, hashlib.sha256())
+        return state
+    
+    async def get_session(self, upload_id: str) -> dict:
+        """
+        Get the state (including the current offset) of an upload
+        """
+        return await run_in_threadpool(self.store.load, upload_id)
+    
+    async def append_chunk(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> dict:
+        """
+        Append a chunk at the given offset.
+        The session's data file is locked for the whole append, so concurrent requests cannot
+        interleave writes. The offset is persisted as data arrives (every CHUNK_SIZE bytes, only
+        after the data is synced to disk), so a dropped connection keeps what was received.
+        """
+        if not await run_in_threadpool(self.store.load, upload_id):
+            return None
+        
+        data_path = self.store.data_path(upload_id)
+        f = await run_in_threadpool(self._open_locked, upload_id, data_path)
+        try:
+            # Read under the lock: a request that held it may have moved the offset
+            state = await run_in_threadpool(self.store.load, upload_id)
+            if not state:
+                return None
+            if offset != state["offset"]:
+                raise UploadOffsetMismatch(state["offset"], offset)
+            
+            hasher = await run_in_threadpool(self._get_hasher, upload_id, data_path, state["offset"])
+            # Drop any bytes written after the last persisted offset
+            await run_in_threadpool(self._truncate, f, state["offset"])
+            
+            written = state["offset"]
+            try:
+                async for chunk in stream:
+                    if not chunk:
+                        continue
+                    if written + len(chunk) > state["total_size"]:
+                        raise ValueError(f"Chunk exceeds declared file size of {state['total_size']} bytes")
+                    
+                    await run_in_threadpool(self._write_chunk, f, hasher, chunk)
+                    written += len(chunk)
+                    self._set_hasher(upload_id, written, hasher)
+                    if written - state["offset"] >= IngestionService.CHUNK_SIZE:
+                        await run_in_threadpool(self._persist, f, state, written)
+            finally:
+                # Keep what arrived before the stream ended or broke off
+                if written != state["offset"]:
+                    await run_in_threadpool(self._persist, f, state, written)
+        finally:
+            await run_in_threadpool(f.close)
+        
+        return state
+    
+    async def finalize(self, upload_id: str) -> dict:
+        """
+        Complete an upload and hand it to the ingestion agent.
+        The checksum comes from the running hash, so the assembled file is not read again.
+        """
+        state = await run_in_threadpool(self.store.load, upload_id)
+        if not state:
+            return None
+        
+        if state["offset"] != state["total_size"]:
+            raise ValueError(f"Upload incomplete: received {state['offset']} of {state['total_size']} bytes")
+        
+        data_path = self.store.data_path(upload_id)
+        file_ext = os.path.splitext(state["filename"])[1].lower()
+        
+        header = await run_in_threadpool(self._read_header, data_path)
+        if not self.ingestion_service._matches_signature(file_ext, header):
+            await run_in_threadpool(self._abort, upload_id)
+            raise ValueError(f"File validation failed: ['File content does not match {file_ext} format']")
+        
+        hasher = await run_in_threadpool(self._get_hasher, upload_id, data_path, state["offset"])
+        staged = {
+            "temp_path": data_path,
+            "checksum": hasher.hexdigest(),
+            "file_size": state["offset"],
+            "file_ext": file_ext
+        }
+        
+        result = await run_in_threadpool(self.ingestion_service.finalize_upload, staged, state["filename"])
+        await run_in_threadpool(self._abort, upload_id)
+        return result
+    
+    async def abort(self, upload_id: str) -> bool:
+        """
+        Cancel an upload and discard received data
+        """
+        if not await run_in_threadpool(self.store.load, upload_id):
+            return False
+        await run_in_threadpool(self._abort, upload_id)
+        return True
+    
+    def _abort(self, upload_id: str):
+        """
+        Drop hash state and on-disk data for a session
+        """
+        with self._hashers_lock:
+            self._hashers.pop(upload_id, None)
+        self.store.delete(upload_id)
+    
+    def _get_hasher(self, upload_id: str, data_path: str, offset: int):
+        """
+        Return the running hash for a session at the given offset.
+        Rebuilt from the partial file if this process has no state for it (e.g. after a restart).
+        """
+        with self._hashers_lock:
+            cached = self._hashers.get(upload_id)
+        if cached and cached[0] == offset:
+            return cached[1]
+        
+        hasher = hashlib.sha256()
+        remaining = offset
+        with open(data_path, "rb") as f:
+            while remaining > 0:
+                chunk = f.read(min(IngestionService.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        self._set_hasher(upload_id, offset, hasher)
+        return hasher
+    
+    def _set_hasher(self, upload_id: str, offset: int, hasher):
+        """
+        Remember the running hash for a session
+        """
+        with self._hashers_lock:
+            self._hashers[upload_id] = (offset, hasher)
+    
+    @staticmethod
+    def _open_locked(upload_id: str, data_path: str):
+        """
+        Open the data file for writing under an exclusive lock, released when it is closed
+        """
+        f = open(data_path, "r+b")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            raise UploadInProgress(upload_id)
+        return f
+    
+    def _persist(self, f, state: dict, offset: int):
+        """
+        Sync received data to disk, then record the new offset; the state never claims unsynced bytes
+        """
+        f.flush()
+        os.fsync(f.fileno())
+        state["offset"] = offset
+        self.store.save(state)
+    
+    @staticmethod
+    def _read_header(data_path: str) -> bytes:
+        """
+        Read the leading bytes used for the signature check
+        """
+        with open(data_path, "rb") as f:
+            return f.read(IngestionService.HEADER_SIZE)
+    
+    @staticmethod
+    def _truncate(f, offset: int):
+        """
+        Position the data file at the persisted offset
+        """
+        f.truncate(offset)
+        f.seek(offset)
+    
+    @staticmethod
+    def _write_chunk(f, hasher, chunk: bytes):
+        """
+        Append a chunk, then extend the hash (a failed write leaves the hash untouched).
+        The data is synced by _persist before the offset covering it is saved.
+        """
+        f.write(chunk)
+        hasher.update(chunk)
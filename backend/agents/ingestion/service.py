@@ -3,9 +3,13 @@ Document Ingestion Agent Service
 Handles document upload, validation, and initial processing
 """
 import os
+import asyncio
 import hashlib
+import tempfile
 from datetime import datetime
+from typing import List
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from database.models import Document, DocumentType, DocumentStatus
 from config.settings import settings
@@ -16,13 +20,28 @@ class IngestionService:
     Service for handling document ingestion
     """
     
-    ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.doc', '.docx', '.xls', '.xlsx'}
+    ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.docx', '.xlsx'}
+    # Binary Office formats have no text extractor and cannot be OCRed; suggest the format to save as
+    LEGACY_EXTENSIONS = {'.doc': '.docx', '.xls': '.xlsx'}
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+    CHUNK_SIZE = 1024 * 1024  # 1MB read/write chunks
+    HEADER_SIZE = 16  # Bytes needed to sniff the file signature
+    
+    # Known file signatures (magic bytes) per extension
+    MAGIC_BYTES = {
+        '.pdf': (b'%PDF-',),
+        '.jpg': (b'\xff\xd8\xff',),
+        '.jpeg': (b'\xff\xd8\xff',),
+        '.png': (b'\x89PNG\r\n\x1a\n',),
+        '.tiff': (b'II*\x00', b'MM\x00*'),
+        '.docx': (b'PK\x03\x04',),
+        '.xlsx': (b'PK\x03\x04',)
+    }
     
     def __init__(self, db: Session):
         self.db = db
         self.storage_path = settings.STORAGE_PATH
-        
+    
     async def validate_file(self, file: UploadFile) -> dict:
         """
         Validate uploaded file
@@ -31,80 +50,277 @@ class IngestionService:
         
         # Check file extension
         file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in self.ALLOWED_EXTENSIONS:
-            errors.append(f"File type {file_ext} not allowed")
+        extension_error = self.extension_error(file_ext)
+        if extension_error:
+            errors.append(extension_error)
         
-        # Check file size (read first chunk to estimate)
-        content = await file.read()
+        # Check file size and signature by streaming chunks instead of reading it whole
+        file_size = 0
+        header = b""
+        while True:
+            chunk = await file.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            if not header:
+                header = chunk[:self.HEADER_SIZE]
+            file_size += len(chunk)
+            if file_size > self.MAX_FILE_SIZE:
+                errors.append(f"File size exceeds maximum allowed size of {self.MAX_FILE_SIZE / (1024*1024)}MB")
+                break
         await file.seek(0)  # Reset file pointer
         
-        if len(content) > self.MAX_FILE_SIZE:
-            errors.append(f"File size exceeds maximum allowed size of {self.MAX_FILE_SIZE / (1024*1024)}MB")
+        if file_ext in self.ALLOWED_EXTENSIONS and not self._matches_signature(file_ext, header):
+            errors.append(f"File content does not match {file_ext} format")
         
         if errors:
             return {"valid": False, "errors": errors}
         
-        return {"valid": True, "file_size": len(content), "file_type": file_ext}
+        return {"valid": True, "file_size": file_size, "file_type": file_ext}
     
     async def process_upload(self, file: UploadFile) -> dict:
         """
         Process document upload
         """
-        # Validate file
-        validation = await self.validate_file(file)
-        if not validation["valid"]:
-            raise ValueError(f"File validation failed: {validation['errors']}")
+        # Stream file to a temp file while hashing and validating it
+        staged = await self.stage_upload(file)
         
-        # Read file content
-        content = await file.read()
+        return await run_in_threadpool(self.finalize_upload, staged, file.filename)
+    
+    async def stage_upload(self, file: UploadFile) -> dict:
+        """
+        Stream an upload into a temp file in fixed-size chunks.
+        Computes the SHA-256 and enforces size and format limits on the fly,
+        so memory use stays at one chunk regardless of file size.
+        """
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        extension_error = self.extension_error(file_ext)
+        if extension_error:
+            raise ValueError(f"File validation failed: ['{extension_error}']")
+        
+        # Temp file lives in the storage directory so the final rename is atomic
+        os.makedirs(self.storage_path, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.storage_path, suffix=".part")
+        hasher = hashlib.sha256()
+        file_size = 0
         
-        # Calculate checksum
-        checksum = hashlib.sha256(content).hexdigest()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await file.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    
+                    if file_size == 0 and not self._matches_signature(file_ext, chunk[:self.HEADER_SIZE]):
+                        raise ValueError(f"File validation failed: ['File content does not match {file_ext} format']")
+                    
+                    file_size += len(chunk)
+                    if file_size > self.MAX_FILE_SIZE:
+                        raise ValueError(
+                            f"File validation failed: ['File size exceeds maximum allowed size of "
+                            f"{self.MAX_FILE_SIZE / (1024*1024)}MB']"
+                        )
+                    
+                    # Hash and write off the event loop (hashlib releases the GIL on large buffers)
+                    await run_in_threadpool(self._write_chunk, f, hasher, chunk)
+            
+            if file_size == 0:
+                raise ValueError("File validation failed: ['File is empty']")
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        
+        return {
+            "temp_path": temp_path,
+            "checksum": hasher.hexdigest(),
+            "file_size": file_size,
+            "file_ext": file_ext
+        }
+    
+    def finalize_upload(self, staged: dict, original_filename: str) -> dict:
+        """
+        Move a staged file into place and create its document record.
+        Returns the existing document instead if the checksum is a duplicate.
+        """
+        checksum = staged["checksum"]
         
         # Check for duplicates
         existing = self.db.query(Document).filter(Document.checksum == checksum).first()
         if existing:
+            self._discard(staged["temp_path"])
             return {
                 "document_id": existing.id,
                 "filename": existing.filename,
                 "duplicate": True
             }
         
-        # Determine file type
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        file_type = self._get_document_type(file_ext)
+        document = self._build_document(staged, original_filename)
         
-        # Generate unique filename
-        unique_filename = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{checksum[:8]}_{file.filename}"
+        self.db.add(document)
+        try:
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            self._discard(document.storage_path)
+            raise
+        self.db.refresh(document)
         
-        # Create storage directory if not exists
-        os.makedirs(self.storage_path, exist_ok=True)
+        return {
+            "document_id": document.id,
+            "filename": document.filename,
+            "duplicate": False
+        }
+    
+    async def process_batch(self, files: List[UploadFile]) -> list:
+        """
+        Process a batch of uploads.
+        Files are staged concurrently (bounded by INGESTION_BATCH_WORKERS), checked for
+        duplicates in a single query and inserted in one transaction.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.INGESTION_BATCH_WORKERS))
+        
+        async def stage(file: UploadFile):
+            async with semaphore:
+                try:
+                    return await self.stage_upload(file)
+                except Exception as e:
+                    return e
+        
+        staged_files = await asyncio.gather(*(stage(file) for file in files))
         
-        # Save file to storage
+        results = [None] * len(files)
+        pending = []
+        for index, (file, staged) in enumerate(zip(files, staged_files)):
+            if isinstance(staged, Exception):
+                results[index] = {
+                    "filename": file.filename,
+                    "status": "failed",
+                    "error": str(staged)
+                }
+            else:
+                pending.append((index, file.filename, staged))
+        
+        if not pending:
+            return results
+        
+        return await run_in_threadpool(self._register_batch, pending, results)
+    
+    def _register_batch(self, pending: list, results: list) -> list:
+        """
+        Check staged batch files for duplicates in one query and insert the new ones in one transaction
+        """
+        # Check all checksums for duplicates in one query
+        checksums = {staged["checksum"] for _, _, staged in pending}
+        existing = {
+            checksum: (document_id, filename)
+            for checksum, document_id, filename in self.db.query(
+                Document.checksum, Document.id, Document.filename
+            ).filter(Document.checksum.in_(checksums)).all()
+        }
+        
+        new_documents = {}  # checksum -> Document, also dedupes files repeated within the batch
+        duplicates = []
+        try:
+            for index, filename, staged in pending:
+                checksum = staged["checksum"]
+                if checksum in existing or checksum in new_documents:
+                    self._discard(staged["temp_path"])
+                    duplicates.append((index, checksum))
+                    continue
+                new_documents[checksum] = self._build_document(staged, filename)
+            
+            # Insert all new documents in a single transaction
+            self.db.add_all(new_documents.values())
+            self.db.flush()
+            inserted = {
+                checksum: (document.id, document.filename)
+                for checksum, document in new_documents.items()
+            }
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            for index, filename, staged in pending:
+                self._discard(staged["temp_path"])
+                results[index] = {
+                    "filename": filename,
+                    "status": "failed",
+                    "error": str(e)
+                }
+            for document in new_documents.values():
+                self._discard(document.storage_path)
+            return results
+        
+        duplicate_indexes = {index for index, _ in duplicates}
+        for index, filename, staged in pending:
+            checksum = staged["checksum"]
+            document_id, stored_filename = existing.get(checksum) or inserted[checksum]
+            results[index] = {
+                "filename": stored_filename,
+                "document_id": document_id,
+                "status": "success",
+                "duplicate": index in duplicate_indexes
+            }
+        
+        return results
+    
+    def _build_document(self, staged: dict, original_filename: str) -> Document:
+        """
+        Atomically rename a staged file to its final name and build the (unsaved) record
+        """
+        checksum = staged["checksum"]
+        file_type = self._get_document_type(staged["file_ext"])
+        
+        # Generate unique filename
+        unique_filename = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{checksum[:8]}_{original_filename}"
         file_path = os.path.join(self.storage_path, unique_filename)
-        with open(file_path, "wb") as f:
-            f.write(content)
+        os.replace(staged["temp_path"], file_path)
         
-        # Create database record
-        document = Document(
+        return Document(
             filename=unique_filename,
-            original_filename=file.filename,
+            original_filename=original_filename,
             file_type=file_type,
-            file_size=len(content),
+            file_size=staged["file_size"],
             status=DocumentStatus.UPLOADED,
             storage_path=file_path,
             checksum=checksum
         )
-        
-        self.db.add(document)
-        self.db.commit()
-        self.db.refresh(document)
-        
-        return {
-            "document_id": document.id,
-            "filename": document.filename,
-            "duplicate": False
-        }
+    
+    @staticmethod
+    def _write_chunk(f, hasher, chunk: bytes):
+        """
+        Update the running checksum and append a chunk to the temp file
+        """
+        hasher.update(chunk)
+        f.write(chunk)
+    
+    @staticmethod
+    def _discard(path: str):
+        """
+        Remove a temp or partially stored file, ignoring missing files
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    
+    def _matches_signature(self, file_ext: str, header: bytes) -> bool:
+        """
+        Check the leading bytes of a file against the magic numbers for its extension
+        """
+        signatures = self.MAGIC_BYTES.get(file_ext)
+        if not signatures:
+            return True
+        return any(header.startswith(signature) for signature in signatures)
+    
+    @classmethod
+    def extension_error(cls, file_ext: str) -> str:
+        """
+        Why files with this extension are rejected, or None if they are accepted
+        """
+        if file_ext in cls.LEGACY_EXTENSIONS:
+            return f"File type {file_ext} not supported; save the file as {cls.LEGACY_EXTENSIONS[file_ext]} and upload it again"
+        if file_ext not in cls.ALLOWED_EXTENSIONS:
+            return f"File type {file_ext} not allowed"
+        return None
     
     def _get_document_type(self, file_ext: str) -> DocumentType:
         """
@@ -116,9 +332,7 @@ class IngestionService:
             '.jpeg': DocumentType.IMAGE,
             '.png': DocumentType.IMAGE,
             '.tiff': DocumentType.IMAGE,
-            '.doc': DocumentType.WORD,
             '.docx': DocumentType.WORD,
-            '.xls': DocumentType.EXCEL,
             '.xlsx': DocumentType.EXCEL
         }
         return type_mapping.get(file_ext, DocumentType.OTHER)
@@ -0,0 +1,413 @@
+"""
+Durable job queues for background document processing
+Redis is used in deployments; a SQLite file backs local development and tests
+"""
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from config.settings import settings
+
+
+class JobQueue:
+    """
+    Base class for job queue backends.
+    A job moves queued -> running -> completed, or back to queued with a delay
+    until it runs out of attempts and is marked failed.
+    """
+    
+    def enqueue(self, stage: str, document_id: int, max_attempts: int = None) -> dict:
+        """
+        Add a job for a document to a stage's queue
+        """
+        raise NotImplementedError
+    
+    def claim(self, stage: str, timeout: float = 1.0) -> dict:
+        """
+        Take the next due job for a stage, waiting up to `timeout` seconds. Returns None if idle.
+        """
+        raise NotImplementedError
+    
+    def complete(self, job_id: str, result: dict = None) -> dict:
+        """
+        Mark a running job as completed
+        """
+        raise NotImplementedError
+    
+    def fail(self, job_id: str, error: str) -> dict:
+        """
+        Record a failed attempt; the job is retried with backoff until max_attempts is reached
+        """
+        raise NotImplementedError
+    
+    def get(self, job_id: str) -> dict:
+        """
+        Get a job by id, or None if it does not exist
+        """
+        raise NotImplementedError
+    
+    def requeue_stale(self, stage: str) -> int:
+        """
+        Return jobs whose worker stopped responding (claimed longer than the visibility timeout) to the queue
+        """
+        raise NotImplementedError
+    
+    def _new_job(self, stage: str, document_id: int, max_attempts: int = None) -> dict:
+        """
+        Build a fresh queued job record
+        """
+        now = time.time()
+        return {
+            "id": uuid.uuid4().hex,
+            "stage": stage,
+            "document_id": document_id,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+            "run_at": now,
+            "claimed_at": None,
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now
+        }
+    
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        """
+        Exponential retry delay in seconds
+        """
+        delay = settings.JOB_RETRY_BACKOFF * (2 ** max(attempts - 1, 0))
+        return min(delay, settings.JOB_RETRY_BACKOFF_MAX)
+    
+    @staticmethod
+    def serialize(job: dict) -> dict:
+        """
+        Job representation returned by the API
+        """
+        if not job:
+            return None
+        return {
+            "job_id": job["id"],
+            "stage": job["stage"],
+            "document_id": job["document_id"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "max_attempts": job["max_attempts"],
+            "next_run_at": datetime.utcfromtimestamp(job["run_at"]).isoformat() if job["status"] == "queued" else None,
+            "error": job["error"],
+            "result": job["result"],
+            "created_at": datetime.utcfromtimestamp(job["created_at"]).isoformat(),
+            "updated_at": datetime.utcfromtimestamp(job["updated_at"]).isoformat()
+        }
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Redis-backed queue.
+    Jobs are stored as JSON strings; each stage has a ready list, a processing list (reliable LMOVE hand-off)
+    and a sorted set of delayed retries.
+    """
+    
+    PREFIX = "jobs"
+    POLL_INTERVAL = 0.2
+    
+    # Moves the next ready job to the processing list and marks it running in one atomic step,
+    # so a job in the processing list is never left looking queued by a worker that died mid-claim.
+    # KEYS: ready list, processing list. ARGV: job key prefix, claim time.
+    CLAIM_SCRIPT = """
+    local job_id = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+    if not job_id then
+        return false
+    end
+    local data = redis.call('GET', ARGV[1] .. job_id)
+    if not data then
+        redis.call('LREM', KEYS[2], 1, job_id)
+        return false
+    end
+    local job = cjson.decode(data)
+    job['status'] = 'running'
+    job['attempts'] = job['attempts'] + 1
+    job['claimed_at'] = tonumber(ARGV[2])
+    job['updated_at'] = tonumber(ARGV[2])
+    data = cjson.encode(job)
+    redis.call('SET', ARGV[1] .. job_id, data)
+    return data
+    """
+    
+    def __init__(self, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.JOB_QUEUE_REDIS_DB,
+                decode_responses=True
+            )
+        self.redis = client
+        self._claim = self.redis.register_script(self.CLAIM_SCRIPT)
+    
+    def enqueue(self, stage: str, document_id: int, max_attempts: int = None) -> dict:
+        job = self._new_job(stage, document_id, max_attempts)
+        pipe = self.redis.pipeline()
+        pipe.set(self._job_key(job["id"]), json.dumps(job))
+        pipe.lpush(self._ready_key(stage), job["id"])
+        pipe.execute()
+        return job
+    
+    def claim(self, stage: str, timeout: float = 1.0) -> dict:
+        # Scripts cannot block, so an idle worker polls like the SQLite backend
+        deadline = time.time() + timeout
+        while True:
+            self._promote_delayed(stage)
+            data = self._claim(
+                keys=[self._ready_key(stage), self._processing_key(stage)],
+                args=[self._job_key(""), time.time()]
+            )
+            if data:
+                return json.loads(data)
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+    
+    def complete(self, job_id: str, result: dict = None) -> dict:
+        job = self.get(job_id)
+        if not job:
+            return None
+        job["status"] = "completed"
+        job["result"] = result
+        job["error"] = None
+        job["updated_at"] = time.time()
+        pipe = self.redis.pipeline()
+        pipe.set(self._job_key(job_id), json.dumps(job))
+        pipe.lrem(self._processing_key(job["stage"]), 1, job_id)
+        pipe.execute()
+        return job
+    
+    def fail(self, job_id: str, error: str) -> dict:
+        job = self.get(job_id)
+        if not job:
+            return None
+        now = time.time()
+        job["error"] = error
+        job["updated_at"] = now
+        
+        pipe = self.redis.pipeline()
+        pipe.lrem(self._processing_key(job["stage"]), 1, job_id)
+        if job["attempts"] < job["max_attempts"]:
+            job["status"] = "queued"
+            job["run_at"] = now + self._backoff(job["attempts"])
+            pipe.zadd(self._delayed_key(job["stage"]), {job_id: job["run_at"]})
+        else:
+            job["status"] = "failed"
+        pipe.set(self._job_key(job_id), json.dumps(job))
+        pipe.execute()
+        return job
+    
+    def get(self, job_id: str) -> dict:
+        data = self.redis.get(self._job_key(job_id))
+        return json.loads(data) if data else None
+    
+    def requeue_stale(self, stage: str) -> int:
+        cutoff = time.time() - settings.JOB_VISIBILITY_TIMEOUT
+        processing_key = self._processing_key(stage)
+        requeued = 0
+        for job_id in self.redis.lrange(processing_key, 0, -1):
+            job = self.get(job_id)
+            if job and job["status"] == "running":
+                if (job["claimed_at"] or 0) < cutoff:
+                    self.fail(job_id, "Worker timed out")
+                    requeued += 1
+            elif job and job["status"] == "queued":
+                # Left behind by a claim that did not finish (claims before they became atomic)
+                pipe = self.redis.pipeline()
+                pipe.lrem(processing_key, 1, job_id)
+                pipe.lpush(self._ready_key(stage), job_id)
+                pipe.execute()
+                requeued += 1
+            else:
+                # Finished or deleted jobs have nothing left to run
+                self.redis.lrem(processing_key, 1, job_id)
+        return requeued
+    
+    def _promote_delayed(self, stage: str):
+        """
+        Move retries whose backoff has elapsed onto the ready list
+        """
+        delayed_key = self._delayed_key(stage)
+        due = self.redis.zrangebyscore(delayed_key, 0, time.time())
+        for job_id in due:
+            # zrem guards against two workers promoting the same job
+            if self.redis.zrem(delayed_key, job_id):
+                self.redis.lpush(self._ready_key(stage), job_id)
+    
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.PREFIX}:job:{job_id}"
+    
+    def _ready_key(self, stage: str) -> str:
+        return f"{self.PREFIX}:ready:{stage}"
+    
+    def _processing_key(self, stage: str) -> str:
+        return f"{self.PREFIX}:processing:{stage}"
+    
+    def _delayed_key(self, stage: str) -> str:
+        return f"{self.PREFIX}:delayed:{stage}"
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    File-backed queue using SQLite, for single-node setups and tests.
+    Claims run inside an IMMEDIATE transaction so concurrent worker processes never take the same job.
+    """
+    
+    POLL_INTERVAL = 0.2
+    
+    def __init__(self, path: str = None):
+        self.path = path or settings.JOB_QUEUE_PATH
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    document_id INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    max_attempts INTEGER NOT NULL,
+                    run_at REAL NOT NULL,
+                    claimed_at REAL,
+                    error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_ready ON jobs (stage, status, run_at)")
+    
+    def enqueue(self, stage: str, document_id: int, max_attempts: int = None) -> dict:
+        job = self._new_job(stage, document_id, max_attempts)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (id, stage, document_id, status, attempts, max_attempts,
+                                  run_at, claimed_at, error, result, created_at, updated_at)
+                VALUES (:id, :stage, :document_id, :status, :attempts, :max_attempts,
+                        :run_at, :claimed_at, :error, :result, :created_at, :updated_at)
+                """,
+                job
+            )
+        return job
+    
+    def claim(self, stage: str, timeout: float = 1.0) -> dict:
+        deadline = time.time() + timeout
+        while True:
+            job = self._try_claim(stage)
+            if job or time.time() >= deadline:
+                return job
+            time.sleep(self.POLL_INTERVAL)
+    
+    def complete(self, job_id: str, result: dict = None) -> dict:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+        return self.get(job_id)
+    
+    def fail(self, job_id: str, error: str) -> dict:
+        job = self.get(job_id)
+        if not job:
+            return None
+        now = time.time()
+        if job["attempts"] < job["max_attempts"]:
+            status, run_at = "queued", now + self._backoff(job["attempts"])
+        else:
+            status, run_at = "failed", job["run_at"]
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_at = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, run_at, error, now, job_id)
+            )
+        return self.get(job_id)
+    
+    def get(self, job_id: str) -> dict:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+    
+    def requeue_stale(self, stage: str) -> int:
+        cutoff = time.time() - settings.JOB_VISIBILITY_TIMEOUT
+        stale = self._connect().execute(
+            "SELECT id FROM jobs WHERE stage = ? AND status = 'running' AND claimed_at < ?",
+            (stage, cutoff)
+        ).fetchall()
+        for (job_id,) in stale:
+            self.fail(job_id, "Worker timed out")
+        return len(stale)
+    
+    def _try_claim(self, stage: str) -> dict:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT id FROM jobs
+                WHERE stage = ? AND status = 'queued' AND run_at <= ?
+                ORDER BY run_at LIMIT 1
+                """,
+                (stage, now)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                    claimed_at = ?, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (now, now, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0]) if row else None
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        One connection per thread, in autocommit mode with explicit transactions for claims
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get the process-wide queue configured by JOB_QUEUE_BACKEND
+    """
+    global _job_queue
+    if _job_queue is None:
+        if settings.JOB_QUEUE_BACKEND == "sqlite":
+            _job_queue = SQLiteJobQueue()
+        elif settings.JOB_QUEUE_BACKEND == "redis":
+            _job_queue = RedisJobQueue()
+        else:
+            raise ValueError(f"Unknown job queue backend {settings.JOB_QUEUE_BACKEND}")
+    return _job_queue
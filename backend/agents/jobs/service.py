@@ -0,0 +1,157 @@
+"""
+Background Job Agent Service
+Queues document processing stages and runs them outside the HTTP request
+"""
+import asyncio
+from datetime import datetime
+from typing import List
+from sqlalchemy.orm import Session
+from database.models import Document, DocumentStatus
+from agents.jobs.queue import JobQueue, get_job_queue
+from common.concurrency import offload
+
+
+class JobService:
+    """
+    Service for enqueueing and executing background processing jobs
+    """
+    
+    STAGES = ["pipeline", "refresh", "ocr", "classification", "metadata", "index"]
+    
+    def __init__(self, db: Session, queue: JobQueue = None):
+        self.db = db
+        self.queue = queue or get_job_queue()
+    
+    @offload
+    def enqueue(self, stage: str, document_id: int) -> dict:
+        """
+        Queue a processing stage for a document and return the job straight away
+        """
+        self._check_stage(stage)
+        
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        
+        # Committed before the job exists, so a fast worker's PROCESSING/COMPLETED is never overwritten
+        previous = document.status
+        document.status = DocumentStatus.QUEUED
+        self.db.commit()
+        
+        try:
+            job = self.queue.enqueue(stage, document_id)
+        except Exception:
+            document.status = previous
+            self.db.commit()
+            raise
+        
+        return JobQueue.serialize(job)
+    
+    @offload
+    def enqueue_batch(self, stage: str, document_ids: List[int]) -> list:
+        """
+        Queue a processing stage for several documents
+        """
+        self._check_stage(stage)
+        
+        documents = self.db.query(Document).filter(Document.id.in_(document_ids)).all()
+        found = {document.id: document for document in documents}
+        previous = {document.id: document.status for document in documents}
+        
+        # As in enqueue, statuses are committed before any worker can see a job
+        for document in documents:
+            document.status = DocumentStatus.QUEUED
+        self.db.commit()
+        
+        results = []
+        for position, document_id in enumerate(document_ids):
+            if document_id not in found:
+                results.append({
+                    "document_id": document_id,
+                    "status": "failed",
+                    "error": f"Document {document_id} not found"
+                })
+                continue
+            try:
+                results.append(JobQueue.serialize(self.queue.enqueue(stage, document_id)))
+            except Exception:
+                # Documents whose jobs were never queued go back to their earlier status
+                for pending in set(document_ids[position:]) & found.keys():
+                    found[pending].status = previous[pending]
+                self.db.commit()
+                raise
+        
+        return results
+    
+    @offload
+    def get_job(self, job_id: str) -> dict:
+        """
+        Get the status of a job
+        """
+        return JobQueue.serialize(self.queue.get(job_id))
+    
+    def execute(self, job: dict) -> dict:
+        """
+        Run a claimed job and record the outcome on the queue and the document.
+        Failed attempts go back on the queue with backoff until the job runs out of attempts.
+        """
+        document_id = job["document_id"]
+        try:
+            self._set_status(document_id, DocumentStatus.PROCESSING)
+            result = asyncio.run(self._run_stage(job["stage"], document_id))
+            if job["stage"] != "pipeline":
+                self._set_status(document_id, DocumentStatus.COMPLETED)
+            return self.queue.complete(job["id"], result)
+        except Exception as e:
+            self.db.rollback()
+            job = self.queue.fail(job["id"], str(e))
+            retrying = job and job["status"] == "queued"
+            self._set_status(document_id, DocumentStatus.QUEUED if retrying else DocumentStatus.FAILED)
+            return job
+    
+    async def _run_stage(self, stage: str, document_id: int) -> dict:
+        """
+        Dispatch a stage to its agent service
+        """
+        # Imported here to keep the API process from loading every agent just to enqueue
+        if stage == "pipeline":
+            from agents.pipeline.service import PipelineService
+            result = await PipelineService(self.db).run(document_id)
+            if result["status"] == "failed":
+                raise RuntimeError(f"Stage {result['failed_stage']} failed: {result['error']}")
+        elif stage == "refresh":
+            from agents.pipeline.service import PipelineService
+            result = await PipelineService(self.db).refresh(document_id)
+        elif stage == "ocr":
+            from agents.ocr.service import OCRService
+            result = await OCRService(self.db).process_document(document_id)
+            result = {key: value for key, value in result.items() if key != "text"}
+        elif stage == "classification":
+            from agents.classifier.service import ClassifierService
+            result = await ClassifierService(self.db).classify(document_id)
+        elif stage == "metadata":
+            from agents.metadata.service import MetadataService
+            result = await MetadataService(self.db).extract(document_id)
+        else:
+            from agents.search.service import SearchService
+            result = await SearchService(self.db).index_document(document_id)
+        return result
+    
+    def _set_status(self, document_id: int, status: DocumentStatus):
+        """
+        Reflect job progress on the document
+        """
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            return
+        document.status = status
+        if status == DocumentStatus.COMPLETED:
+            document.processed_date = datetime.utcnow()
+        self.db.commit()
+    
+    def _check_stage(self, stage: str):
+        """
+        Reject unknown stage names
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage {stage}. Available stages: {', '.join(self.STAGES)}")
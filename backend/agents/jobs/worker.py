@@ -0,0 +1,96 @@
+"""
+Worker pool for background processing jobs
+Run with: python -m agents.jobs.worker
+"""
+import signal
+import logging
+import multiprocessing
+import time
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_concurrency(spec: str) -> dict:
+    """
+    Parse a concurrency spec such as "pipeline=2,ocr=1" into {stage: processes}
+    """
+    concurrency = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        stage, _, count = part.partition("=")
+        concurrency[stage.strip()] = int(count or 1)
+    return concurrency
+
+
+def run_worker(stage: str, stop_event):
+    """
+    Worker process loop: claim jobs for one stage and execute them until asked to stop
+    """
+    from database.connection import SessionLocal
+    from agents.jobs.queue import get_job_queue
+    from agents.jobs.service import JobService
+    
+    # Shutdown is coordinated by the parent through stop_event so the current job can finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    
+    queue = get_job_queue()
+    last_reap = 0.0
+    
+    while not stop_event.is_set():
+        if time.time() - last_reap > settings.JOB_VISIBILITY_TIMEOUT / 2:
+            queue.requeue_stale(stage)
+            last_reap = time.time()
+        
+        job = queue.claim(stage, timeout=1.0)
+        if not job:
+            continue
+        
+        db = SessionLocal()
+        try:
+            job = JobService(db, queue).execute(job)
+            logger.info("Job %s (%s, document %s): %s", job["id"], stage, job["document_id"], job["status"])
+        except Exception:
+            logger.exception("Job %s crashed the worker loop", job["id"])
+        finally:
+            db.close()
+
+
+def main():
+    """
+    Start worker processes for every stage according to WORKER_CONCURRENCY
+    """
+    from agents.jobs.service import JobService
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    concurrency = parse_concurrency(settings.WORKER_CONCURRENCY)
+    
+    stop_event = multiprocessing.Event()
+    processes = []
+    for stage, count in concurrency.items():
+        if stage not in JobService.STAGES:
+            raise ValueError(f"Unknown stage {stage} in WORKER_CONCURRENCY")
+        for index in range(count):
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(stage, stop_event),
+                name=f"worker-{stage}-{index}"
+            )
+            process.start()
+            processes.append(process)
+    
+    def shutdown(signum, frame):
+        logger.info("Shutting down workers after their current job")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Entity extractors for the Metadata Agent
+Every entity pattern is compiled once into a single alternation, so each page of text is
+scanned one time for all entity types. Matches are normalized and deduplicated per entity.
+"""
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+
+ORDINAL_SUFFIX = re.compile(r"(?<=\d)(?:st|nd|rd|th)\b", re.IGNORECASE)
+
+AMOUNT_MULTIPLIERS = {"lakh": 100_000, "lac": 100_000, "crore": 10_000_000, "cr": 10_000_000}
+
+
+class EntityExtractor:
+    """
+    One entity type: a regex without capturing groups, a confidence and a normalizer.
+    The normalizer maps a raw match to its canonical form, or None to reject the match.
+    value_type (date, number or string) selects the typed column the values are indexed in.
+    """
+    
+    def __init__(self, key: str, pattern: str, confidence: int, normalize=None, value_type: str = "string"):
+        self.key = key
+        self.pattern = pattern
+        self.confidence = confidence
+        self.normalize = normalize or (lambda value: value)
+        self.value_type = value_type
+
+
+def normalize_date(value: str) -> str:
+    """
+    Numeric (day first, as written in India) or month-name dates, either way round, to ISO format
+    """
+    # "5th March 2024": the ordinal suffix is not a month name
+    parts = re.findall(r"[A-Za-z]+|\d+", ORDINAL_SUFFIX.sub("", value))
+    try:
+        if parts[0].isalpha():
+            month, day, year = MONTHS[parts[0][:3].lower()], int(parts[1]), int(parts[2])
+        elif len(parts[0]) == 4:
+            year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
+        else:
+            day, year = int(parts[0]), int(parts[2])
+            month = int(parts[1]) if parts[1].isdigit() else MONTHS[parts[1][:3].lower()]
+        if year < 100:
+            year += 2000 if year < 50 else 1900
+        return date(year, month, day).isoformat()
+    except (KeyError, ValueError):
+        return None
+
+
+def normalize_email(value: str) -> str:
+    """
+    Email addresses are case-insensitive in practice
+    """
+    return value.lower()
+
+
+def normalize_phone(value: str) -> str:
+    """
+    Indian mobile numbers to +91XXXXXXXXXX; landlines and other numbers to their digits
+    """
+    digits = re.sub(r"\D", "", value)
+    if value.startswith("+91"):
+        digits = digits[2:]
+    elif re.fullmatch(r"0[6-9]\d{9}", value):
+        digits = digits[1:]
+    elif value.startswith("0"):
+        return digits  # Landline with STD code
+    if len(digits) == 10 and digits[0] in "6789":
+        return f"+91{digits}"
+    return digits
+
+
+def normalize_train_number(value: str) -> str:
+    """
+    "Train Set 7", "trainset no. 07" and "TS 7" to "TS-07"
+    """
+    number = int(re.search(r"\d+", value).group())
+    return f"TS-{number:02d}"
+
+
+def normalize_work_order(value: str) -> str:
+    """
+    "wo/2024/0193" or "Work Order No. 2024-193" to "WO-2024-193"
+    """
+    reference = re.sub(r"(?i)^work\s+order\s*(?:no\.?|number|#)?\s*[:.]?\s*", "", value)
+    reference = re.sub(r"[\s/]+", "-", reference.strip().upper())
+    reference = re.sub(r"^WO-?", "", reference)
+    # Serial numbers are written with and without zero padding
+    reference = re.sub(r"(?<=-)0+(?=\d+$)", "", reference)
+    return f"WO-{reference}"
+
+
+def normalize_amount(value: str) -> str:
+    """
+    Rupee amounts, including lakh and crore multipliers, to a plain figure with two decimals
+    """
+    number = re.search(r"\d[\d,]*(?:\.\d+)?", value).group().replace(",", "")
+    unit = re.search(r"(?i)(lakh|lac|crore|cr)s?$", value)
+    try:
+        amount = Decimal(number)
+    except InvalidOperation:
+        return None
+    if unit:
+        amount *= AMOUNT_MULTIPLIERS[unit.group(1).lower()]
+    return f"{amount:.2f}"
+
+
+_MONTH_NAMES = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+# Order matters where patterns can overlap: at a given position the first alternative that matches wins
+ENTITY_EXTRACTORS = [
+    EntityExtractor(
+        "emails",
+        r"\b[A-Za-z0-9._%+-]++@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
+        90,
+        normalize_email
+    ),
+    EntityExtractor(
+        "work_orders",
+        r"\b(?i:WO[-/ ]?\d{2,4}[-/]\d{1,6}|work\s+order\s*(?:no\.?|number|#)\s*[:.]?\s*[A-Z0-9][A-Z0-9/-]{2,})\b",
+        90,
+        normalize_work_order
+    ),
+    EntityExtractor(
+        "amounts",
+        r"(?i:(?:₹|\bRs\.?|\bINR)\s*\d[\d,]*(?:\.\d{1,2})?(?:\s*(?:lakhs?|lacs?|crores?|cr)\b)?)",
+        85,
+        normalize_amount,
+        "number"
+    ),
+    EntityExtractor(
+        "dates",
+        rf"\b(?:\d{{4}}-\d{{1,2}}-\d{{1,2}}|\d{{1,2}}[-/.]\d{{1,2}}[-/.]\d{{2,4}}"
+        rf"|(?i:\d{{1,2}}(?:st|nd|rd|th)?[ -]{_MONTH_NAMES}[ ,-]\s*\d{{4}})"
+        rf"|(?i:{_MONTH_NAMES}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}))\b",
+        70,
+        normalize_date,
+        "date"
+    ),
+    EntityExtractor(
+        "train_numbers",
+        r"\b(?:TS|(?i:train\s*set))\s*(?i:no\.?\s*)?[-#]?\s*\d{1,2}\b",
+        85,
+        normalize_train_number
+    ),
+    EntityExtractor(
+        "phone_numbers",
+        r"(?:\+91[\s-]?|\b0?)[6-9]\d{4}[\s-]?\d{5}\b|\b0\d{2,4}[\s-]\d{6,8}\b|\b\d{3}[-.]?\d{3}[-.]?\d{4}\b",
+        80,
+        normalize_phone
+    )
+]
+
+
+class CombinedExtractor:
+    """
+    Single-scan matcher over a list of entity extractors
+    """
+    
+    def __init__(self, extractors: list):
+        self.extractors = {f"e{i}": extractor for i, extractor in enumerate(extractors)}
+        self.pattern = re.compile("|".join(
+            f"(?P<{name}>{extractor.pattern})" for name, extractor in self.extractors.items()
+        ))
+    
+    def extract(self, pages) -> dict:
+        """
+        Normalized, deduplicated entities from a text or an iterable of page texts,
+        as {key: {"value": [...], "confidence": n}} for every entity type found
+        """
+        if isinstance(pages, str):
+            pages = (pages,)
+        
+        found = {}
+        seen = set()
+        extractors = self.extractors
+        for page in pages:
+            for match in self.pattern.finditer(page or ""):
+                # Repeated raw matches are normalized only once
+                raw = (match.lastgroup, match.group())
+                if raw in seen:
+                    continue
+                seen.add(raw)
+                
+                extractor = extractors[raw[0]]
+                value = extractor.normalize(raw[1])
+                if value is not None:
+                    # dict keeps first-seen order while deduplicating
+                    found.setdefault(extractor.key, {})[value] = None
+        
+        return {
+            extractor.key: {"value": list(found[extractor.key]), "confidence": extractor.confidence}
+            for extractor in extractors.values()
+            if extractor.key in found
+        }
+
+
+_combined = None
+
+
+def register_extractor(extractor: EntityExtractor):
+    """
+    Add an entity type. Register at import time of this module so process-pool workers have it too,
+    and bump MetadataService.EXTRACTOR_VERSION so cached results are not reused.
+    """
+    global _combined
+    ENTITY_EXTRACTORS.append(extractor)
+    _combined = None
+
+
+def value_type(key: str) -> str:
+    """
+    Declared value type of an entity key, or None for keys no extractor produces
+    """
+    for extractor in ENTITY_EXTRACTORS:
+        if extractor.key == key:
+            return extractor.value_type
+    return None
+
+
+def extract_entities(pages) -> dict:
+    """
+    Process-pool entry point: entities in a text or list of page texts, compiled once per process
+    """
+    global _combined
+    if _combined is None:
+        _combined = CombinedExtractor(ENTITY_EXTRACTORS)
+    return _combined.extract(pages)
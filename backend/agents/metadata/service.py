@@ -2,9 +2,16 @@
 Metadata Extraction Agent Service
 Extracts and manages document metadata
 """
+from sqlalchemy import insert, update, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from database.models import Document, DocumentMetadata, OCRResult
-import re
+from database.models import Document, DocumentMetadata, MetadataValue
+from common.concurrency import offload, run_cpu_bound
+from common.cache import stage_cache, content_key
+from agents.ocr.service import OCRService
+from agents.metadata.extractors import extract_entities, value_type
+from agents.metadata.values import value_rows, encode_value, decode_value
 
 
 class MetadataService:
@@ -12,10 +19,14 @@ class MetadataService:
     Service for extracting and managing document metadata
     """
     
+    EXTRACTOR_VERSION = "v2"  # Part of the stage cache key; bump when extraction rules or extractors change
+    UPSERT_CHUNK_ROWS = 500  # Rows per INSERT ... ON CONFLICT statement, within bind parameter limits
+    
     def __init__(self, db: Session):
         self.db = db
     
-    async def extract(self, document_id: int) -> dict:
+    @offload
+    def extract(self, document_id: int) -> dict:
         """
         Extract metadata from a document
         """
@@ -24,32 +35,57 @@ class MetadataService:
         if not document:
             raise ValueError(f"Document {document_id} not found")
         
-        ocr_result = self.db.query(OCRResult).filter(
-            OCRResult.document_id == document_id
-        ).first()
+        # Pages are scanned one at a time; no need to join them into one string
+        pages = OCRService(self.db).load_pages(document_id)
         
-        # Extract metadata
-        metadata = self._extract_metadata(
+        metadata = self.extract_from_text(
             document,
-            ocr_result.extracted_text if ocr_result else ""
+            pages or []
         )
-        
-        # Save metadata to database
-        for key, value in metadata.items():
-            meta = DocumentMetadata(
-                document_id=document_id,
-                key=key,
-                value=str(value["value"]),
-                extracted_by="metadata_agent",
-                confidence=value["confidence"]
-            )
-            self.db.add(meta)
-        
         self.db.commit()
         
         return {"metadata": metadata}
     
-    async def get_metadata(self, document_id: int) -> dict:
+    def extract_from_text(self, document: Document, text, use_cache: bool = True) -> dict:
+        """
+        Extract metadata for a loaded document from its text or list of page texts and stage the rows in the session.
+        The caller is responsible for committing.
+        """
+        # Extract metadata, reusing cached results for the same file, text and extractor version
+        key = content_key(document.checksum, text)
+        metadata = stage_cache.get(key, "metadata", self.EXTRACTOR_VERSION) if use_cache else None
+        if not metadata:
+            metadata = self._extract_metadata(document, text)
+            stage_cache.put(key, "metadata", self.EXTRACTOR_VERSION, metadata)
+        
+        # Re-extraction replaces the agent's earlier values; manual edits are never overwritten
+        self._upsert([
+            {
+                "document_id": document.id,
+                "key": key,
+                "value": value["value"],
+                "extracted_by": "metadata_agent",
+                "confidence": value["confidence"]
+            }
+            for key, value in metadata.items()
+        ], overwrite_manual=False)
+        self.db.query(DocumentMetadata).filter(
+            DocumentMetadata.document_id == document.id,
+            DocumentMetadata.extracted_by == "metadata_agent",
+            DocumentMetadata.key.notin_(list(metadata))
+        ).delete(synchronize_session=False)
+        # Typed values of keys that no longer exist (dropped above or deleted by a refresh)
+        self.db.query(MetadataValue).filter(
+            MetadataValue.document_id == document.id,
+            MetadataValue.key.notin_(
+                select(DocumentMetadata.key).where(DocumentMetadata.document_id == document.id)
+            )
+        ).delete(synchronize_session=False)
+        
+        return metadata
+    
+    @offload
+    def get_metadata(self, document_id: int) -> dict:
         """
         Get metadata for a document
         """
@@ -62,7 +98,7 @@ class MetadataService:
         
         metadata = {
             r.key: {
-                "value": r.value,
+                "value": decode_value(r.value),
                 "confidence": r.confidence,
                 "extracted_by": r.extracted_by
             }
@@ -74,66 +110,144 @@ class MetadataService:
             "metadata": metadata
         }
     
-    async def update_metadata(self, document_id: int, metadata: dict) -> dict:
+    @offload
+    def update_metadata(self, document_id: int, metadata: dict) -> dict:
         """
         Update metadata for a document
         """
-        for key, value in metadata.items():
-            # Check if metadata exists
-            existing = self.db.query(DocumentMetadata).filter(
-                DocumentMetadata.document_id == document_id,
-                DocumentMetadata.key == key
-            ).first()
-            
-            if existing:
-                existing.value = str(value)
-                existing.confidence = 100  # Manual update has 100% confidence
-            else:
-                meta = DocumentMetadata(
-                    document_id=document_id,
-                    key=key,
-                    value=str(value),
-                    extracted_by="manual",
-                    confidence=100
-                )
-                self.db.add(meta)
-        
-        self.db.commit()
-        return {"message": "Metadata updated successfully"}
+        return self._update_documents({document_id: metadata})
+    
+    @offload
+    def update_metadata_batch(self, updates: dict) -> dict:
+        """
+        Update metadata for several documents ({document_id: {key: value}}) in one transaction
+        """
+        return self._update_documents(updates)
     
-    def _extract_metadata(self, document: Document, text: str) -> dict:
+    def _update_documents(self, updates: dict) -> dict:
         """
-        Extract metadata from document and text
-        TODO: Implement actual metadata extraction using NER and pattern matching
+        Upsert manual values for every document and commit once; nothing is written if a document is missing
         """
-        metadata = {}
+        document_ids = list(updates)
+        found = {
+            document_id
+            for (document_id,) in self.db.query(Document.id).filter(Document.id.in_(document_ids))
+        }
+        missing = [document_id for document_id in document_ids if document_id not in found]
+        if missing:
+            raise ValueError(f"Documents not found: {', '.join(map(str, missing))}")
         
-        # Extract dates
-        date_pattern = r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b'
-        dates = re.findall(date_pattern, text)
-        if dates:
-            metadata["dates"] = {
-                "value": dates,
-                "confidence": 70
+        rows = [
+            {
+                "document_id": document_id,
+                "key": key,
+                "value": value,
+                "extracted_by": "manual",
+                "confidence": 100  # Manual update has 100% confidence
             }
+            for document_id, metadata in updates.items()
+            for key, value in metadata.items()
+        ]
+        try:
+            self._upsert(rows, overwrite_manual=True)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         
-        # Extract emails
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        if emails:
-            metadata["emails"] = {
-                "value": emails,
-                "confidence": 90
-            }
+        return {
+            "message": "Metadata updated successfully",
+            "documents": len(updates),
+            "keys": len(rows)
+        }
+    
+    def _upsert(self, rows: list, overwrite_manual: bool):
+        """
+        Insert or update rows on (document_id, key) with set-based statements and replace the
+        typed MetadataValue rows of every key written. Values are stored as JSON.
+        PostgreSQL and SQLite use INSERT ... ON CONFLICT DO UPDATE; other databases look up
+        existing keys in one query and bulk insert/update. Manual values are left alone
+        unless overwrite_manual is set. The caller is responsible for committing.
+        """
+        # The last value for a key wins; ON CONFLICT cannot touch the same row twice in one statement
+        rows = {(row["document_id"], row["key"]): row for row in rows}
+        if not overwrite_manual and rows:
+            manual = self.db.query(DocumentMetadata.document_id, DocumentMetadata.key).filter(
+                DocumentMetadata.document_id.in_({document_id for document_id, _ in rows}),
+                DocumentMetadata.extracted_by == "manual"
+            )
+            for document_id, key in manual:
+                rows.pop((document_id, key), None)
+        if not rows:
+            return
         
-        # Extract phone numbers
-        phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-        phones = re.findall(phone_pattern, text)
-        if phones:
-            metadata["phone_numbers"] = {
-                "value": phones,
-                "confidence": 80
-            }
+        values = [
+            value_row
+            for row in rows.values()
+            for value_row in value_rows(row["document_id"], row["key"], row["value"], value_type(row["key"]))
+        ]
+        rows = [{**row, "value": encode_value(row["value"]), "is_stale": False} for row in rows.values()]
+        
+        dialect = self.db.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            self._upsert_portable(rows, overwrite_manual)
+        else:
+            dialect_insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            for i in range(0, len(rows), self.UPSERT_CHUNK_ROWS):
+                statement = dialect_insert(DocumentMetadata).values(rows[i:i + self.UPSERT_CHUNK_ROWS])
+                statement = statement.on_conflict_do_update(
+                    index_elements=["document_id", "key"],
+                    set_={
+                        "value": statement.excluded.value,
+                        "extracted_by": statement.excluded.extracted_by,
+                        "confidence": statement.excluded.confidence,
+                        "is_stale": False
+                    },
+                    where=None if overwrite_manual else DocumentMetadata.extracted_by != "manual"
+                )
+                self.db.execute(statement)
+        
+        self.db.query(MetadataValue).filter(
+            tuple_(MetadataValue.document_id, MetadataValue.key).in_(
+                [(row["document_id"], row["key"]) for row in rows]
+            )
+        ).delete(synchronize_session=False)
+        if values:
+            self.db.execute(insert(MetadataValue), values)
+    
+    def _upsert_portable(self, rows: list, overwrite_manual: bool):
+        """
+        Upsert for databases without ON CONFLICT: one lookup, then one bulk update and one bulk insert
+        """
+        existing = {
+            (row.document_id, row.key): row
+            for row in self.db.query(
+                DocumentMetadata.id, DocumentMetadata.document_id, DocumentMetadata.key, DocumentMetadata.extracted_by
+            ).filter(
+                DocumentMetadata.document_id.in_({row["document_id"] for row in rows}),
+                DocumentMetadata.key.in_({row["key"] for row in rows})
+            )
+        }
+        
+        updates, inserts = [], []
+        for row in rows:
+            current = existing.get((row["document_id"], row["key"]))
+            if current is None:
+                inserts.append(row)
+            elif overwrite_manual or current.extracted_by != "manual":
+                updates.append({"id": current.id, **row})
+        
+        if updates:
+            self.db.execute(update(DocumentMetadata), updates)
+        if inserts:
+            self.db.execute(insert(DocumentMetadata), inserts)
+    
+    def _extract_metadata(self, document: Document, text) -> dict:
+        """
+        Extract metadata from document and text (a string or a list of page texts)
+        """
+        pages = [text] if isinstance(text, str) else text
+        metadata = run_cpu_bound(extract_entities, pages, work_size=sum(len(page) for page in pages))
         
         # Document properties
         metadata["file_size"] = {
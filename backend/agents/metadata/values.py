@@ -0,0 +1,138 @@
+"""
+Typed metadata values for the Metadata Agent
+Every extracted or manual value is also stored as its own MetadataValue row with date, number
+and text columns, so searches can filter on metadata through the (key, typed value) indexes.
+"""
+import re
+import json
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select, or_
+from database.models import Document, MetadataValue
+from agents.metadata.extractors import AMOUNT_MULTIPLIERS
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# Filter literals may use Indian shorthand: 1L, 2.5Cr, 3 lakh
+FILTER_NUMBER = re.compile(r"(-?\d+(?:\.\d+)?)\s*(l|lakhs?|lacs?|cr|crores?)?", re.IGNORECASE)
+MAX_TEXT_LENGTH = 500
+
+
+def encode_value(value) -> str:
+    """
+    Stored form of a DocumentMetadata value: JSON, so lists and numbers round-trip
+    """
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def decode_value(stored: str):
+    """
+    Value of a DocumentMetadata row; rows written before values were JSON are returned as stored
+    """
+    try:
+        return json.loads(stored)
+    except (TypeError, ValueError):
+        return stored
+
+
+def typed_columns(value, value_type: str = None) -> dict:
+    """
+    value_text/value_date/value_number for one value. The type is inferred (ISO dates, numbers)
+    unless the extractor declared it; text that does not parse as its declared type stays text only.
+    """
+    if isinstance(value, (dict, list)):
+        text = encode_value(value)
+    else:
+        text = str(value)
+    columns = {"value_text": text[:MAX_TEXT_LENGTH], "value_date": None, "value_number": None}
+    
+    if isinstance(value, bool) or value is None or value_type == "string":
+        return columns
+    
+    if isinstance(value, (int, float, Decimal)):
+        columns["value_number"] = Decimal(str(value))
+    elif isinstance(value, str) and value_type in (None, "date") and ISO_DATE.fullmatch(value):
+        try:
+            columns["value_date"] = date.fromisoformat(value)
+        except ValueError:
+            pass
+    elif isinstance(value, str) and value_type in (None, "number") and NUMBER.fullmatch(value):
+        columns["value_number"] = Decimal(value)
+    return columns
+
+
+def value_rows(document_id: int, key: str, value, value_type: str = None) -> list:
+    """
+    MetadataValue rows for a metadata entry: one per element of a list value
+    """
+    values = value if isinstance(value, list) else [value]
+    return [
+        {"document_id": document_id, "key": key, "position": position, **typed_columns(item, value_type)}
+        for position, item in enumerate(values)
+    ]
+
+
+def parse_bound(literal: str) -> tuple:
+    """
+    (column name, typed value) for a filter literal: ISO date, number, or text
+    """
+    if ISO_DATE.fullmatch(literal):
+        try:
+            return "value_date", date.fromisoformat(literal)
+        except ValueError:
+            raise ValueError(f"Invalid date {literal}")
+    number = FILTER_NUMBER.fullmatch(literal)
+    if number:
+        amount = Decimal(number.group(1))
+        if number.group(2):
+            unit = number.group(2).lower().rstrip("s")
+            amount *= AMOUNT_MULTIPLIERS["lakh" if unit == "l" else unit]
+        return "value_number", amount
+    return "value_text", literal
+
+
+FILTER_PATTERN = re.compile(r"(?P<key>[^:]+):(?P<op>>=|<=|>|<)?(?P<value>.*)")
+
+
+def metadata_filter(spec: str):
+    """
+    Condition on Document for a filter such as "dates:2024-03-01..2024-03-31", "amounts:>=100000"
+    or "department:Finance". Resolved by an index range scan on (key, typed value) that yields
+    document ids, rather than by parsing every metadata row.
+    """
+    match = FILTER_PATTERN.fullmatch(spec.strip())
+    if not match or not match.group("value"):
+        raise ValueError(f"Invalid metadata filter {spec}; expected key:value, key:>=value or key:low..high")
+    
+    key, op, literal = match.group("key").strip(), match.group("op"), match.group("value").strip()
+    conditions = [MetadataValue.key == key]
+    
+    if op:
+        column_name, bound = parse_bound(literal)
+        column = getattr(MetadataValue, column_name)
+        conditions.append({
+            ">=": column >= bound,
+            "<=": column <= bound,
+            ">": column > bound,
+            "<": column < bound
+        }[op])
+    elif ".." in literal:
+        low, _, high = (bound.strip() for bound in literal.partition(".."))
+        bounds = {"low": parse_bound(low) if low else None, "high": parse_bound(high) if high else None}
+        columns = {bound[0] for bound in bounds.values() if bound}
+        if len(columns) != 1 or columns == {"value_text"}:
+            raise ValueError(f"Invalid metadata range {literal}; bounds must both be dates or numbers")
+        column = getattr(MetadataValue, columns.pop())
+        if bounds["low"]:
+            conditions.append(column >= bounds["low"][1])
+        if bounds["high"]:
+            conditions.append(column <= bounds["high"][1])
+    else:
+        column_name, value = parse_bound(literal)
+        if column_name == "value_text":
+            conditions.append(MetadataValue.value_text == value)
+        else:
+            # Values declared as text (e.g. phone numbers) only have value_text set
+            conditions.append(or_(getattr(MetadataValue, column_name) == value, MetadataValue.value_text == literal))
+    
+    return Document.id.in_(select(MetadataValue.document_id).where(*conditions))
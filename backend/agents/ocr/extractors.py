@@ -0,0 +1,105 @@
+"""
+Native text extraction
+Reads the embedded text of born-digital documents so OCR only runs where it is needed
+"""
+import os
+import time
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def extract_text_pages(file_path: str) -> list:
+    """
+    Extract the embedded text of a document page by page.
+    Returns a list of page dicts (like the OCR engines produce), or None when the
+    format has no text layer or the file cannot be parsed.
+    PDF pages without usable text come back with empty text so the caller can OCR them,
+    and a document without any text (an empty DOCX or workbook) comes back as one empty page.
+    """
+    extractors = {
+        ".pdf": _pdf_pages,
+        ".docx": _docx_pages,
+        ".xlsx": _xlsx_pages
+    }
+    extractor = extractors.get(os.path.splitext(file_path)[1].lower())
+    if not extractor:
+        return None
+    
+    pages = []
+    start_time = time.time()
+    try:
+        for page_number, text in enumerate(extractor(file_path), start=1):
+            pages.append({
+                "page_number": page_number,
+                "text": text,
+                "confidence": 100,
+                "processing_time": int((time.time() - start_time) * 1000),  # in milliseconds
+                "method": "text_layer"
+            })
+            start_time = time.time()
+    except Exception:
+        # Damaged, encrypted or mislabelled files are left to the OCR engine
+        return None
+    
+    # Later stages expect at least one OCR result per document
+    return pages or [{"page_number": 1, "text": "", "confidence": 100, "processing_time": 0, "method": "text_layer"}]
+
+
+def _pdf_pages(file_path: str):
+    """
+    Yield the text layer of each PDF page
+    """
+    from pypdf import PdfReader
+    
+    reader = PdfReader(file_path)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _docx_pages(file_path: str):
+    """
+    Stream paragraphs out of word/document.xml, splitting pages on explicit page breaks
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        lines = []
+        paragraph = []
+        for _, element in iterparse(xml, events=("end",)):
+            if element.tag == WORD_NAMESPACE + "t":
+                paragraph.append(element.text or "")
+            elif element.tag == WORD_NAMESPACE + "tab":
+                paragraph.append("\t")
+            elif element.tag == WORD_NAMESPACE + "br" and element.get(WORD_NAMESPACE + "type") == "page":
+                lines.append("".join(paragraph))
+                paragraph = []
+                yield "\n".join(lines)
+                lines = []
+            elif element.tag == WORD_NAMESPACE + "p":
+                lines.append("".join(paragraph))
+                paragraph = []
+                element.clear()
+        
+        if lines:
+            yield "\n".join(lines)
+
+
+def _xlsx_pages(file_path: str):
+    """
+    Yield one page per worksheet, streaming rows in read-only mode
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            lines = [sheet.title]
+            for row in sheet.iter_rows(values_only=True):
+                cells = [str(value) for value in row if value is not None]
+                if cells:
+                    lines.append("\t".join(cells))
+            yield "\n".join(lines)
+    finally:
+        workbook.close()
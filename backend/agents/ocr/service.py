@@ -2,9 +2,21 @@
 OCR (Optical Character Recognition) Agent Service
 Extracts text from images and PDFs
 """
+import re
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
-from database.models import Document, OCRResult, DocumentStatus
-import time
+from database.models import (
+    Document, OCRResult, DocumentStatus, DocumentType,
+    DocumentClassification, DocumentMetadata, SearchIndex
+)
+from common.concurrency import offload, get_process_pool, run_cpu_bound
+from common.cache import stage_cache
+from config.settings import settings
+from agents.ocr.engines import get_engine, ocr_pages_task
+from agents.ocr.preprocessing import get_profile
+from agents.ocr.extractors import extract_text_pages
+
+LANGUAGES = re.compile(r"[A-Za-z_]+(?:\+[A-Za-z_]+)*")  # Tesseract language codes joined with +
 
 
 class OCRService:
@@ -15,7 +27,22 @@ class OCRService:
     def __init__(self, db: Session):
         self.db = db
     
-    async def process_document(self, document_id: int) -> dict:
+    @property
+    def engine(self):
+        """
+        Configured OCR engine (loaded on first use)
+        """
+        return get_engine()
+    
+    @property
+    def engine_version(self) -> str:
+        """
+        Engine name and version, part of the stage cache key
+        """
+        return f"{self.engine.name}-{self.engine.version()}"
+    
+    @offload
+    def process_document(self, document_id: int, use_cache: bool = True) -> dict:
         """
         Process OCR for a document
         """
@@ -28,43 +55,128 @@ class OCRService:
         document.status = DocumentStatus.PROCESSING
         self.db.commit()
         
-        start_time = time.time()
-        
-        # TODO: Implement actual OCR processing
-        # This is a placeholder that simulates OCR processing
-        extracted_text = self._simulate_ocr(document.storage_path)
-        confidence = 85  # Simulated confidence score
-        pages = 1  # Number of pages processed
-        
-        processing_time = int((time.time() - start_time) * 1000)  # in milliseconds
-        
-        # Save OCR results
-        ocr_result = OCRResult(
-            document_id=document_id,
-            extracted_text=extracted_text,
-            confidence_score=confidence,
-            page_number=1,
-            processing_time=processing_time
-        )
+        result = self.run_ocr(document, use_cache=use_cache)
         
-        self.db.add(ocr_result)
         document.status = DocumentStatus.COMPLETED
         self.db.commit()
         
+        return result
+    
+    def run_ocr(self, document: Document, use_cache: bool = True) -> dict:
+        """
+        Extract text from a loaded document and stage the results in the session.
+        Results are reused from the stage cache when the same file was already processed
+        by the current engine version. Existing OCR results of the document are replaced.
+        The caller is responsible for committing.
+        """
+        cached = stage_cache.get(document.checksum, "ocr", self.engine_version) if use_cache else None
+        if cached:
+            pages = cached["pages"]
+        else:
+            pages = self._extract_pages(document)
+            stage_cache.put(document.checksum, "ocr", self.engine_version, {"pages": pages})
+        
+        # Replace any earlier run's pages, then save one row per page in a single bulk insert
+        self.db.query(OCRResult).filter(OCRResult.document_id == document.id).delete(synchronize_session=False)
+        if pages:
+            self.db.execute(insert(OCRResult), [
+                {
+                    "document_id": document.id,
+                    "extracted_text": page["text"],
+                    "confidence_score": page["confidence"],
+                    "page_number": page["page_number"],
+                    "processing_time": page["processing_time"]
+                }
+                for page in pages
+            ])
+        
         return {
-            "text": extracted_text,
-            "confidence": confidence,
-            "pages": pages,
-            "processing_time": processing_time
+            "text": "\n".join(page["text"] for page in pages),
+            "confidence": int(sum(page["confidence"] for page in pages) / len(pages)) if pages else 0,
+            "pages": len(pages),
+            "processing_time": sum(page["processing_time"] for page in pages),
+            "ocr_pages": sum(1 for page in pages if page.get("method") == "ocr"),
+            "cached": bool(cached)
         }
     
-    async def get_result(self, document_id: int) -> dict:
+    def _extract_pages(self, document: Document) -> list:
+        """
+        Extract text page by page.
+        Born-digital PDFs, DOCX and XLSX are read from their text layer; only PDF pages
+        without usable text (scans) go through the OCR engine.
+        """
+        pages = run_cpu_bound(extract_text_pages, document.storage_path, work_size=document.file_size)
+        if pages is None:
+            if document.file_type not in (DocumentType.PDF, DocumentType.IMAGE):
+                # Only PDFs and images can be rasterised for the OCR engine
+                raise ValueError(f"No text could be extracted from {document.original_filename}: the file is damaged or in an unsupported format")
+            page_count = self.engine.count_pages(document.storage_path, document.file_type.value)
+            return self._ocr_pages(document, range(1, page_count + 1))
+        
+        if document.file_type != DocumentType.PDF:
+            return pages
+        
+        for page in self._ocr_pages(document, self._scanned_pages(pages)):
+            pages[page["page_number"] - 1] = page
+        return pages
+    
+    @staticmethod
+    def _scanned_pages(pages: list) -> list:
+        """
+        Numbers of the text layer pages without usable text, which are OCRed instead
+        """
+        return [
+            page["page_number"] for page in pages
+            if len(page["text"].strip()) < settings.TEXT_LAYER_MIN_CHARS
+        ]
+    
+    def _ocr_page_numbers(self, document: Document, page_numbers) -> set:
+        """
+        Those of page_numbers whose stored text came from the OCR engine rather than a PDF text layer
+        """
+        page_numbers = set(page_numbers)
+        if document.file_type == DocumentType.PDF:
+            pages = run_cpu_bound(extract_text_pages, document.storage_path, work_size=document.file_size)
+            if pages is not None:
+                return page_numbers & set(self._scanned_pages(pages))
+        return page_numbers
+    
+    def _ocr_pages(self, document: Document, page_numbers, overrides: dict = None, language: str = None) -> list:
+        """
+        Preprocess and OCR the given pages, fanning batches of pages out to the process pool.
+        overrides replace preprocessing profile keys and language the configured OCR_LANGUAGES.
+        """
+        file_type = document.file_type.value
+        page_numbers = list(page_numbers)
+        profile = get_profile(file_type, overrides)
+        
+        if not self.engine.parallel or len(page_numbers) <= 1:
+            return ocr_pages_task(self.engine.name, document.storage_path, file_type, page_numbers, profile, language)
+        
+        batch_size = max(1, settings.OCR_PAGE_BATCH_SIZE)
+        pool = get_process_pool()
+        futures = [
+            pool.submit(
+                ocr_pages_task,
+                self.engine.name,
+                document.storage_path,
+                file_type,
+                page_numbers[i:i + batch_size],
+                profile,
+                language
+            )
+            for i in range(0, len(page_numbers), batch_size)
+        ]
+        return [page for future in futures for page in future.result()]
+    
+    @offload
+    def get_result(self, document_id: int) -> dict:
         """
         Get OCR results for a document
         """
         results = self.db.query(OCRResult).filter(
             OCRResult.document_id == document_id
-        ).all()
+        ).order_by(OCRResult.page_number).all()
         
         if not results:
             return None
@@ -81,20 +193,163 @@ class OCRService:
             ]
         }
     
-    async def reprocess_document(self, document_id: int) -> dict:
+    def load_text(self, document_id: int) -> str:
+        """
+        Full OCR text of a document (pages in order), or None if it has not been processed
+        """
+        pages = self.load_pages(document_id)
+        return "\n".join(pages) if pages is not None else None
+    
+    def load_pages(self, document_id: int) -> list:
+        """
+        OCR text of each page in order, or None if the document has not been processed
+        """
+        pages = self.db.query(OCRResult.extracted_text).filter(
+            OCRResult.document_id == document_id
+        ).order_by(OCRResult.page_number).all()
+        
+        if not pages:
+            return None
+        
+        return [text or "" for (text,) in pages]
+    
+    def load_texts(self, document_ids: list) -> dict:
+        """
+        Full OCR text for several documents in one query, keyed by document id.
+        Documents without OCR results are left out.
+        """
+        texts = {}
+        rows = self.db.query(OCRResult.document_id, OCRResult.extracted_text).filter(
+            OCRResult.document_id.in_(document_ids)
+        ).order_by(OCRResult.document_id, OCRResult.page_number)
+        for document_id, text in rows:
+            texts.setdefault(document_id, []).append(text or "")
+        return {document_id: "\n".join(pages) for document_id, pages in texts.items()}
+    
+    async def reprocess_document(self, document_id: int, force: bool = False) -> dict:
         """
         Reprocess OCR for a document
+        Cached results for the same file and engine version are reused unless force is set.
         """
         # Delete existing results
-        self.db.query(OCRResult).filter(OCRResult.document_id == document_id).delete()
-        self.db.commit()
+        await self._delete_results(document_id)
         
         # Process again
-        return await self.process_document(document_id)
+        return await self.process_document(document_id, use_cache=not force)
+    
+    @offload
+    def reprocess_pages(
+        self,
+        document_id: int,
+        pages: list = None,
+        below_confidence: int = None,
+        overrides: dict = None,
+        language: str = None
+    ) -> dict:
+        """
+        Re-OCR selected pages (explicit page numbers and/or pages below a confidence threshold).
+        OCR is deterministic, so a poorly recognised page only improves with other settings:
+        overrides replace preprocessing profile keys (target_dpi, deskew, binarize, ...) and
+        language the Tesseract languages for this run.
+        Only those OCRResult rows are replaced; downstream results are marked stale so
+        they can be refreshed incrementally.
+        """
+        if not pages and below_confidence is None:
+            raise ValueError("Specify pages or below_confidence")
+        if language is not None and not LANGUAGES.fullmatch(language):
+            raise ValueError(f"Invalid OCR language {language}; use Tesseract codes such as eng or eng+mal")
+        
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        if document.file_type not in (DocumentType.PDF, DocumentType.IMAGE):
+            raise ValueError(f"Document {document_id} is read from its text layer; only PDF and image pages are OCRed")
+        
+        results = {
+            r.page_number: r
+            for r in self.db.query(OCRResult).filter(OCRResult.document_id == document_id).all()
+        }
+        if not results:
+            raise ValueError(f"OCR results not found for document {document_id}")
+        
+        selected = set(pages or [])
+        unknown = selected - results.keys()
+        if unknown:
+            raise ValueError(f"Pages not found for document {document_id}: {sorted(unknown)}")
+        
+        # Pages read from a PDF text layer are exact already and never went through the engine
+        ocr_page_numbers = self._ocr_page_numbers(document, results.keys())
+        text_layer = selected - ocr_page_numbers
+        if text_layer:
+            raise ValueError(f"Pages of document {document_id} read from the text layer: {sorted(text_layer)}")
+        if below_confidence is not None:
+            selected.update(
+                number for number in ocr_page_numbers
+                if (results[number].confidence_score or 0) < below_confidence
+            )
+        
+        if not selected:
+            return {"document_id": document_id, "pages": [], "stale": []}
+        
+        previous = {number: results[number].confidence_score for number in selected}
+        pages = self._ocr_pages(document, sorted(selected), overrides, language)
+        
+        self.db.execute(update(OCRResult), [
+            {
+                "id": results[page["page_number"]].id,
+                "extracted_text": page["text"],
+                "confidence_score": page["confidence"],
+                "processing_time": page["processing_time"]
+            }
+            for page in pages
+        ])
+        stale = self._mark_downstream_stale(document_id)
+        self.db.commit()
+        
+        # Keep the cached pages of this file in step, so a later run_ocr does not bring back the
+        # replaced pages; later stages key their cache entries by the text itself
+        cached = stage_cache.get(document.checksum, "ocr", self.engine_version)
+        if cached:
+            for page in pages:
+                cached["pages"][page["page_number"] - 1] = page
+            stage_cache.put(document.checksum, "ocr", self.engine_version, cached)
+        
+        return {
+            "document_id": document_id,
+            "pages": [
+                {
+                    "page": page["page_number"],
+                    "previous_confidence": previous[page["page_number"]],
+                    "confidence": page["confidence"]
+                }
+                for page in pages
+            ],
+            "stale": stale
+        }
     
-    def _simulate_ocr(self, file_path: str) -> str:
+    def _mark_downstream_stale(self, document_id: int) -> list:
         """
-        Placeholder for actual OCR implementation
-        In production, this would use Tesseract, AWS Textract, or other OCR engines
+        Flag results derived from the OCR text as stale; returns the affected stages
         """
-        return f"Extracted text from document at {file_path}. This is a placeholder for actual OCR processing."
+        stale = []
+        stages = [
+            ("classification", DocumentClassification, DocumentClassification.document_id == document_id),
+            ("metadata", DocumentMetadata, (DocumentMetadata.document_id == document_id) & (DocumentMetadata.extracted_by != "manual")),
+            ("index", SearchIndex, SearchIndex.document_id == document_id)
+        ]
+        for stage, model, condition in stages:
+            updated = self.db.query(model).filter(condition).update(
+                {model.is_stale: True},
+                synchronize_session=False
+            )
+            if updated:
+                stale.append(stage)
+        return stale
+    
+    @offload
+    def _delete_results(self, document_id: int):
+        """
+        Delete all OCR results for a document
+        """
+        self.db.query(OCRResult).filter(OCRResult.document_id == document_id).delete()
+        self.db.commit()
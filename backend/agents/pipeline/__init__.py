@@ -0,0 +1,3 @@
+from .service import PipelineService
+
+__all__ = ["PipelineService"]
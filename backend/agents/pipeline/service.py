@@ -0,0 +1,223 @@
+"""
+Document Pipeline Agent Service
+Runs OCR, classification, metadata extraction and indexing for a document in one process
+"""
+import time
+from datetime import datetime
+from typing import List
+from sqlalchemy.orm import Session
+from database.models import Document, DocumentStatus, DocumentClassification, DocumentMetadata, SearchIndex
+from agents.ocr.service import OCRService
+from agents.classifier.service import ClassifierService
+from agents.metadata.service import MetadataService
+from agents.search.service import SearchService
+from agents.dedup.service import DedupService
+from common.concurrency import offload
+
+
+class PipelineService:
+    """
+    Service that chains the processing agents over a shared session.
+    The document and its OCR text are loaded once and handed from stage to stage,
+    with one commit at each stage boundary.
+    """
+    
+    STAGES = ["ocr", "classification", "metadata", "index"]
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.ocr_service = OCRService(db)
+        self.classifier_service = ClassifierService(db)
+        self.metadata_service = MetadataService(db)
+        self.search_service = SearchService(db)
+        self.dedup_service = DedupService(db)
+    
+    @offload
+    def run(self, document_id: int) -> dict:
+        """
+        Run the full pipeline for a document
+        """
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        
+        return self._run_document(document)
+    
+    @offload
+    def run_batch(self, document_ids: List[int]) -> list:
+        """
+        Run the full pipeline for several documents, reporting each result separately
+        """
+        documents = {
+            document.id: document
+            for document in self.db.query(Document).filter(Document.id.in_(document_ids)).all()
+        }
+        
+        results = []
+        for document_id in document_ids:
+            document = documents.get(document_id)
+            if not document:
+                results.append({
+                    "document_id": document_id,
+                    "status": "failed",
+                    "error": f"Document {document_id} not found"
+                })
+                continue
+            results.append(self._run_document(document))
+        
+        return results
+    
+    @offload
+    def refresh(self, document_id: int) -> dict:
+        """
+        Re-run only the stages whose results were marked stale by page-level OCR reprocessing
+        """
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        
+        text = self.ocr_service.load_text(document_id)
+        if text is None:
+            raise ValueError(f"OCR results not found for document {document_id}")
+        
+        stale_classification = self.db.query(DocumentClassification).filter(
+            DocumentClassification.document_id == document_id,
+            DocumentClassification.is_stale.is_(True)
+        )
+        stale_metadata = self.db.query(DocumentMetadata).filter(
+            DocumentMetadata.document_id == document_id,
+            DocumentMetadata.is_stale.is_(True)
+        )
+        stale_index = self.db.query(SearchIndex).filter(
+            SearchIndex.document_id == document_id,
+            SearchIndex.is_stale.is_(True)
+        )
+        
+        refreshed = {}
+        timings = {}
+        
+        # Stage cache keys include the text, so results of the text before reprocessing are not reused
+        if stale_classification.count():
+            start = time.perf_counter()
+            stale_classification.delete(synchronize_session=False)
+            refreshed["classification"] = self.classifier_service.classify_text(document, text)
+            self.db.commit()
+            timings["classification"] = self._elapsed_ms(start)
+        
+        if stale_metadata.count():
+            start = time.perf_counter()
+            stale_metadata.delete(synchronize_session=False)
+            refreshed["metadata"] = self.metadata_service.extract_from_text(document, text)
+            self.db.commit()
+            timings["metadata"] = self._elapsed_ms(start)
+        
+        if stale_index.count():
+            start = time.perf_counter()
+            self.search_service.index_text(document, text)
+            refreshed["index"] = True
+            self.db.commit()
+            timings["index"] = self._elapsed_ms(start)
+        
+        return {
+            "document_id": document_id,
+            "refreshed": refreshed,
+            "timings": timings
+        }
+    
+    def _run_document(self, document: Document) -> dict:
+        """
+        Execute every stage for a loaded document
+        """
+        timings = {}
+        pipeline_start = time.perf_counter()
+        
+        # Keep the loaded document usable across stage commits instead of reloading it each time
+        expire_on_commit = self.db.expire_on_commit
+        self.db.expire_on_commit = False
+        try:
+            return self._run_stages(document, timings, pipeline_start)
+        finally:
+            self.db.expire_on_commit = expire_on_commit
+    
+    def _run_stages(self, document: Document, timings: dict, pipeline_start: float) -> dict:
+        """
+        Run the stages in order, committing after each one
+        """
+        document_id = document.id
+        document.status = DocumentStatus.PROCESSING
+        self.db.commit()
+        
+        stage = None
+        try:
+            stage = "ocr"
+            start = time.perf_counter()
+            ocr = self.ocr_service.run_ocr(document)
+            self.db.commit()
+            timings[stage] = self._elapsed_ms(start)
+            text = ocr["text"]
+            
+            stage = "classification"
+            start = time.perf_counter()
+            # A re-run replaces the document's results instead of adding another set
+            self.db.query(DocumentClassification).filter(
+                DocumentClassification.document_id == document_id
+            ).delete(synchronize_session=False)
+            classification = self.classifier_service.classify_text(document, text)
+            self.db.commit()
+            timings[stage] = self._elapsed_ms(start)
+            
+            stage = "metadata"
+            start = time.perf_counter()
+            # Agent values are upserted per key and dropped keys deleted; manual edits are kept
+            metadata = self.metadata_service.extract_from_text(document, text)
+            self.db.commit()
+            timings[stage] = self._elapsed_ms(start)
+            
+            stage = "index"
+            start = time.perf_counter()
+            self.search_service.index_text(document, text)
+            document.status = DocumentStatus.COMPLETED
+            document.processed_date = datetime.utcnow()
+            self.db.commit()
+            timings[stage] = self._elapsed_ms(start)
+        except Exception as e:
+            self.db.rollback()
+            document.status = DocumentStatus.FAILED
+            self.db.commit()
+            timings["total"] = self._elapsed_ms(pipeline_start)
+            return {
+                "document_id": document_id,
+                "status": "failed",
+                "failed_stage": stage,
+                "error": str(e),
+                "timings": timings
+            }
+        
+        # Signed during indexing; flags rescans of documents already in the corpus
+        start = time.perf_counter()
+        near_duplicates = self.dedup_service.near_duplicates(document_id) or []
+        timings["dedup"] = self._elapsed_ms(start)
+        
+        timings["total"] = self._elapsed_ms(pipeline_start)
+        
+        return {
+            "document_id": document_id,
+            "status": "completed",
+            "ocr": {
+                "text_length": len(text),
+                "confidence": ocr["confidence"],
+                "pages": ocr["pages"],
+                "ocr_pages": ocr["ocr_pages"]
+            },
+            "classification": classification,
+            "metadata": metadata,
+            "near_duplicates": near_duplicates,
+            "timings": timings
+        }
+    
+    @staticmethod
+    def _elapsed_ms(start: float) -> int:
+        """
+        Milliseconds elapsed since a perf_counter reading
+        """
+        return int((time.perf_counter() - start) * 1000)
@@ -0,0 +1,304 @@
+"""
+Full-text search backends for the Search Agent
+The local inverted index is the default; SQLite FTS5 suits single-node setups and tests,
+and PostgreSQL tsvector + GIN keeps the index inside the application database (its table is
+created by the migrations).
+
+Rebuild the configured backend from the database with: python -m agents.search.backends --rebuild
+"""
+import json
+import logging
+import argparse
+import sqlite3
+import threading
+from sqlalchemy import MetaData, Table, Column, Integer, Index, select, func
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert
+from config.settings import settings
+from agents.search.inverted_index import InvertedIndex, analyze
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBackend:
+    """
+    Base class for full-text search backends.
+    Documents are indexed by id; indexing a document again replaces it. Queries match
+    documents containing any analyzed query term and rank them best first.
+    """
+    
+    name = None
+    
+    def index_documents(self, documents: list):
+        """
+        Index [(document_id, text)] in one bulk write
+        """
+        raise NotImplementedError
+    
+    def delete_documents(self, document_ids: list):
+        """
+        Remove documents from the index
+        """
+        raise NotImplementedError
+    
+    def search(self, query: str, top_k: int = 10) -> tuple:
+        """
+        ([(document_id, score)] best first, at most top_k or all if top_k is None, total matches)
+        """
+        raise NotImplementedError
+    
+    def clear(self):
+        """
+        Remove every document
+        """
+        raise NotImplementedError
+    
+    def stats(self) -> dict:
+        """
+        Backend name and indexed document count
+        """
+        raise NotImplementedError
+    
+    def optimize(self):
+        """
+        Compact the index after bulk loads; a no-op where the backend maintains itself
+        """
+    
+    @staticmethod
+    def _terms(query: str) -> list:
+        """
+        Distinct analyzed query terms, so every backend matches the same words
+        """
+        return list(dict.fromkeys(analyze(query or "")))
+
+
+class InvertedIndexBackend(SearchBackend):
+    """
+    Segment-based BM25 index on local disk (see agents.search.inverted_index)
+    """
+    
+    name = "inverted"
+    
+    def __init__(self, path: str = None):
+        self.index = InvertedIndex(path or settings.SEARCH_INDEX_PATH)
+    
+    def index_documents(self, documents: list):
+        self.index.add_documents(documents)
+    
+    def delete_documents(self, document_ids: list):
+        self.index.delete_documents(document_ids)
+    
+    def search(self, query: str, top_k: int = 10) -> tuple:
+        return self.index.search(query, top_k)
+    
+    def clear(self):
+        self.index.clear()
+    
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.index.stats()}
+    
+    def optimize(self):
+        self.index.optimize()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    SQLite FTS5 table keyed by document id, ranked with FTS5's built-in bm25().
+    Embedded in a local file, for single-node deployments and tests.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str = None):
+        self.path = path or settings.SEARCH_SQLITE_PATH
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(body, tokenize = 'porter unicode61')"
+        )
+    
+    def index_documents(self, documents: list):
+        latest = dict(documents)
+        if not latest:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM documents_fts WHERE rowid = ?", ((document_id,) for document_id in latest))
+            conn.executemany("INSERT INTO documents_fts (rowid, body) VALUES (?, ?)", (
+                (document_id, text or "") for document_id, text in latest.items()
+            ))
+    
+    def delete_documents(self, document_ids: list):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM documents_fts WHERE rowid = ?", ((document_id,) for document_id in document_ids))
+    
+    def search(self, query: str, top_k: int = 10) -> tuple:
+        terms = self._terms(query)
+        if not terms:
+            return [], 0
+        
+        # Quoted terms are matched literally, so query text cannot inject FTS5 operators
+        rows = self._connect().execute(
+            """
+            SELECT rowid, -score, count(*) OVER ()
+            FROM (SELECT rowid, bm25(documents_fts) AS score FROM documents_fts WHERE documents_fts MATCH ?)
+            ORDER BY score, rowid
+            LIMIT ?
+            """,
+            (" OR ".join(f'"{term}"' for term in terms), -1 if top_k is None else top_k)
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows], rows[0][2] if rows else 0
+    
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents_fts")
+    
+    def stats(self) -> dict:
+        count = self._connect().execute("SELECT count(*) FROM documents_fts").fetchone()[0]
+        return {"backend": self.name, "documents": count}
+    
+    def optimize(self):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        One connection per thread; used as a context manager, each bulk write is one transaction
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    PostgreSQL full-text search: a tsvector per document with a GIN index, ranked with ts_rank_cd.
+    Lives in the application database, so no extra service is needed.
+    """
+    
+    name = "postgres"
+    CONFIG = "english"  # Text search configuration used for documents and queries
+    UPSERT_CHUNK_ROWS = 500
+    
+    def __init__(self, engine=None, table_name: str = "search_documents"):
+        if engine is None:
+            from database.connection import engine
+        self.engine = engine
+        # search_documents is created by the migrations; benchmarks create scratch tables with self.table.create
+        self.table = Table(
+            table_name,
+            MetaData(),
+            Column("document_id", Integer, primary_key=True, autoincrement=False),
+            Column("document", TSVECTOR, nullable=False),
+            Index(f"ix_{table_name}_document", "document", postgresql_using="gin")
+        )
+    
+    def index_documents(self, documents: list):
+        rows = [
+            {"document_id": document_id, "document": func.to_tsvector(self.CONFIG, text or "")}
+            for document_id, text in dict(documents).items()
+        ]
+        with self.engine.begin() as conn:
+            for start in range(0, len(rows), self.UPSERT_CHUNK_ROWS):
+                statement = insert(self.table).values(rows[start:start + self.UPSERT_CHUNK_ROWS])
+                conn.execute(statement.on_conflict_do_update(
+                    index_elements=[self.table.c.document_id],
+                    set_={"document": statement.excluded.document}
+                ))
+    
+    def delete_documents(self, document_ids: list):
+        if not document_ids:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.document_id.in_(list(document_ids))))
+    
+    def search(self, query: str, top_k: int = 10) -> tuple:
+        terms = self._terms(query)
+        if not terms:
+            return [], 0
+        
+        # Analyzed terms are plain words, so joining them with | is a valid tsquery
+        ts_query = func.to_tsquery(self.CONFIG, " | ".join(terms))
+        score = func.ts_rank_cd(self.table.c.document, ts_query)
+        statement = select(
+            self.table.c.document_id,
+            score,
+            func.count().over()
+        ).where(self.table.c.document.op("@@")(ts_query)).order_by(score.desc(), self.table.c.document_id)
+        if top_k is not None:
+            statement = statement.limit(top_k)
+        
+        with self.engine.connect() as conn:
+            rows = conn.execute(statement).all()
+        return [(row[0], float(row[1])) for row in rows], rows[0][2] if rows else 0
+    
+    def clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete())
+    
+    def stats(self) -> dict:
+        with self.engine.connect() as conn:
+            count = conn.execute(select(func.count()).select_from(self.table)).scalar()
+        return {"backend": self.name, "documents": count}
+
+
+_search_backend = None
+
+
+def get_search_backend() -> SearchBackend:
+    """
+    Get the process-wide backend configured by SEARCH_BACKEND
+    """
+    global _search_backend
+    if _search_backend is None:
+        if settings.SEARCH_BACKEND == "inverted":
+            _search_backend = InvertedIndexBackend()
+        elif settings.SEARCH_BACKEND == "sqlite":
+            _search_backend = SQLiteSearchBackend()
+        elif settings.SEARCH_BACKEND == "postgres":
+            _search_backend = PostgresSearchBackend()
+        else:
+            raise ValueError(f"Unknown search backend {settings.SEARCH_BACKEND}")
+    return _search_backend
+
+
+def rebuild(backend: SearchBackend = None, batch_size: int = 1000) -> dict:
+    """
+    Re-create a backend's index (the configured one by default) from the indexed text in the database
+    """
+    from database.connection import SessionLocal
+    from database.models import Document, SearchIndex
+    
+    backend = backend or get_search_backend()
+    backend.clear()
+    db = SessionLocal()
+    try:
+        last_id, total = 0, 0
+        while True:
+            rows = db.query(SearchIndex.id, SearchIndex.document_id, SearchIndex.indexed_text).join(
+                Document, Document.id == SearchIndex.document_id
+            ).filter(SearchIndex.id > last_id).order_by(SearchIndex.id).limit(batch_size).all()
+            if not rows:
+                break
+            backend.index_documents([(row.document_id, row.indexed_text) for row in rows])
+            last_id = rows[-1].id
+            total += len(rows)
+            logger.info("Indexed %d documents", total)
+    finally:
+        db.close()
+    backend.optimize()
+    return backend.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the full-text search index")
+    parser.add_argument("--rebuild", action="store_true", help="Re-create the index from the database")
+    parser.add_argument("--optimize", action="store_true", help="Compact the index")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.rebuild:
+        rebuild()
+    elif args.optimize:
+        get_search_backend().optimize()
+    print(json.dumps(get_search_backend().stats()))
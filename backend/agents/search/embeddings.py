@@ -0,0 +1,95 @@
+"""
+Text embeddings for the Search Agent
+Sentence-transformers encoders are published to the model registry under the "embedding" kind
+(a directory written by SentenceTransformer.save, see agents.search.publish) and loaded once
+per process. Until one is published, a hashing encoder that needs no model files is used.
+"""
+import zlib
+from collections import Counter
+import numpy as np
+from config.settings import settings
+from common.registry import model_registry
+from agents.search.inverted_index import analyze
+
+
+def load_encoder(path: str):
+    """
+    Load a saved sentence-transformers model for CPU inference
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    encoder = SentenceTransformer(path, device="cpu")
+    encoder.eval()
+    return encoder
+
+
+def encoder_memory_bytes(encoder) -> int:
+    """
+    Size of an encoder's parameters
+    """
+    return sum(parameter.numel() * parameter.element_size() for parameter in encoder.parameters())
+
+
+class HashingEncoder:
+    """
+    Offline fallback encoder: analyzed words and word pairs with sublinear counts, hashed into
+    signed buckets of a dense vector. Similar wording gives similar vectors; it has no notion of
+    synonyms, so publish a sentence-transformers model for semantic similarity.
+    """
+    
+    VERSION = "hashing-384-v1"
+    DIMENSION = 384
+    
+    def encode(self, texts: list) -> np.ndarray:
+        """
+        L2-normalized float32 vectors, shape (len(texts), DIMENSION)
+        """
+        vectors = np.zeros((len(texts), self.DIMENSION), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = analyze(text or "")
+            features = Counter(terms)
+            features.update(f"{first} {second}" for first, second in zip(terms, terms[1:]))
+            if not features:
+                continue
+            
+            # crc32 rather than hash(): stable across processes and restarts
+            hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.int64, count=len(features))
+            weights = 1.0 + np.log(np.fromiter(features.values(), dtype=np.float32, count=len(features)))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.DIMENSION, signs * weights)
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+fallback_encoder = HashingEncoder()
+
+
+def current_embedding_version() -> str:
+    """
+    Version new embeddings are made with: the active published encoder, or the hashing fallback
+    """
+    return model_registry.current_version("embedding") or HashingEncoder.VERSION
+
+
+def embed_texts(texts: list, version: str = None) -> tuple:
+    """
+    (version, L2-normalized float32 vectors) for a batch of texts, encoded in batches of
+    EMBEDDING_BATCH_SIZE
+    """
+    version = version or current_embedding_version()
+    if version == HashingEncoder.VERSION:
+        return version, fallback_encoder.encode(texts)
+    
+    encoder = model_registry.get("embedding", version)
+    vectors = encoder.encode(
+        texts,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    return version, np.asarray(vectors, dtype=np.float32)
+
+
+model_registry.register_loader("embedding", load_encoder, encoder_memory_bytes)
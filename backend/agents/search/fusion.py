@@ -0,0 +1,32 @@
+"""
+Rank fusion for hybrid search
+Combines ranked (document_id, score) lists from different retrievers into one ranking.
+"""
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Reciprocal-rank fusion: each list contributes 1 / (k + rank) for every document it ranks.
+    Only positions are used, so scores on different scales (BM25, cosine) need no calibration.
+    """
+    scores = {}
+    for hits in rankings:
+        for rank, (document_id, _) in enumerate(hits, start=1):
+            scores[document_id] = scores.get(document_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))
+
+
+def weighted_fusion(rankings: list, weights: list) -> list:
+    """
+    Weighted sum of min-max normalized scores; a document missing from a list gets 0 from it
+    """
+    scores = {}
+    for hits, weight in zip(rankings, weights):
+        if not hits:
+            continue
+        values = [score for _, score in hits]
+        low, high = min(values), max(values)
+        for document_id, score in hits:
+            normalized = (score - low) / (high - low) if high > low else 1.0
+            scores[document_id] = scores.get(document_id, 0.0) + weight * normalized
+    return sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))
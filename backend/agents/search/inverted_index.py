@@ -0,0 +1,473 @@
+"""
+Inverted index for the Search Agent
+Segment-based full-text index on local disk with BM25 ranking.
+
+A segment is an immutable directory of numpy arrays: a sorted term dictionary, postings
+(document ordinals and term frequencies) grouped by term, and the document ids and lengths.
+Segments are memory-mapped read-only, so every worker process shares the same pages.
+Indexing a batch writes one new segment and tombstones older copies of the same documents;
+small segments are merged once there are too many. manifest.json lists the live segments and
+is replaced atomically, and readers pick up a new manifest on their next query.
+"""
+import os
+import re
+import json
+import fcntl
+import shutil
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+MAX_WORD_LENGTH = 40  # Longer "words" are OCR noise
+TERM_DTYPE = "S32"  # Terms are stored as UTF-8, truncated to 32 bytes on both the index and query side
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def analyze(text: str) -> list:
+    """
+    Terms of a text: lowercased words without stopwords, with simple plurals folded
+    """
+    return [
+        word[:-1] if len(word) > 3 and word[-1] == "s" and word[-2] not in "su" else word
+        for word in WORD_PATTERN.findall(text.lower())
+        if len(word) <= MAX_WORD_LENGTH and word not in STOPWORDS
+    ]
+
+
+def encode_terms(terms) -> np.ndarray:
+    """
+    Terms as a fixed-width byte array comparable with a segment's term dictionary
+    """
+    return np.array([term.encode() for term in terms], dtype=TERM_DTYPE)
+
+
+class Segment:
+    """
+    Read-only view of a segment directory, with the tombstones that apply to it
+    """
+    
+    ARRAYS = ("terms", "offsets", "postings", "freqs", "doc_ids", "lengths")
+    
+    def __init__(self, path: str, deleted_file: str = None):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        self.size = len(self.doc_ids)
+        self.total_length = int(self.lengths.sum())
+        
+        # Tombstones (ordinals of deleted documents) never change on a Segment object:
+        # new tombstones open a new one, so searches already running are unaffected
+        self.deleted_file = deleted_file
+        deleted = np.load(os.path.join(self.path, deleted_file)) if deleted_file else np.zeros(0, dtype=np.int64)
+        self.deleted = deleted
+        if deleted.size:
+            self.live = np.ones(self.size, dtype=bool)
+            self.live[deleted] = False
+            self.live_count = int(self.live.sum())
+        else:
+            self.live = None
+            self.live_count = self.size
+    
+    def lookup(self, terms: np.ndarray) -> list:
+        """
+        (ordinals, freqs) postings for each encoded term, or None where the term does not occur
+        """
+        positions = np.searchsorted(self.terms, terms)
+        postings = []
+        for term, position in zip(terms, positions):
+            if position < len(self.terms) and self.terms[position] == term:
+                start, end = self.offsets[position], self.offsets[position + 1]
+                postings.append((self.postings[start:end], self.freqs[start:end]))
+            else:
+                postings.append(None)
+        return postings
+    
+    def ordinals_of(self, document_ids: np.ndarray) -> np.ndarray:
+        """
+        Ordinals of the given documents that are in this segment and not yet deleted
+        """
+        positions = np.searchsorted(self.doc_ids, document_ids)
+        inside = positions < self.size
+        positions, document_ids = positions[inside], document_ids[inside]
+        found = positions[self.doc_ids[positions] == document_ids]
+        if self.live is not None:
+            found = found[self.live[found]]
+        return found
+
+
+def write_segment(path: str, doc_ids: np.ndarray, lengths: np.ndarray, terms: np.ndarray,
+                  term_ids: np.ndarray, ordinals: np.ndarray, freqs: np.ndarray):
+    """
+    Write a segment from postings given as parallel arrays (term id, document ordinal, frequency).
+    `terms` must be sorted and unique, and doc_ids sorted by ordinal.
+    """
+    order = np.argsort(term_ids, kind="stable")
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+    
+    temp_path = f"{path}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    arrays = {
+        "terms": terms.astype(TERM_DTYPE),
+        "offsets": offsets,
+        "postings": ordinals[order].astype(np.uint32),
+        # BM25 saturates long before this; keeps postings compact
+        "freqs": np.minimum(freqs[order], np.iinfo(np.uint16).max).astype(np.uint16),
+        "doc_ids": doc_ids.astype(np.int64),
+        "lengths": lengths.astype(np.uint32)
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, f"{name}.npy"), array)
+    os.rename(temp_path, path)
+
+
+def build_segment(path: str, documents: list):
+    """
+    Write a segment for [(document_id, terms)] with unique document ids
+    """
+    documents = sorted(documents)
+    vocabulary = {}
+    term_ids, ordinals, freqs, lengths = [], [], [], []
+    for ordinal, (_, terms) in enumerate(documents):
+        counts = Counter(terms)
+        lengths.append(len(terms))
+        term_ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in counts)
+        ordinals.extend([ordinal] * len(counts))
+        freqs.extend(counts.values())
+    
+    # Renumber terms in sorted byte order, which is what lookups binary-search
+    terms, remap = np.unique(encode_terms(vocabulary), return_inverse=True)
+    write_segment(
+        path,
+        np.array([document_id for document_id, _ in documents], dtype=np.int64),
+        np.array(lengths, dtype=np.uint32),
+        terms,
+        remap.reshape(-1)[np.array(term_ids, dtype=np.int64)] if term_ids else np.zeros(0, dtype=np.int64),
+        np.array(ordinals, dtype=np.int64),
+        np.array(freqs, dtype=np.int64)
+    )
+
+
+def merge_segments(path: str, segments: list):
+    """
+    Write one segment holding the live documents of several segments
+    """
+    terms = np.unique(np.concatenate([segment.terms for segment in segments]))
+    doc_ids = np.concatenate([
+        segment.doc_ids if segment.live is None else segment.doc_ids[segment.live] for segment in segments
+    ])
+    order = np.argsort(doc_ids)
+    doc_ids = doc_ids[order]
+    lengths = np.concatenate([
+        segment.lengths if segment.live is None else segment.lengths[segment.live] for segment in segments
+    ])[order]
+    
+    term_ids, ordinals, freqs = [], [], []
+    for segment in segments:
+        # Map this segment's term numbering and ordinals onto the merged segment's
+        segment_terms = np.searchsorted(terms, segment.terms)
+        posting_terms = np.repeat(segment_terms, np.diff(segment.offsets))
+        postings = np.asarray(segment.postings)
+        segment_freqs = np.asarray(segment.freqs)
+        if segment.live is not None:
+            keep = segment.live[postings]
+            posting_terms, postings, segment_freqs = posting_terms[keep], postings[keep], segment_freqs[keep]
+        term_ids.append(posting_terms)
+        ordinals.append(np.searchsorted(doc_ids, segment.doc_ids[postings]))
+        freqs.append(segment_freqs)
+    
+    term_ids = np.concatenate(term_ids)
+    # Terms whose postings were all deleted are dropped from the dictionary
+    used = np.unique(term_ids)
+    write_segment(
+        path,
+        doc_ids,
+        lengths,
+        terms[used],
+        np.searchsorted(used, term_ids),
+        np.concatenate(ordinals),
+        np.concatenate(freqs)
+    )
+
+
+class InvertedIndex:
+    """
+    BM25 full-text index over a directory of segments.
+    Writers from any process serialize on a lock file; readers never block.
+    """
+    
+    K1 = 1.2
+    B = 0.75
+    MANIFEST = "manifest.json"
+    
+    def __init__(self, path: str, max_segments: int = None, merge_factor: int = None):
+        self.path = path
+        self.max_segments = max_segments or settings.SEARCH_MAX_SEGMENTS
+        self.merge_factor = max(2, merge_factor or settings.SEARCH_MERGE_FACTOR)
+        self._segments = []
+        self._manifest_key = None
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+    
+    def search(self, query: str, top_k: int = 10) -> tuple:
+        """
+        BM25 ranking of documents matching any query term.
+        Returns ([(document_id, score)] best first, at most top_k or all if top_k is None, total matches).
+        """
+        self.refresh()
+        segments = self._segments
+        terms = encode_terms(dict.fromkeys(analyze(query)))
+        # Statistics include deleted documents until their segment is merged, as document
+        # frequencies do; counting both the same way keeps every idf positive
+        document_count = sum(segment.size for segment in segments)
+        if not len(terms) or not document_count:
+            return [], 0
+        
+        average_length = sum(segment.total_length for segment in segments) / document_count
+        postings = [segment.lookup(terms) for segment in segments]
+        document_frequency = np.array([
+            sum(len(found[i][0]) for found in postings if found[i] is not None) for i in range(len(terms))
+        ])
+        idf = np.log1p((document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+        
+        ids, scores, total = [], [], 0
+        for segment, found in zip(segments, postings):
+            ordinals, segment_scores = self._score_segment(segment, found, idf, average_length)
+            if ordinals is None:
+                continue
+            total += len(ordinals)
+            if top_k is not None and len(ordinals) > top_k:
+                best = np.argpartition(-segment_scores, top_k - 1)[:top_k]
+                ordinals, segment_scores = ordinals[best], segment_scores[best]
+            ids.append(segment.doc_ids[ordinals])
+            scores.append(segment_scores)
+        
+        if not ids:
+            return [], 0
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        if top_k is not None and len(ids) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            ids, scores = ids[best], scores[best]
+        # Best score first; ties by document id so pages are stable
+        order = np.lexsort((ids, -scores))
+        return [(int(ids[i]), float(scores[i])) for i in order], total
+    
+    def _score_segment(self, segment: Segment, found: list, idf: np.ndarray, average_length: float) -> tuple:
+        """
+        (ordinals, scores) of live documents in a segment matching any term, or (None, None)
+        """
+        parts = []
+        for entry, weight in zip(found, idf):
+            if entry is None:
+                continue
+            ordinals, freqs = entry
+            freqs = freqs.astype(np.float32)
+            norm = self.K1 * (1 - self.B + self.B * segment.lengths[ordinals] / average_length)
+            parts.append((ordinals, weight * freqs * (self.K1 + 1) / (freqs + norm)))
+        if not parts:
+            return None, None
+        
+        if len(parts) == 1:
+            ordinals, scores = np.asarray(parts[0][0]), parts[0][1]
+        else:
+            all_ordinals = np.concatenate([ordinals for ordinals, _ in parts])
+            all_scores = np.concatenate([scores for _, scores in parts])
+            if len(all_ordinals) * 8 > segment.size:
+                # Dense accumulator when the postings cover a good part of the segment
+                dense = np.bincount(all_ordinals, weights=all_scores, minlength=segment.size)
+                ordinals = np.flatnonzero(dense)
+                scores = dense[ordinals]
+            else:
+                ordinals, inverse = np.unique(all_ordinals, return_inverse=True)
+                scores = np.bincount(inverse.reshape(-1), weights=all_scores)
+        
+        if segment.live is not None:
+            keep = segment.live[ordinals]
+            ordinals, scores = ordinals[keep], scores[keep]
+        return (ordinals, scores) if len(ordinals) else (None, None)
+    
+    def add_documents(self, documents: list):
+        """
+        Index [(document_id, text)]; documents already in the index are replaced
+        """
+        latest = dict(documents)
+        if not latest:
+            return
+        analyzed = [(document_id, analyze(text or "")) for document_id, text in latest.items()]
+        
+        with self._write() as manifest:
+            self._tombstone(manifest, np.array(sorted(latest), dtype=np.int64))
+            name = f"seg-{manifest['generation']:08d}"
+            build_segment(os.path.join(self.path, name), analyzed)
+            manifest["segments"].append({"name": name, "deleted": None})
+            self._merge_if_needed(manifest)
+    
+    def delete_documents(self, document_ids: list):
+        """
+        Remove documents from the index
+        """
+        if not document_ids:
+            return
+        with self._write() as manifest:
+            self._tombstone(manifest, np.array(sorted(set(document_ids)), dtype=np.int64))
+    
+    def optimize(self):
+        """
+        Merge every segment into one, dropping deleted documents
+        """
+        with self._write() as manifest:
+            if len(manifest["segments"]) > 1 or any(entry["deleted"] for entry in manifest["segments"]):
+                self._merge(manifest, list(manifest["segments"]))
+    
+    def clear(self):
+        """
+        Remove every document
+        """
+        with self._write() as manifest:
+            manifest["obsolete"].extend(os.path.join(self.path, entry["name"]) for entry in manifest["segments"])
+            manifest["segments"] = []
+    
+    def stats(self) -> dict:
+        """
+        Segment and document counts of this process's view of the index
+        """
+        self.refresh()
+        return {
+            "segments": len(self._segments),
+            "documents": sum(segment.live_count for segment in self._segments),
+            "deleted": sum(segment.size - segment.live_count for segment in self._segments),
+            "terms": sum(len(segment.terms) for segment in self._segments)
+        }
+    
+    def refresh(self):
+        """
+        Reload the segment list if another writer replaced the manifest. Costs one stat() otherwise.
+        """
+        manifest_path = os.path.join(self.path, self.MANIFEST)
+        try:
+            info = os.stat(manifest_path)
+        except FileNotFoundError:
+            self._segments, self._manifest_key = [], None
+            return
+        if (info.st_ino, info.st_mtime_ns) == self._manifest_key:
+            return
+        
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    info = os.stat(manifest_path)
+                    manifest = self._read_manifest()
+                    self._segments = self._open_segments(manifest)
+                    self._manifest_key = (info.st_ino, info.st_mtime_ns)
+                    return
+                except FileNotFoundError:
+                    # A merge removed files between reading the manifest and opening them; read it again
+                    if attempt == 2:
+                        raise
+    
+    def _open_segments(self, manifest: dict) -> list:
+        """
+        Segments of a manifest, reusing the ones already open
+        """
+        opened = {segment.name: segment for segment in self._segments}
+        segments = []
+        for entry in manifest["segments"]:
+            segment = opened.get(entry["name"])
+            if segment is None or segment.deleted_file != entry["deleted"]:
+                segment = Segment(os.path.join(self.path, entry["name"]), entry["deleted"])
+            segments.append(segment)
+        return segments
+    
+    @contextmanager
+    def _write(self):
+        """
+        Exclusive write transaction: yields the current manifest and publishes it afterwards
+        """
+        with self._lock, open(os.path.join(self.path, "write.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                manifest = self._read_manifest()
+                self._segments = self._open_segments(manifest)
+                manifest["obsolete"] = []  # Files to remove once the new manifest is published
+                yield manifest
+                obsolete = manifest.pop("obsolete")
+                manifest["generation"] += 1
+                
+                temp_path = os.path.join(self.path, f"{self.MANIFEST}.tmp")
+                with open(temp_path, "w") as f:
+                    json.dump(manifest, f)
+                os.replace(temp_path, os.path.join(self.path, self.MANIFEST))
+                
+                # Other processes keep their mappings of removed files until they refresh
+                for path in obsolete:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    elif os.path.exists(path):
+                        os.remove(path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._manifest_key = None
+        self.refresh()
+    
+    def _read_manifest(self) -> dict:
+        """
+        Current manifest on disk, or an empty one for a new index
+        """
+        try:
+            with open(os.path.join(self.path, self.MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "segments": []}
+    
+    def _tombstone(self, manifest: dict, document_ids: np.ndarray):
+        """
+        Mark every live copy of the documents as deleted, writing new tombstone files
+        """
+        segments = {segment.name: segment for segment in self._open_segments(manifest)}
+        for entry in manifest["segments"]:
+            segment = segments[entry["name"]]
+            ordinals = segment.ordinals_of(document_ids)
+            if not len(ordinals):
+                continue
+            deleted_file = f"deleted-{manifest['generation']:08d}.npy"
+            np.save(os.path.join(segment.path, deleted_file), np.union1d(segment.deleted, ordinals))
+            if entry["deleted"]:
+                manifest["obsolete"].append(os.path.join(segment.path, entry["deleted"]))
+            entry["deleted"] = deleted_file
+    
+    def _merge_if_needed(self, manifest: dict):
+        """
+        Tiered merging: once there are more than max_segments, merge the smallest merge_factor segments
+        """
+        if len(manifest["segments"]) <= self.max_segments:
+            return
+        segments = {segment.name: segment for segment in self._open_segments(manifest)}
+        smallest = sorted(manifest["segments"], key=lambda entry: segments[entry["name"]].live_count)
+        self._merge(manifest, smallest[:self.merge_factor])
+    
+    def _merge(self, manifest: dict, entries: list):
+        """
+        Replace segments in the manifest with one merged segment
+        """
+        segments = {segment.name: segment for segment in self._open_segments(manifest)}
+        sources = [segments[entry["name"]] for entry in entries]
+        name = f"seg-{manifest['generation']:08d}-m"
+        if sum(segment.live_count for segment in sources):
+            merge_segments(os.path.join(self.path, name), sources)
+        
+        merged = {entry["name"] for entry in entries}
+        manifest["segments"] = [entry for entry in manifest["segments"] if entry["name"] not in merged]
+        if sum(segment.live_count for segment in sources):
+            manifest["segments"].append({"name": name, "deleted": None})
+        manifest["obsolete"].extend(segment.path for segment in sources)
+        logger.info("Merged %d search index segments into %s", len(sources), name)
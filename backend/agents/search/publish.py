@@ -0,0 +1,49 @@
+"""
+Publish an embedding model
+Downloads a sentence-transformers model (HUGGINGFACE_MODEL by default), saves it to the model
+registry and activates it. Documents are re-embedded by the index backfill:
+
+    python -m agents.search.publish
+    python -m agents.backfill.run --stage index
+"""
+import re
+import logging
+import argparse
+from datetime import datetime
+from config.settings import settings
+from common.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    Save an encoder under a new registry version and activate it
+    """
+    parser = argparse.ArgumentParser(description="Publish a sentence-transformers encoder to the model registry")
+    parser.add_argument("--model", default=settings.HUGGINGFACE_MODEL, help="Model name or local path")
+    parser.add_argument("--version", help="Registry version (default: model name and date)")
+    parser.add_argument("--no-activate", action="store_true", help="Publish without making it the active version")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    
+    from sentence_transformers import SentenceTransformer
+    
+    version = args.version or "{}-{}".format(
+        re.sub(r"[^A-Za-z0-9.-]+", "-", args.model.rstrip("/").split("/")[-1]),
+        datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    )
+    if version in model_registry.versions("embedding"):
+        raise SystemExit(f"Model version {version} already exists")
+    
+    output = model_registry.artifact_path("embedding", version)
+    SentenceTransformer(args.model, device="cpu").save(output)
+    logger.info("Saved %s as embedding model %s to %s", args.model, version, output)
+    
+    if not args.no_activate:
+        model_registry.activate("embedding", version)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
 """
 Search Agent Service
-Provides semantic search capabilities using vector embeddings and Elasticsearch
+Provides ranked full-text search through a pluggable backend, nearest-neighbour search over embeddings
+and hybrid search fusing the two
 """
-from sqlalchemy.orm import Session
-from database.models import Document, SearchIndex, OCRResult, DocumentClassification
+from sqlalchemy import select, func, exists
+from sqlalchemy.orm import Session, aliased
+from database.models import Document, SearchIndex, DocumentClassification
+import io
+import csv
+import json
 import time
+import asyncio
+from config.settings import settings
+from common.concurrency import offload, run_blocking
+from common.pagination import offset_cursor, cursor_offset, keyset_after, keyset_cursor
+from database.connection import SessionLocal
+from agents.ocr.service import OCRService
+from agents.search.embeddings import embed_texts, current_embedding_version
+from agents.search.vector_index import get_vector_index, index_versions
+from agents.search.backends import get_search_backend
+from agents.search.fusion import reciprocal_rank_fusion, weighted_fusion
+from agents.metadata.values import metadata_filter
+from agents.dedup.service import DedupService
 
 
 class SearchService:
@@ -15,24 +32,78 @@ class SearchService:
     def __init__(self, db: Session):
         self.db = db
     
-    async def search(self, query: str, skip: int = 0, limit: int = 20) -> dict:
+    SEARCH_MODES = ("lexical", "semantic", "hybrid")
+    FUSION_METHODS = ("rrf", "weighted")
+    
+    async def search(
+        self,
+        query: str,
+        cursor: str = None,
+        limit: int = 20,
+        mode: str = "lexical",
+        fusion: str = "rrf",
+        category: str = None,
+        date_from: str = None,
+        date_to: str = None
+    ) -> dict:
         """
-        Search documents using text query
-        TODO: Implement actual search using Elasticsearch or vector similarity
+        Ranked search: lexical (the configured search backend), semantic (the vector index) or
+        hybrid, which runs both retrievers concurrently and fuses their rankings.
+        Category and date filters are applied to the candidates before fusion, and only the
+        requested page of documents is loaded. took holds milliseconds per stage.
+        Pages follow next_cursor, which records the rank offset of the next page.
         """
-        start_time = time.time()
+        if mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode}; expected one of {', '.join(self.SEARCH_MODES)}")
+        if fusion not in self.FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method {fusion}; expected one of {', '.join(self.FUSION_METHODS)}")
         
-        # Placeholder: Simple SQL-based search
-        # In production, this would use Elasticsearch or vector similarity search
-        documents = self.db.query(Document).join(OCRResult).filter(
-            OCRResult.extracted_text.ilike(f"%{query}%")
-        ).offset(skip).limit(limit).all()
+        # A cursor is only valid for the search that issued it
+        params = [query, mode, fusion, category, date_from, date_to]
+        skip = cursor_offset(cursor, params)
         
-        total = self.db.query(Document).join(OCRResult).filter(
-            OCRResult.extracted_text.ilike(f"%{query}%")
-        ).count()
+        start_time = time.perf_counter()
+        took = {}
+        filtered = bool(category or date_from or date_to)
         
-        took = int((time.time() - start_time) * 1000)
+        # Plain lexical search only needs the page itself; filters and fusion need candidates
+        if mode == "lexical" and not filtered:
+            depth = skip + limit
+        else:
+            depth = max(skip + limit, settings.SEARCH_MAX_CANDIDATES if filtered else settings.SEARCH_HYBRID_CANDIDATES)
+        
+        retrievers = {}
+        if mode != "semantic":
+            retrievers["lexical"] = self._lexical_hits
+        if mode != "lexical":
+            retrievers["semantic"] = self._semantic_hits
+        results = await asyncio.gather(*(
+            run_blocking(self._timed, took, stage, retrieve, query, depth)
+            for stage, retrieve in retrievers.items()
+        ))
+        rankings = dict(zip(retrievers, (hits for hits, _ in results)))
+        total = results[0][1]
+        
+        if filtered:
+            candidates = set().union(*({document_id for document_id, _ in hits} for hits in rankings.values()))
+            allowed = await run_blocking(
+                self._timed, took, "filter", self._filter_ids, candidates, category, date_from, date_to
+            )
+            rankings = {
+                stage: [hit for hit in hits if hit[0] in allowed]
+                for stage, hits in rankings.items()
+            }
+        
+        if mode == "hybrid":
+            hits = self._timed(took, "fusion", self._fuse, rankings, fusion)
+        else:
+            hits = rankings[mode]
+        if mode != "lexical" or filtered:
+            total = len(hits)
+        
+        page = hits[skip:skip + limit]
+        documents = await run_blocking(self._timed, took, "hydrate", self._load_documents, [document_id for document_id, _ in page])
+        took["total"] = round((time.perf_counter() - start_time) * 1000, 2)
         
         return {
             "documents": [
@@ -40,15 +111,79 @@ class SearchService:
                     "id": doc.id,
                     "filename": doc.original_filename,
                     "upload_date": doc.upload_date.isoformat(),
-                    "status": doc.status.value
+                    "status": doc.status.value,
+                    "score": round(score, 4)
                 }
-                for doc in documents
+                for doc, score in ((documents.get(document_id), score) for document_id, score in page)
+                if doc is not None
             ],
             "total": total,
+            "next_cursor": offset_cursor(params, skip + limit) if skip + limit < total else None,
             "took": took
         }
     
-    async def index_document(self, document_id: int) -> dict:
+    @staticmethod
+    def _timed(took: dict, stage: str, func, *args):
+        """
+        Call func and record its duration in milliseconds under took[stage]
+        """
+        start_time = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            took[stage] = round((time.perf_counter() - start_time) * 1000, 2)
+    
+    @staticmethod
+    def _lexical_hits(query: str, depth: int) -> tuple:
+        """
+        Best text matches from the search backend and the total number of matches
+        """
+        return get_search_backend().search(query, top_k=depth)
+    
+    @staticmethod
+    def _semantic_hits(query: str, depth: int) -> tuple:
+        """
+        Nearest documents to the embedded query in the current vector index
+        """
+        version, vectors = embed_texts([query])
+        hits = [hit for hit in get_vector_index(version).search(vectors[0], depth) if hit[1] > 0]
+        return hits, len(hits)
+    
+    @staticmethod
+    def _fuse(rankings: dict, fusion: str) -> list:
+        """
+        One ranking from the lexical and semantic candidates
+        """
+        if fusion == "weighted":
+            weight = settings.SEARCH_SEMANTIC_WEIGHT
+            return weighted_fusion([rankings["lexical"], rankings["semantic"]], [1.0 - weight, weight])
+        return reciprocal_rank_fusion([rankings["lexical"], rankings["semantic"]], k=settings.SEARCH_RRF_K)
+    
+    def _filter_ids(self, document_ids: set, category: str = None, date_from: str = None, date_to: str = None) -> set:
+        """
+        Candidate ids that pass the category and date filters, in one query
+        """
+        if not document_ids:
+            return set()
+        db_query = self._filtered(
+            self.db.query(Document.id).filter(Document.id.in_(list(document_ids))),
+            self._filter_conditions(category, date_from, date_to)
+        )
+        return {document_id for document_id, in db_query}
+    
+    def _load_documents(self, document_ids: list) -> dict:
+        """
+        Documents by id, loaded in one query
+        """
+        if not document_ids:
+            return {}
+        return {
+            doc.id: doc
+            for doc in self.db.query(Document).filter(Document.id.in_(document_ids))
+        }
+    
+    @offload
+    def index_document(self, document_id: int) -> dict:
         """
         Index a document for search
         """
@@ -57,109 +192,270 @@ class SearchService:
         if not document:
             raise ValueError(f"Document {document_id} not found")
         
-        ocr_result = self.db.query(OCRResult).filter(
-            OCRResult.document_id == document_id
-        ).first()
+        text = OCRService(self.db).load_text(document_id)
         
-        if not ocr_result:
+        if text is None:
             raise ValueError(f"OCR results not found for document {document_id}")
         
-        # TODO: Generate actual vector embeddings using sentence transformers
-        # Placeholder: Store text for indexing
-        indexed_text = ocr_result.extracted_text
-        vector_embedding = []  # Placeholder for actual embeddings
-        
-        # Check if index exists
-        existing_index = self.db.query(SearchIndex).filter(
-            SearchIndex.document_id == document_id
-        ).first()
-        
-        if existing_index:
-            existing_index.indexed_text = indexed_text
-            existing_index.vector_embedding = vector_embedding
-        else:
-            search_index = SearchIndex(
-                document_id=document_id,
-                indexed_text=indexed_text,
-                vector_embedding=vector_embedding
-            )
-            self.db.add(search_index)
-        
+        self.index_text(document, text)
         self.db.commit()
         
         return {
             "success": True,
-            "document_id": document_id
+            "document_id": document_id,
+            "near_duplicates": DedupService(self.db).near_duplicates(document_id) or []
         }
     
-    async def find_similar(self, document_id: int, limit: int = 10) -> list:
+    def index_text(self, document: Document, text: str):
+        """
+        Index a loaded document's text and stage the index row in the session.
+        The caller is responsible for committing.
+        """
+        self.index_texts([document], [text])
+    
+    def index_texts(self, documents: list, texts: list) -> str:
         """
-        Find similar documents using vector similarity
-        TODO: Implement actual vector similarity search
+        Index loaded documents together: one embedding batch, one query for existing rows and
+        one bulk write to the search backend, the vector index and the near-duplicate signatures.
+        Returns the index version written. The caller is responsible for committing.
         """
-        # Get document's search index
-        search_index = self.db.query(SearchIndex).filter(
-            SearchIndex.document_id == document_id
-        ).first()
+        index_version, vectors = embed_texts(texts)
+        document_ids = [document.id for document in documents]
+        
+        existing = {
+            index.document_id: index
+            for index in self.db.query(SearchIndex).filter(SearchIndex.document_id.in_(document_ids))
+        }
         
-        if not search_index:
+        for document, text in zip(documents, texts):
+            existing_index = existing.get(document.id)
+            if existing_index:
+                existing_index.indexed_text = text
+                existing_index.vector_embedding = None  # Vectors live in the vector index
+                existing_index.index_version = index_version
+                existing_index.is_stale = False
+            else:
+                self.db.add(SearchIndex(
+                    document_id=document.id,
+                    indexed_text=text,
+                    index_version=index_version
+                ))
+        
+        # Both indexes are derived from these rows and can be rebuilt from them
+        get_search_backend().index_documents(list(zip(document_ids, texts)))
+        get_vector_index(index_version).upsert(document_ids, vectors)
+        DedupService(self.db).sign_texts(document_ids, texts)
+        return index_version
+    
+    @classmethod
+    def current_index_version(cls) -> str:
+        """
+        Version newly indexed documents get: the embedding model their vectors are made with
+        """
+        return current_embedding_version()
+    
+    @staticmethod
+    def remove_documents(document_ids: list):
+        """
+        Drop deleted documents from the search backend and the vector index of every embedding version
+        """
+        get_search_backend().delete_documents(document_ids)
+        for version in index_versions():
+            get_vector_index(version).delete(document_ids)
+    
+    @offload
+    def find_similar(self, document_id: int, limit: int = 10) -> list:
+        """
+        Nearest documents by cosine similarity of their embeddings, from the approximate
+        nearest-neighbour index of the current embedding version
+        """
+        index = get_vector_index(current_embedding_version())
+        vector = index.get(document_id)
+        if vector is None:
             return []
         
-        # Placeholder: Return random documents
-        # In production, this would use cosine similarity on vector embeddings
-        similar_docs = self.db.query(Document).filter(
-            Document.id != document_id
-        ).limit(limit).all()
+        hits = index.search(vector, limit, exclude=document_id)
+        documents = {
+            doc.id: doc
+            for doc in self.db.query(Document).filter(Document.id.in_([hit_id for hit_id, _ in hits]))
+        } if hits else {}
         
         return [
             {
-                "id": doc.id,
-                "filename": doc.original_filename,
-                "similarity_score": 0.75  # Placeholder score
+                "id": hit_id,
+                "filename": documents[hit_id].original_filename,
+                "similarity_score": round(score, 4)
             }
-            for doc in similar_docs
+            for hit_id, score in hits
+            if hit_id in documents and score > 0
         ]
     
-    async def advanced_search(
+    @offload
+    def advanced_search(
         self,
         query: str = None,
         category: str = None,
         date_from: str = None,
-        date_to: str = None
+        date_to: str = None,
+        meta: list = None,
+        cursor: str = None,
+        limit: int = 100,
+        exact_total: bool = False
     ) -> dict:
         """
-        Advanced search with multiple filters
+        Advanced search with multiple filters, one page at a time.
+        Each meta filter ("key:value", "key:>=value", "key:low..high") must match a typed metadata value.
+        With a query, pages follow relevance among the best SEARCH_MAX_CANDIDATES text matches and
+        total is exact; without one, pages are newest first by keyset on (upload_date, id) and
+        total is only counted when exact_total is set.
         """
-        # Build query
-        db_query = self.db.query(Document)
+        conditions = self._filter_conditions(category, date_from, date_to, meta)
         
         if query:
-            db_query = db_query.join(OCRResult).filter(
-                OCRResult.extracted_text.ilike(f"%{query}%")
-            )
-        
-        if category:
-            db_query = db_query.join(DocumentClassification).filter(
-                DocumentClassification.category == category
-            )
-        
-        if date_from:
-            db_query = db_query.filter(Document.upload_date >= date_from)
+            params = ["advanced", query, category, date_from, date_to, meta]
+            offset = cursor_offset(cursor, params)
+            ranked = self._ranked_matches(self.db, query, conditions)
+            page_ids = ranked[offset:offset + limit]
+            loaded = self._load_documents(page_ids)
+            documents = [loaded[document_id] for document_id in page_ids if document_id in loaded]
+            total = len(ranked)
+            next_cursor = offset_cursor(params, offset + limit) if offset + limit < total else None
+        else:
+            db_query = self._filtered(self.db.query(Document), conditions)
+            if cursor:
+                db_query = db_query.filter(keyset_after(cursor, Document.upload_date, Document.id))
+            # One extra row tells whether there is a next page
+            documents = db_query.order_by(Document.upload_date.desc(), Document.id.desc()).limit(limit + 1).all()
+            next_cursor = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_cursor = keyset_cursor(documents[-1].upload_date, documents[-1].id)
+            total = self._filtered(self.db.query(func.count(Document.id)), conditions).scalar() if exact_total else None
         
-        if date_to:
-            db_query = db_query.filter(Document.upload_date <= date_to)
+        return {
+            "documents": [self._result_row(doc) for doc in documents],
+            "total": total,
+            "next_cursor": next_cursor
+        }
+    
+    EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    EXPORT_COLUMNS = ["id", "filename", "upload_date", "status"]
+    EXPORT_CHUNK_ROWS = 1000  # Rows fetched per round trip while streaming
+    
+    def export_advanced_search(
+        self,
+        export_format: str,
+        query: str = None,
+        category: str = None,
+        date_from: str = None,
+        date_to: str = None,
+        meta: list = None
+    ):
+        """
+        Every match of an advanced search as an iterator of NDJSON or CSV lines, for a streaming
+        response. Arguments are validated here, before anything is sent; rows are then read in
+        chunks in a session of their own and serialized one by one, so memory stays flat
+        however many documents match.
+        """
+        if export_format not in self.EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {export_format}; expected one of {', '.join(self.EXPORT_FORMATS)}")
+        conditions = self._filter_conditions(category, date_from, date_to, meta)
+        return self._export_lines(export_format, query, conditions)
+    
+    def _export_lines(self, export_format: str, query: str, conditions: list):
+        """
+        Generator behind export_advanced_search; the request's session may be closed before it
+        finishes, so it opens its own
+        """
+        columns = (Document.id, Document.original_filename, Document.upload_date, Document.status)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
         
-        documents = db_query.all()
+        def line(row) -> str:
+            values = self._result_row(row)
+            if export_format == "ndjson":
+                return json.dumps(values) + "\n"
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(values[column] for column in self.EXPORT_COLUMNS)
+            return buffer.getvalue()
         
+        db = SessionLocal()
+        try:
+            if export_format == "csv":
+                writer.writerow(self.EXPORT_COLUMNS)
+                yield buffer.getvalue()
+            
+            if query:
+                ranked = self._ranked_matches(db, query, conditions)
+                for first in range(0, len(ranked), self.EXPORT_CHUNK_ROWS):
+                    chunk = ranked[first:first + self.EXPORT_CHUNK_ROWS]
+                    rows = {row.id: row for row in db.query(*columns).filter(Document.id.in_(chunk))}
+                    for document_id in chunk:
+                        if document_id in rows:
+                            yield line(rows[document_id])
+            else:
+                rows = self._filtered(db.query(*columns), conditions).order_by(
+                    Document.upload_date.desc(), Document.id.desc()
+                ).yield_per(self.EXPORT_CHUNK_ROWS)
+                for row in rows:
+                    yield line(row)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _result_row(doc) -> dict:
+        """
+        Advanced search result fields, from a Document or a row of its columns
+        """
         return {
-            "documents": [
-                {
-                    "id": doc.id,
-                    "filename": doc.original_filename,
-                    "upload_date": doc.upload_date.isoformat(),
-                    "status": doc.status.value
-                }
-                for doc in documents
-            ],
-            "total": len(documents)
+            "id": doc.id,
+            "filename": doc.original_filename,
+            "upload_date": doc.upload_date.isoformat(),
+            "status": doc.status.value
         }
+    
+    def _filter_conditions(self, category: str = None, date_from: str = None, date_to: str = None, meta: list = None) -> list:
+        """
+        Conditions on Document for category, upload date and metadata filters; raises ValueError for an invalid meta filter
+        """
+        conditions = []
+        if category:
+            # Only each document's latest classification counts; earlier rows are kept as history
+            newer = aliased(DocumentClassification)
+            conditions.append(Document.id.in_(
+                select(DocumentClassification.document_id).where(
+                    DocumentClassification.category == category,
+                    ~exists().where(
+                        newer.document_id == DocumentClassification.document_id,
+                        newer.id > DocumentClassification.id
+                    )
+                )
+            ))
+        if date_from:
+            conditions.append(Document.upload_date >= date_from)
+        if date_to:
+            conditions.append(Document.upload_date <= date_to)
+        conditions.extend(metadata_filter(spec) for spec in meta or [])
+        return conditions
+    
+    @staticmethod
+    def _filtered(db_query, conditions: list):
+        """
+        Apply filter conditions to a query on Document
+        """
+        for condition in conditions:
+            db_query = db_query.filter(condition)
+        return db_query
+    
+    def _ranked_matches(self, db: Session, query: str, conditions: list) -> list:
+        """
+        Ids of the best SEARCH_MAX_CANDIDATES text matches that pass the conditions, in relevance order.
+        Only ids are loaded, so the candidates stay cheap to hold.
+        """
+        hits, _ = get_search_backend().search(query, top_k=settings.SEARCH_MAX_CANDIDATES)
+        ranks = {document_id: rank for rank, (document_id, _) in enumerate(hits)}
+        if not ranks:
+            return []
+        matching = self._filtered(db.query(Document.id).filter(Document.id.in_(list(ranks))), conditions)
+        return sorted((document_id for document_id, in matching), key=ranks.__getitem__)
@@ -0,0 +1,456 @@
+"""
+Vector index for the Search Agent
+Embeddings are stored per embedding version as packed float32 rows in a memory-mapped matrix
+file, with a parallel file of document ids and one of IVF list numbers. Re-embedding a document
+appends a row and tombstones the previous one (its id becomes -1); compaction rewrites the files.
+
+Nearest neighbours are approximate (IVF): spherical k-means centroids split the vectors into
+lists, new vectors join the list of their nearest centroid, and a query scans only the ANN_NPROBE
+lists closest to it. Indexes smaller than ANN_TRAIN_MIN_ROWS are searched exactly.
+
+Rebuild from the database, retrain or compact with: python -m agents.search.vector_index --rebuild|--train|--compact
+"""
+import os
+import json
+import fcntl
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+import numpy as np
+from scipy import sparse
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on L2-normalized vectors; returns normalized centroids (clusters, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(centroids, vectors)
+        # Sum the members of each cluster with one sparse product
+        members = sparse.csr_matrix(
+            (np.ones(len(vectors), dtype=np.float32), (assignments, np.arange(len(vectors)))),
+            shape=(clusters, len(vectors))
+        )
+        sums = np.asarray(members @ vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Re-seed empty clusters with random vectors
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms[empty] = 1.0
+        centroids = (sums / norms[:, None]).astype(np.float32)
+    return centroids
+
+
+def nearest_centroids(centroids: np.ndarray, vectors: np.ndarray, chunk_rows: int = 65536) -> np.ndarray:
+    """
+    Index of the most similar centroid for each vector
+    """
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_rows):
+        block = np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+        assignments[start:start + chunk_rows] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+class VectorSnapshot:
+    """
+    Read-only view of the index files at one point in time
+    """
+    
+    def __init__(self, path: str, meta: dict):
+        self.meta = meta
+        self.dimension = meta.get("dimension")
+        generation = meta["generation"]
+        ids_path = os.path.join(path, f"ids-{generation}.i64")
+        self.rows = os.path.getsize(ids_path) // 8 if os.path.exists(ids_path) else 0
+        
+        # Rows are appended vectors first and ids last, so the id file bounds the complete rows
+        if self.rows:
+            self.ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(self.rows,))
+            self.vectors = np.memmap(
+                os.path.join(path, f"vectors-{generation}.f32"), dtype=np.float32, mode="r",
+                shape=(self.rows, self.dimension)
+            )
+            self.lists = np.memmap(os.path.join(path, f"lists-{generation}.i32"), dtype=np.int32, mode="r", shape=(self.rows,))
+        else:
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.vectors = np.zeros((0, self.dimension or 0), dtype=np.float32)
+            self.lists = np.zeros(0, dtype=np.int32)
+        
+        centroids_path = os.path.join(path, f"centroids-{generation}.npy")
+        self.centroids = np.load(centroids_path) if meta.get("trained_rows") else None
+        
+        ids = np.asarray(self.ids)
+        self.live_rows = np.flatnonzero(ids >= 0)
+        order = np.argsort(ids[self.live_rows], kind="stable")
+        self.sorted_ids = ids[self.live_rows][order]
+        self.sorted_rows = self.live_rows[order]
+        
+        # Inverted lists: rows grouped by IVF list
+        if self.centroids is not None:
+            lists = np.asarray(self.lists)
+            assigned = np.flatnonzero((lists >= 0) & (ids >= 0))
+            self.list_rows = assigned[np.argsort(lists[assigned], kind="stable")]
+            self.list_offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(lists[assigned], minlength=len(self.centroids)), out=self.list_offsets[1:])
+    
+    def rows_of(self, document_ids) -> np.ndarray:
+        """
+        Live rows holding the given documents
+        """
+        document_ids = np.asarray(document_ids, dtype=np.int64)
+        positions = np.searchsorted(self.sorted_ids, document_ids)
+        inside = positions < len(self.sorted_ids)
+        positions, document_ids = positions[inside], document_ids[inside]
+        return self.sorted_rows[positions[self.sorted_ids[positions] == document_ids]]
+
+
+class VectorIndex:
+    """
+    Float32 vectors of one embedding version with an IVF index for approximate nearest neighbours.
+    Writers from any process serialize on a lock file; readers never block.
+    """
+    
+    META = "meta.json"
+    RETRAIN_GROWTH = 4  # Retrain once the index has grown this much since the last training
+    
+    def __init__(self, path: str, nprobe: int = None, train_min_rows: int = None):
+        self.path = path
+        self.nprobe = nprobe or settings.ANN_NPROBE
+        self.train_min_rows = train_min_rows or settings.ANN_TRAIN_MIN_ROWS
+        self._snapshot = None
+        self._key = None
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+    
+    def search(self, vector: np.ndarray, k: int = 10, exclude: int = None, exact: bool = False) -> list:
+        """
+        [(document_id, cosine similarity)] of the k nearest documents, best first
+        """
+        snapshot = self.refresh()
+        if not len(snapshot.live_rows):
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        
+        if exact or snapshot.centroids is None:
+            candidates = snapshot.live_rows
+        else:
+            nprobe = min(self.nprobe, len(snapshot.centroids))
+            probe = np.argpartition(-(snapshot.centroids @ vector), nprobe - 1)[:nprobe]
+            candidates = np.concatenate([
+                snapshot.list_rows[snapshot.list_offsets[i]:snapshot.list_offsets[i + 1]] for i in probe
+            ])
+            candidates.sort()  # Sequential reads of the memory-mapped matrix
+        
+        # Tombstones are written in place, so rows deleted since this snapshot read as -1
+        ids = snapshot.ids[candidates]
+        keep = (ids >= 0) if exclude is None else (ids >= 0) & (ids != exclude)
+        candidates, ids = candidates[keep], ids[keep]
+        if not len(candidates):
+            return []
+        
+        scores = snapshot.vectors[candidates] @ vector
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[best], scores[best]
+        order = np.lexsort((ids, -scores))
+        return [(int(ids[i]), float(scores[i])) for i in order]
+    
+    def get(self, document_id: int) -> np.ndarray:
+        """
+        Stored vector of a document, or None
+        """
+        snapshot = self.refresh()
+        rows = snapshot.rows_of([document_id])
+        return np.array(snapshot.vectors[rows[0]]) if len(rows) else None
+    
+    def upsert(self, document_ids: list, vectors: np.ndarray):
+        """
+        Store vectors for documents, replacing their previous vectors
+        """
+        latest = {document_id: row for row, document_id in enumerate(document_ids)}
+        if not latest:
+            return
+        vectors = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32)[list(latest.values())])
+        ids = np.array(list(latest), dtype=np.int64)
+        
+        with self._write() as meta:
+            if meta.get("dimension") is None:
+                meta["dimension"] = int(vectors.shape[1])
+            if vectors.shape[1] != meta["dimension"]:
+                raise ValueError(f"Expected {meta['dimension']}-dimensional vectors, got {vectors.shape[1]}")
+            
+            snapshot = VectorSnapshot(self.path, meta)
+            self._tombstone(meta, snapshot, ids)
+            if snapshot.centroids is not None:
+                lists = nearest_centroids(snapshot.centroids, vectors)
+            else:
+                lists = np.full(len(ids), -1, dtype=np.int32)
+            
+            # A writer that died mid-append can leave rows past the last complete id; cut every file
+            # back to the rows the id file vouches for so the new rows line up across files
+            generation = meta["generation"]
+            for name, array in (("vectors", vectors), ("lists", lists), ("ids", ids)):
+                with open(self._file(name, generation), "ab") as f:
+                    f.truncate(snapshot.rows * array[:1].nbytes)
+                    f.write(array.tobytes())
+            
+            live = len(snapshot.live_rows) - len(snapshot.rows_of(ids)) + len(ids)
+            trained_rows = meta.get("trained_rows", 0)
+            if live >= self.train_min_rows and (not trained_rows or live >= self.RETRAIN_GROWTH * trained_rows):
+                self._rewrite(meta, train=True)
+    
+    def delete(self, document_ids: list):
+        """
+        Remove documents' vectors; files are compacted once most rows are dead
+        """
+        if not document_ids:
+            return
+        with self._write() as meta:
+            if meta.get("dimension") is None:
+                return
+            snapshot = VectorSnapshot(self.path, meta)
+            deleted = self._tombstone(meta, snapshot, np.array(list(document_ids), dtype=np.int64))
+            live = len(snapshot.live_rows) - deleted
+            if snapshot.rows - live > max(live, 1000):
+                self._rewrite(meta, train=False)
+    
+    def train(self):
+        """
+        Train IVF centroids on the current vectors and compact the files
+        """
+        with self._write() as meta:
+            if meta.get("dimension") is not None:
+                self._rewrite(meta, train=True)
+    
+    def compact(self):
+        """
+        Drop tombstoned rows, keeping the current centroids
+        """
+        with self._write() as meta:
+            if meta.get("dimension") is not None:
+                self._rewrite(meta, train=False)
+    
+    def stats(self) -> dict:
+        """
+        Row counts and IVF state of this process's view of the index
+        """
+        snapshot = self.refresh()
+        return {
+            "dimension": snapshot.dimension,
+            "rows": snapshot.rows,
+            "documents": len(snapshot.live_rows),
+            "lists": len(snapshot.centroids) if snapshot.centroids is not None else 0,
+            "trained_rows": snapshot.meta.get("trained_rows", 0),
+            "nprobe": self.nprobe
+        }
+    
+    def refresh(self) -> VectorSnapshot:
+        """
+        Current snapshot, reopened when a writer appended, tombstoned or rewrote files
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self._change_key(snapshot.meta["generation"]) == self._key:
+            return snapshot
+        
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    # Fingerprint first: a write that lands while loading makes the next query reload
+                    key = self._change_key(None)
+                    meta = self._read_meta()
+                    key = self._change_key(meta["generation"], key)
+                    self._snapshot = VectorSnapshot(self.path, meta)
+                    self._key = key
+                    return self._snapshot
+                except FileNotFoundError:
+                    # A rewrite removed files between reading the metadata and opening them
+                    if attempt == 2:
+                        raise
+    
+    def _change_key(self, generation: int, meta_key: tuple = None) -> tuple:
+        """
+        Cheap fingerprint of the files: metadata identity plus size and mtime of the id file
+        """
+        if meta_key is None:
+            try:
+                info = os.stat(os.path.join(self.path, self.META))
+            except FileNotFoundError:
+                return None
+            meta_key = (info.st_ino, info.st_mtime_ns)
+        if generation is None:
+            return meta_key
+        try:
+            ids = os.stat(self._file("ids", generation))
+        except FileNotFoundError:
+            return meta_key
+        return meta_key + (ids.st_size, ids.st_mtime_ns)
+    
+    def _file(self, name: str, generation: int) -> str:
+        """
+        Path of one of a generation's files
+        """
+        extension = {"vectors": "f32", "lists": "i32", "ids": "i64", "centroids": "npy"}[name]
+        return os.path.join(self.path, f"{name}-{generation}.{extension}")
+    
+    def _read_meta(self) -> dict:
+        """
+        Current metadata, or that of an empty index
+        """
+        try:
+            with open(os.path.join(self.path, self.META)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dimension": None, "generation": 0, "trained_rows": 0}
+    
+    @contextmanager
+    def _write(self):
+        """
+        Exclusive write: yields the metadata and publishes it afterwards
+        """
+        with self._lock, open(os.path.join(self.path, "write.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                meta = self._read_meta()
+                previous = meta["generation"]
+                yield meta
+                
+                temp_path = os.path.join(self.path, f"{self.META}.tmp")
+                with open(temp_path, "w") as f:
+                    json.dump(meta, f)
+                os.replace(temp_path, os.path.join(self.path, self.META))
+                
+                # Other processes keep their mappings of removed files until they refresh
+                if meta["generation"] != previous:
+                    for name in ("vectors", "lists", "ids", "centroids"):
+                        if os.path.exists(self._file(name, previous)):
+                            os.remove(self._file(name, previous))
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._key = None
+    
+    def _tombstone(self, meta: dict, snapshot: VectorSnapshot, document_ids: np.ndarray) -> int:
+        """
+        Mark the live rows of documents as deleted in place; returns how many rows were marked
+        """
+        rows = snapshot.rows_of(document_ids)
+        if len(rows):
+            ids = np.memmap(self._file("ids", meta["generation"]), dtype=np.int64, mode="r+", shape=(snapshot.rows,))
+            ids[rows] = -1
+            ids.flush()
+        return len(rows)
+    
+    def _rewrite(self, meta: dict, train: bool, chunk_rows: int = 65536):
+        """
+        Write a new generation holding only live rows, optionally retraining the centroids
+        """
+        snapshot = VectorSnapshot(self.path, meta)
+        rows = snapshot.live_rows
+        centroids = snapshot.centroids
+        if train and len(rows) >= self.train_min_rows:
+            clusters = max(1, int(np.sqrt(len(rows))))
+            rng = np.random.default_rng(len(rows))
+            sample = np.sort(rng.choice(rows, min(len(rows), clusters * 64), replace=False))
+            centroids = kmeans(np.asarray(snapshot.vectors[sample]), clusters)
+            meta["trained_rows"] = int(len(rows))
+            logger.info("Trained %d IVF lists on %d of %d vectors", clusters, len(sample), len(rows))
+        
+        generation = meta["generation"] + 1
+        with open(self._file("vectors", generation), "wb") as vectors_file, \
+                open(self._file("lists", generation), "wb") as lists_file:
+            for start in range(0, len(rows), chunk_rows):
+                block = np.asarray(snapshot.vectors[rows[start:start + chunk_rows]])
+                vectors_file.write(block.tobytes())
+                if centroids is not None:
+                    lists = nearest_centroids(centroids, block)
+                else:
+                    lists = np.asarray(snapshot.lists[rows[start:start + chunk_rows]])
+                lists_file.write(np.asarray(lists, dtype=np.int32).tobytes())
+        if centroids is not None:
+            with open(self._file("centroids", generation), "wb") as f:
+                np.save(f, centroids)
+        with open(self._file("ids", generation), "wb") as f:
+            f.write(np.asarray(snapshot.ids[rows]).tobytes())
+        meta["generation"] = generation
+
+
+_indexes = {}
+
+
+def get_vector_index(version: str) -> VectorIndex:
+    """
+    Vector index of an embedding version under VECTOR_INDEX_PATH, opened once per process
+    """
+    index = _indexes.get(version)
+    if index is None:
+        index = _indexes.setdefault(version, VectorIndex(os.path.join(settings.VECTOR_INDEX_PATH, version)))
+    return index
+
+
+def index_versions() -> list:
+    """
+    Embedding versions with a vector index on disk (earlier versions stay until they are removed)
+    """
+    if not os.path.isdir(settings.VECTOR_INDEX_PATH):
+        return []
+    return sorted(
+        name for name in os.listdir(settings.VECTOR_INDEX_PATH)
+        if os.path.exists(os.path.join(settings.VECTOR_INDEX_PATH, name, VectorIndex.META))
+    )
+
+
+def rebuild(version: str = None, batch_size: int = 256) -> dict:
+    """
+    Re-embed the indexed text stored in the database into a fresh vector index
+    """
+    from database.connection import SessionLocal
+    from database.models import Document, SearchIndex
+    from agents.search.embeddings import embed_texts, current_embedding_version
+    
+    version = version or current_embedding_version()
+    index = get_vector_index(version)
+    db = SessionLocal()
+    try:
+        last_id, total = 0, 0
+        while True:
+            rows = db.query(SearchIndex.id, SearchIndex.document_id, SearchIndex.indexed_text).join(
+                Document, Document.id == SearchIndex.document_id
+            ).filter(SearchIndex.id > last_id).order_by(SearchIndex.id).limit(batch_size).all()
+            if not rows:
+                break
+            _, vectors = embed_texts([row.indexed_text or "" for row in rows], version)
+            index.upsert([row.document_id for row in rows], vectors)
+            last_id = rows[-1].id
+            total += len(rows)
+            logger.info("Embedded %d documents", total)
+    finally:
+        db.close()
+    index.compact()
+    return index.stats()
+
+
+if __name__ == "__main__":
+    from agents.search.embeddings import current_embedding_version
+    
+    parser = argparse.ArgumentParser(description="Maintain the vector index")
+    parser.add_argument("--version", help="Embedding version (default: the active one)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every indexed document from the database")
+    parser.add_argument("--train", action="store_true", help="Retrain the IVF centroids and compact")
+    parser.add_argument("--compact", action="store_true", help="Drop deleted rows")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    version = args.version or current_embedding_version()
+    if args.rebuild:
+        rebuild(version)
+    elif args.train:
+        get_vector_index(version).train()
+    elif args.compact:
+        get_vector_index(version).compact()
+    print(json.dumps(get_vector_index(version).stats()))
@@ -3,9 +3,11 @@ Storage Agent Service
 Manages document storage across different backends (local, S3, MinIO)
 """
 import os
+import hashlib
 from sqlalchemy.orm import Session
 from database.models import Document
 from config.settings import settings
+from common.concurrency import offload
 
 
 class StorageService:
@@ -13,12 +15,15 @@ class StorageService:
     Service for managing document storage
     """
     
+    CHUNK_SIZE = 1024 * 1024  # 1MB read chunks for checksum verification
+    
     def __init__(self, db: Session):
         self.db = db
         self.storage_type = settings.STORAGE_TYPE
         self.storage_path = settings.STORAGE_PATH
     
-    async def get_file_path(self, document_id: int) -> str:
+    @offload
+    def get_file_path(self, document_id: int) -> str:
         """
         Get file path for a document
         """
@@ -28,7 +33,8 @@ class StorageService:
         
         return document.storage_path
     
-    async def get_storage_info(self, document_id: int) -> dict:
+    @offload
+    def get_storage_info(self, document_id: int) -> dict:
         """
         Get storage information for a document
         """
@@ -47,7 +53,8 @@ class StorageService:
             "checksum": document.checksum
         }
     
-    async def migrate(self, document_id: int, target_storage: str) -> dict:
+    @offload
+    def migrate(self, document_id: int, target_storage: str) -> dict:
         """
         Migrate document to different storage backend
         TODO: Implement actual migration logic for S3, MinIO, etc.
@@ -70,7 +77,8 @@ class StorageService:
             "message": "Migration simulated (not implemented)"
         }
     
-    async def delete(self, document_id: int):
+    @offload
+    def delete(self, document_id: int):
         """
         Delete document from storage
         """
@@ -85,7 +93,8 @@ class StorageService:
         # Delete database record handled by documents endpoint
         return True
     
-    async def verify_integrity(self, document_id: int) -> dict:
+    @offload
+    def verify_integrity(self, document_id: int) -> dict:
         """
         Verify file integrity using checksum
         """
@@ -99,10 +108,12 @@ class StorageService:
                 "error": "File not found"
             }
         
-        # Calculate current checksum
-        import hashlib
+        # Calculate current checksum in chunks to keep memory flat on large files
+        hasher = hashlib.sha256()
         with open(document.storage_path, 'rb') as f:
-            current_checksum = hashlib.sha256(f.read()).hexdigest()
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        current_checksum = hasher.hexdigest()
         
         is_valid = current_checksum == document.checksum
         
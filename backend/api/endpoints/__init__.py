@@ -1,7 +1,7 @@
 """
 API endpoints package
 """
-from . import documents, ingestion, ocr, classification, metadata, search, storage
+from . import documents, ingestion, ocr, classification, metadata, search, storage, pipeline, jobs, cache, models, dedup
 
 __all__ = [
     "documents",
@@ -10,5 +10,10 @@ __all__ = [
     "classification",
     "metadata",
     "search",
-    "storage"
+    "storage",
+    "pipeline",
+    "jobs",
+    "cache",
+    "models",
+    "dedup"
 ]
@@ -0,0 +1,22 @@
+"""
+Stage result cache endpoints
+"""
+from fastapi import APIRouter
+from common.cache import stage_cache
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_cache_stats():
+    """
+    Get hit/miss counters and usage of the stage result cache (this worker process)
+    """
+    return stage_cache.stats()
+
+@router.delete("/")
+async def clear_cache():
+    """
+    Clear the stage result cache (this worker process)
+    """
+    stage_cache.clear()
+    return {"message": "Cache cleared"}
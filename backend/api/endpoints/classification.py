@@ -3,11 +3,24 @@ Document classification endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from typing import List
 from database import get_db
 from agents.classifier.service import ClassifierService
 
 router = APIRouter()
 
+@router.post("/classify/batch")
+async def classify_batch(document_ids: List[int], db: Session = Depends(get_db)):
+    """
+    Classify multiple documents in one vectorized pass
+    """
+    try:
+        classifier_service = ClassifierService(db)
+        results = await classifier_service.classify_batch(document_ids)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/classify/{document_id}")
 async def classify_document(document_id: int, db: Session = Depends(get_db)):
     """
@@ -22,7 +35,8 @@ async def classify_document(document_id: int, db: Session = Depends(get_db)):
             "category": result["category"],
             "subcategory": result["subcategory"],
             "confidence": result["confidence"],
-            "tags": result["tags"]
+            "tags": result["tags"],
+            "model_version": result["model_version"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
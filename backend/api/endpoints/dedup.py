@@ -0,0 +1,37 @@
+"""
+Near-duplicate detection endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from database import get_db
+from agents.dedup.service import DedupService
+
+router = APIRouter()
+
+@router.get("/clusters")
+async def list_clusters(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+    """
+    Near-duplicate clusters from the last run of python -m agents.dedup.cluster, largest first
+    """
+    dedup_service = DedupService(db)
+    return await dedup_service.list_clusters(skip, limit)
+
+@router.get("/{document_id}")
+async def find_near_duplicates(
+    document_id: int,
+    threshold: Optional[float] = Query(None, ge=0, le=1),
+    limit: int = 20,
+    db: Session = Depends(get_db)
+):
+    """
+    Find rescans and other near-duplicates of a document by MinHash similarity of its OCR text
+    """
+    dedup_service = DedupService(db)
+    duplicates = await dedup_service.find_near_duplicates(document_id, threshold, limit)
+    if duplicates is None:
+        raise HTTPException(status_code=404, detail="Document has no signature; index it first")
+    return {
+        "document_id": document_id,
+        "near_duplicates": duplicates
+    }
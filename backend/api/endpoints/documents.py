@@ -1,55 +1,85 @@
 """
 Document management endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db, Document
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import (
+    get_async_db, Document, OCRResult, DocumentMetadata, MetadataValue, DocumentClassification,
+    SearchIndex, DocumentSignature, SignatureBucket
+)
 from datetime import datetime
+from common.concurrency import run_blocking
+from common.pagination import keyset_after, keyset_cursor, table_total
+from agents.search.service import SearchService
 
 router = APIRouter()
 
 @router.get("/")
 async def list_documents(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    exact_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all documents with pagination
+    List documents newest first, one keyset page at a time. Pass next_cursor back as cursor
+    for the following page. total is estimated unless exact_total is set.
     """
-    documents = db.query(Document).offset(skip).limit(limit).all()
-    return {"documents": documents, "total": db.query(Document).count()}
+    statement = select(Document).order_by(Document.upload_date.desc(), Document.id.desc())
+    if cursor:
+        try:
+            statement = statement.where(keyset_after(cursor, Document.upload_date, Document.id))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # One extra row tells whether there is a next page
+    documents = (await db.execute(statement.limit(limit + 1))).scalars().all()
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = keyset_cursor(documents[-1].upload_date, documents[-1].id)
+    
+    total, total_exact = await table_total(db, Document, exact=exact_total)
+    return {"documents": documents, "next_cursor": next_cursor, "total": total, "total_exact": total_exact}
 
 @router.get("/{document_id}")
-async def get_document(document_id: int, db: Session = Depends(get_db)):
+async def get_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get a specific document by ID
     """
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     return document
 
 @router.delete("/{document_id}")
-async def delete_document(document_id: int, db: Session = Depends(get_db)):
+async def delete_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a document by ID
     """
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    db.delete(document)
-    db.commit()
+    # The relationships do not cascade, so remove the rows that reference the document first
+    for model in (
+        OCRResult, DocumentMetadata, MetadataValue, DocumentClassification,
+        SearchIndex, SignatureBucket, DocumentSignature
+    ):
+        await db.execute(delete(model).where(model.document_id == document_id))
+    await db.delete(document)
+    await db.commit()
+    await run_blocking(SearchService.remove_documents, [document_id])
     return {"message": "Document deleted successfully"}
 
 @router.get("/{document_id}/status")
-async def get_document_status(document_id: int, db: Session = Depends(get_db)):
+async def get_document_status(document_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get the processing status of a document
     """
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
@@ -1,10 +1,11 @@
 """
 Document ingestion endpoints
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Request, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from agents.ingestion.service import IngestionService
+from agents.ingestion.resumable import ResumableUploadService, UploadOffsetMismatch, UploadInProgress
 from typing import List
 
 router = APIRouter()
@@ -38,22 +39,7 @@ async def upload_documents_batch(
     Upload multiple documents in batch
     """
     ingestion_service = IngestionService(db)
-    results = []
-    
-    for file in files:
-        try:
-            result = await ingestion_service.process_upload(file)
-            results.append({
-                "filename": result["filename"],
-                "document_id": result["document_id"],
-                "status": "success"
-            })
-        except Exception as e:
-            results.append({
-                "filename": file.filename,
-                "status": "failed",
-                "error": str(e)
-            })
+    results = await ingestion_service.process_batch(files)
     
     return {"results": results}
 
@@ -65,3 +51,107 @@ async def validate_document(file: UploadFile = File(...)):
     ingestion_service = IngestionService(None)
     validation_result = await ingestion_service.validate_file(file)
     return validation_result
+
+@router.post("/uploads")
+async def create_resumable_upload(
+    filename: str,
+    total_size: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Start a resumable upload session
+    """
+    try:
+        upload_service = ResumableUploadService(db)
+        session = await upload_service.create_session(filename, total_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "upload_id": session["upload_id"],
+        "offset": session["offset"],
+        "total_size": session["total_size"]
+    }
+
+@router.get("/uploads/{upload_id}")
+async def get_resumable_upload(upload_id: str, response: Response, db: Session = Depends(get_db)):
+    """
+    Get the current offset of a resumable upload
+    """
+    upload_service = ResumableUploadService(db)
+    try:
+        session = await upload_service.get_session(upload_id)
+    except ValueError:
+        session = None
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return {
+        "upload_id": upload_id,
+        "filename": session["filename"],
+        "offset": session["offset"],
+        "total_size": session["total_size"]
+    }
+
+@router.patch("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Append a chunk (raw request body) at the offset given in the Upload-Offset header
+    """
+    upload_service = ResumableUploadService(db)
+    try:
+        session = await upload_service.append_chunk(upload_id, upload_offset, request.stream())
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected)})
+    except UploadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return {
+        "upload_id": upload_id,
+        "offset": session["offset"],
+        "total_size": session["total_size"]
+    }
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_resumable_upload(upload_id: str, db: Session = Depends(get_db)):
+    """
+    Complete a resumable upload and create the document
+    """
+    upload_service = ResumableUploadService(db)
+    try:
+        result = await upload_service.finalize(upload_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return {
+        "message": "Document uploaded successfully",
+        "document_id": result["document_id"],
+        "filename": result["filename"],
+        "status": "processing"
+    }
+
+@router.delete("/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: str, db: Session = Depends(get_db)):
+    """
+    Cancel a resumable upload and discard received chunks
+    """
+    upload_service = ResumableUploadService(db)
+    try:
+        aborted = await upload_service.abort(upload_id)
+    except ValueError:
+        aborted = False
+    if not aborted:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return {"message": "Upload cancelled"}
@@ -0,0 +1,48 @@
+"""
+Background job endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from database import get_db
+from agents.jobs.service import JobService
+
+router = APIRouter()
+
+@router.post("/{stage}/batch")
+async def enqueue_jobs_batch(stage: str, document_ids: List[int], db: Session = Depends(get_db)):
+    """
+    Queue a processing stage for multiple documents
+    """
+    try:
+        job_service = JobService(db)
+        jobs = await job_service.enqueue_batch(stage, document_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"jobs": jobs}
+
+@router.post("/{stage}/{document_id}")
+async def enqueue_job(stage: str, document_id: int, db: Session = Depends(get_db)):
+    """
+    Queue a processing stage (pipeline, ocr, classification, metadata, index) for a document
+    """
+    try:
+        job_service = JobService(db)
+        job = await job_service.enqueue(stage, document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "message": "Job queued",
+        **job
+    }
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Get the status of a background job
+    """
+    job_service = JobService(db)
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -3,6 +3,7 @@ Metadata extraction endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from typing import Dict
 from database import get_db
 from agents.metadata.service import MetadataService
 
@@ -35,6 +36,23 @@ async def get_metadata(document_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Metadata not found")
     return result
 
+@router.put("/batch")
+async def update_metadata_batch(
+    updates: Dict[int, dict],
+    db: Session = Depends(get_db)
+):
+    """
+    Update metadata for multiple documents in one transaction
+    """
+    try:
+        metadata_service = MetadataService(db)
+        result = await metadata_service.update_metadata_batch(updates)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return result
+
 @router.put("/{document_id}")
 async def update_metadata(
     document_id: int,
@@ -51,5 +69,7 @@ async def update_metadata(
             "message": "Metadata updated successfully",
             "document_id": document_id
         }
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
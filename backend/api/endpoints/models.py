@@ -0,0 +1,27 @@
+"""
+Model registry endpoints
+"""
+from fastapi import APIRouter, HTTPException
+from common.concurrency import run_blocking
+from common.registry import model_registry
+
+router = APIRouter()
+
+@router.get("/")
+async def get_models():
+    """
+    Get active and available versions per model kind, with load time and memory of loaded models (this worker process)
+    """
+    return model_registry.stats()
+
+@router.post("/{kind}/activate/{version}")
+async def activate_model(kind: str, version: str):
+    """
+    Load a model version and make it active; other workers switch on their next registry poll
+    """
+    try:
+        return await run_blocking(model_registry.activate, kind, version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,9 @@
 """
 OCR processing endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from typing import List
 from database import get_db
 from agents.ocr.service import OCRService
 
@@ -21,7 +22,8 @@ async def process_ocr(document_id: int, db: Session = Depends(get_db)):
             "document_id": document_id,
             "text_length": len(result["text"]),
             "confidence": result["confidence"],
-            "pages": result["pages"]
+            "pages": result["pages"],
+            "ocr_pages": result["ocr_pages"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -38,13 +40,13 @@ async def get_ocr_result(document_id: int, db: Session = Depends(get_db)):
     return result
 
 @router.post("/reprocess/{document_id}")
-async def reprocess_ocr(document_id: int, db: Session = Depends(get_db)):
+async def reprocess_ocr(document_id: int, force: bool = False, db: Session = Depends(get_db)):
     """
-    Reprocess OCR for a document
+    Reprocess OCR for a document (force=true bypasses cached results)
     """
     try:
         ocr_service = OCRService(db)
-        result = await ocr_service.reprocess_document(document_id)
+        result = await ocr_service.reprocess_document(document_id, force=force)
         return {
             "message": "OCR reprocessing completed",
             "document_id": document_id,
@@ -52,3 +54,42 @@ async def reprocess_ocr(document_id: int, db: Session = Depends(get_db)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reprocess/{document_id}/pages")
+async def reprocess_ocr_pages(
+    document_id: int,
+    pages: List[int] = Query(None),
+    below_confidence: int = Query(None, ge=0, le=100),
+    dpi: int = Query(None, ge=72, le=600),
+    language: str = Query(None, max_length=100),
+    deskew: bool = Query(None),
+    binarize: bool = Query(None),
+    threshold: float = Query(None, gt=0, lt=1),
+    window: int = Query(None, ge=3, le=255),
+    db: Session = Depends(get_db)
+):
+    """
+    Reprocess selected pages (?pages=2&pages=5) and/or pages below a confidence threshold,
+    optionally with other preprocessing settings (dpi, deskew, binarize, threshold, window)
+    or Tesseract languages (e.g. language=eng+mal).
+    Downstream results are marked stale; POST /pipeline/refresh/{document_id} updates them.
+    """
+    requested = {"target_dpi": dpi, "deskew": deskew, "binarize": binarize, "threshold": threshold, "window": window}
+    overrides = {key: value for key, value in requested.items() if value is not None}
+    try:
+        ocr_service = OCRService(db)
+        result = await ocr_service.reprocess_pages(
+            document_id,
+            pages=pages,
+            below_confidence=below_confidence,
+            overrides=overrides,
+            language=language
+        )
+        return {
+            "message": "OCR page reprocessing completed",
+            **result
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,56 @@
+"""
+Document processing pipeline endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from database import get_db
+from agents.pipeline.service import PipelineService
+
+router = APIRouter()
+
+@router.post("/run/batch")
+async def run_pipeline_batch(document_ids: List[int], db: Session = Depends(get_db)):
+    """
+    Run the full processing pipeline for multiple documents
+    """
+    pipeline_service = PipelineService(db)
+    results = await pipeline_service.run_batch(document_ids)
+    return {"results": results}
+
+@router.post("/run/{document_id}")
+async def run_pipeline(document_id: int, db: Session = Depends(get_db)):
+    """
+    Run OCR, classification, metadata extraction and indexing for a document
+    """
+    try:
+        pipeline_service = PipelineService(db)
+        result = await pipeline_service.run(document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if result["status"] == "failed":
+        raise HTTPException(
+            status_code=500,
+            detail=f"Pipeline failed at stage {result['failed_stage']}: {result['error']}"
+        )
+    return {
+        "message": "Document processed successfully",
+        **result
+    }
+
+@router.post("/refresh/{document_id}")
+async def refresh_pipeline(document_id: int, db: Session = Depends(get_db)):
+    """
+    Re-run only the stages marked stale by page-level OCR reprocessing
+    """
+    try:
+        pipeline_service = PipelineService(db)
+        result = await pipeline_service.refresh(document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "message": "Stale results refreshed",
+        **result
+    }
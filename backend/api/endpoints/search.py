@@ -1,30 +1,50 @@
 """
 Document search endpoints
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from database import get_db
 from agents.search.service import SearchService
-from typing import Optional
+from typing import List, Optional
 
 router = APIRouter()
 
 @router.get("/")
 async def search_documents(
     query: str = Query(..., min_length=1),
-    skip: int = 0,
-    limit: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    mode: str = "lexical",
+    fusion: str = "rrf",
+    category: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Search documents using text query
+    Search documents using text query: lexical, semantic (vector) or hybrid with rank fusion
     """
     search_service = SearchService(db)
-    results = await search_service.search(query, skip, limit)
+    try:
+        results = await search_service.search(
+            query,
+            cursor,
+            limit,
+            mode=mode,
+            fusion=fusion,
+            category=category,
+            date_from=date_from,
+            date_to=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "query": query,
+        "mode": mode,
         "results": results["documents"],
         "total": results["total"],
+        "next_cursor": results["next_cursor"],
         "took": results["took"]
     }
 
@@ -38,7 +58,8 @@ async def index_document(document_id: int, db: Session = Depends(get_db)):
         result = await search_service.index_document(document_id)
         return {
             "message": "Document indexed successfully",
-            "document_id": document_id
+            "document_id": document_id,
+            "near_duplicates": result["near_duplicates"]
         }
     except Exception as e:
         from fastapi import HTTPException
@@ -63,16 +84,44 @@ async def advanced_search(
     category: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    meta: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    exact_total: bool = False,
+    format: str = "json",
     db: Session = Depends(get_db)
 ):
     """
-    Advanced search with multiple filters
+    Advanced search with multiple filters, including typed metadata filters such as
+    meta=dates:2024-03-01..2024-03-31 and meta=amounts:>1L.
+    Paginated as JSON, or every match streamed with format=ndjson or format=csv.
     """
     search_service = SearchService(db)
-    results = await search_service.advanced_search(
-        query=query,
-        category=category,
-        date_from=date_from,
-        date_to=date_to
-    )
+    try:
+        if format != "json":
+            lines = search_service.export_advanced_search(
+                format,
+                query=query,
+                category=category,
+                date_from=date_from,
+                date_to=date_to,
+                meta=meta
+            )
+            return StreamingResponse(
+                lines,
+                media_type=SearchService.EXPORT_FORMATS[format],
+                headers={"Content-Disposition": f'attachment; filename="documents.{format}"'}
+            )
+        results = await search_service.advanced_search(
+            query=query,
+            category=category,
+            date_from=date_from,
+            date_to=date_to,
+            meta=meta,
+            cursor=cursor,
+            limit=limit,
+            exact_total=exact_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return results
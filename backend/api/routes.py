@@ -9,7 +9,12 @@ from api.endpoints import (
     classification,
     metadata,
     search,
-    storage
+    storage,
+    pipeline,
+    jobs,
+    cache,
+    models,
+    dedup
 )
 
 router = APIRouter()
@@ -22,3 +27,8 @@ router.include_router(classification.router, prefix="/classification", tags=["cl
 router.include_router(metadata.router, prefix="/metadata", tags=["metadata"])
 router.include_router(search.router, prefix="/search", tags=["search"])
 router.include_router(storage.router, prefix="/storage", tags=["storage"])
+router.include_router(pipeline.router, prefix="/pipeline", tags=["pipeline"])
+router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+router.include_router(cache.router, prefix="/cache", tags=["cache"])
+router.include_router(models.router, prefix="/models", tags=["models"])
+router.include_router(dedup.router, prefix="/dedup", tags=["dedup"])
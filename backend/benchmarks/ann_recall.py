@@ -0,0 +1,104 @@
+"""
+Vector index benchmark
+Recall@k and latency of the IVF index against exact NumPy brute force, on clustered synthetic
+embeddings inserted incrementally.
+
+Usage:
+    python -m benchmarks.ann_recall --vectors 200000 --nprobe 1 4 8 16 32
+    python -m benchmarks.ann_recall --path ./storage/vectors/<version>  (an existing index)
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+from agents.search.vector_index import VectorIndex
+
+
+def synthetic_vectors(count: int, dimension: int, topics: int, noise: float, rng) -> np.ndarray:
+    """
+    Normalized vectors scattered around random topic directions, like document embeddings.
+    More noise spreads neighbours across topics, which is harder for IVF.
+    """
+    centers = rng.standard_normal((topics, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, topics, count)] + rng.standard_normal((count, dimension)).astype(np.float32) * noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    temporary = None
+    path = args.path
+    if path is None:
+        temporary = path = tempfile.mkdtemp(prefix="vector-index-")
+
+    try:
+        index = VectorIndex(path, nprobe=max(args.nprobe))
+        if temporary:
+            data = synthetic_vectors(args.vectors + args.queries, args.dimension, args.topics, args.noise, rng)
+            queries, data = data[:args.queries], data[args.queries:]
+            start = time.perf_counter()
+            for first in range(0, len(data), args.batch_size):
+                batch = data[first:first + args.batch_size]
+                index.upsert(list(range(first + 1, first + len(batch) + 1)), batch)
+            print(f"inserted {len(data)} vectors in batches of {args.batch_size} in {time.perf_counter() - start:.1f} s")
+
+            # Deleted documents must never come back
+            deleted = set(rng.choice(np.arange(1, len(data) + 1), len(data) // 100, replace=False).tolist())
+            index.delete(list(deleted))
+        else:
+            snapshot = index.refresh()
+            queries = np.asarray(snapshot.vectors[rng.choice(snapshot.live_rows, args.queries, replace=False)])
+            deleted = set()
+
+        stats = index.stats()
+        print(f"{stats['documents']} vectors, dimension {stats['dimension']}, {stats['lists']} IVF lists")
+
+        # Exact neighbours by brute force over the whole matrix
+        snapshot = index.refresh()
+        live = snapshot.live_rows
+        matrix = np.asarray(snapshot.vectors[live])
+        live_ids = np.asarray(snapshot.ids[live])
+        exact, exact_times = [], []
+        for query in queries:
+            start = time.perf_counter()
+            scores = matrix @ query
+            best = np.argpartition(-scores, args.k - 1)[:args.k]
+            exact_times.append((time.perf_counter() - start) * 1000)
+            exact.append(set(live_ids[best].tolist()))
+        print(f"{'exact':<10} recall@{args.k} 1.000  mean {statistics.mean(exact_times):7.2f} ms")
+
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            recalls, timings, leaked = [], [], 0
+            for query, truth in zip(queries, exact):
+                start = time.perf_counter()
+                hits = index.search(query, args.k)
+                timings.append((time.perf_counter() - start) * 1000)
+                found = {document_id for document_id, _ in hits}
+                recalls.append(len(found & truth) / args.k)
+                leaked += len(found & deleted)
+            timings.sort()
+            print(
+                f"nprobe={nprobe:<4} recall@{args.k} {statistics.mean(recalls):.3f}  mean {statistics.mean(timings):7.2f} ms"
+                f"  p95 {timings[int(0.95 * (len(timings) - 1))]:.2f} ms" + (f"  {leaked} deleted results!" if leaked else "")
+            )
+    finally:
+        if temporary:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the IVF vector index against brute force")
+    parser.add_argument("--path", help="Existing vector index to query; a synthetic one is built if omitted")
+    parser.add_argument("--vectors", type=int, default=200_000, help="Synthetic vectors to insert")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500, help="Clusters in the synthetic data")
+    parser.add_argument("--noise", type=float, default=1.2, help="Spread around each topic, relative to the topic vector")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Vectors per incremental insert")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="IVF lists scanned per query")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
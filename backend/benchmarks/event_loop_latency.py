@@ -0,0 +1,89 @@
+"""
+Event loop latency benchmark
+Measures /health latency percentiles against a running API while heavy processing requests are in flight.
+
+Usage:
+    python -m benchmarks.event_loop_latency --base-url http://localhost:8000 --document-ids 1 2 3 --heavy-concurrency 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+def percentile(samples: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def probe_light(client: httpx.AsyncClient, path: str, duration: float, interval: float) -> list:
+    """
+    Hit a light endpoint repeatedly and record latencies in milliseconds
+    """
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_heavy(client: httpx.AsyncClient, path_template: str, document_ids: list, concurrency: int, duration: float) -> int:
+    """
+    Keep `concurrency` heavy requests in flight until the duration elapses
+    """
+    deadline = time.perf_counter() + duration
+    completed = 0
+
+    async def worker(worker_index: int):
+        nonlocal completed
+        i = worker_index
+        while time.perf_counter() < deadline:
+            document_id = document_ids[i % len(document_ids)]
+            await client.post(path_template.format(document_id=document_id))
+            completed += 1
+            i += concurrency
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return completed
+
+
+def report(label: str, latencies: list):
+    print(
+        f"{label:<10} n={len(latencies):<5} "
+        f"p50={percentile(latencies, 50):8.2f}ms  p95={percentile(latencies, 95):8.2f}ms  "
+        f"p99={percentile(latencies, 99):8.2f}ms  max={max(latencies):8.2f}ms  mean={statistics.mean(latencies):8.2f}ms"
+    )
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=300) as client:
+        # Baseline: light endpoint alone
+        idle = await probe_light(client, args.light_path, args.duration, args.interval)
+        report("idle", idle)
+
+        # Under load: light endpoint while heavy jobs run
+        light_task = asyncio.create_task(probe_light(client, args.light_path, args.duration, args.interval))
+        heavy_done = await run_heavy(client, args.heavy_path, args.document_ids, args.heavy_concurrency, args.duration)
+        loaded = await light_task
+        report("loaded", loaded)
+        print(f"heavy requests completed: {heavy_done}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--light-path", default="/health")
+    parser.add_argument("--heavy-path", default="/api/v1/pipeline/run/{document_id}")
+    parser.add_argument("--document-ids", type=int, nargs="+", required=True)
+    parser.add_argument("--heavy-concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.02, help="Pause between light probes")
+    asyncio.run(main(parser.parse_args()))
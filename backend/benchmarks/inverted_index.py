@@ -0,0 +1,124 @@
+"""
+Search index benchmark
+Builds a synthetic corpus with Zipf-distributed terms straight into index segments and
+measures BM25 top-k query latency.
+
+Usage:
+    python -m benchmarks.inverted_index --documents 1000000 --segments 8
+    python -m benchmarks.inverted_index --path ./storage/search_index  (an existing index)
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+from agents.search.inverted_index import InvertedIndex, encode_terms, write_segment
+
+
+def build_corpus(path: str, documents: int, segments: int, length: int, vocabulary: int, seed: int):
+    """
+    Write `segments` segments holding `documents` synthetic pages of about `length` terms each
+    """
+    rng = np.random.default_rng(seed)
+    # Zipf's law: the term of rank r occurs with probability proportional to 1 / r
+    cdf = np.cumsum(1.0 / np.arange(1, vocabulary + 1))
+    cdf /= cdf[-1]
+    terms, term_order = np.unique(encode_terms(f"t{rank}" for rank in range(vocabulary)), return_inverse=True)
+    term_order = term_order.reshape(-1)
+
+    os.makedirs(path, exist_ok=True)
+    names = []
+    per_segment = -(-documents // segments)
+    for number, first in enumerate(range(0, documents, per_segment)):
+        count = min(per_segment, documents - first)
+        lengths = rng.poisson(length, count).astype(np.int64) + 1
+        ordinals = np.repeat(np.arange(count, dtype=np.int64), lengths)
+        ranks = np.minimum(np.searchsorted(cdf, rng.random(len(ordinals))), vocabulary - 1)
+
+        # One posting per (term, document) with its frequency, grouped by term
+        keys, freqs = np.unique(term_order[ranks] * count + ordinals, return_counts=True)
+        name = f"seg-{number:08d}"
+        write_segment(
+            os.path.join(path, name),
+            np.arange(first + 1, first + count + 1, dtype=np.int64),
+            lengths,
+            terms,
+            keys // count,
+            keys % count,
+            freqs
+        )
+        names.append(name)
+
+    with open(os.path.join(path, InvertedIndex.MANIFEST), "w") as f:
+        json.dump({"generation": len(names), "segments": [{"name": name, "deleted": None} for name in names]}, f)
+
+
+def directory_size(path: str) -> int:
+    """
+    Bytes used by the files under a directory
+    """
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main(args):
+    path = args.path
+    temporary = None
+    if path is None:
+        temporary = path = tempfile.mkdtemp(prefix="search-index-")
+        start = time.perf_counter()
+        build_corpus(path, args.documents, args.segments, args.length, args.vocabulary, args.seed)
+        print(f"built {args.documents} documents in {args.segments} segments in {time.perf_counter() - start:.1f} s")
+
+    try:
+        index = InvertedIndex(path, max_segments=max(args.segments, 1))
+        stats = index.stats()
+        print(f"{stats['documents']} documents, {stats['segments']} segments, {directory_size(path) / 2 ** 20:.0f} MiB on disk")
+
+        # Queries of 1-3 terms, mixing common and rare words
+        rng = np.random.default_rng(args.seed + 1)
+        ranks = rng.integers(1, args.vocabulary // 10, size=(args.queries, 3))
+        widths = rng.integers(1, 4, size=args.queries)
+        queries = [" ".join(f"t{rank}" for rank in row[:width]) for row, width in zip(ranks, widths)]
+
+        for query in queries[:10]:
+            index.search(query, args.top_k)  # page in the term dictionaries
+
+        timings, matches = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, total = index.search(query, args.top_k)
+            timings.append((time.perf_counter() - start) * 1000)
+            matches.append(total)
+
+        print(f"{args.queries} queries, top {args.top_k}, {statistics.mean(matches):.0f} matching documents on average")
+        print(
+            f"latency  mean {statistics.mean(timings):.2f} ms  p50 {percentile(timings, 0.5):.2f} ms"
+            f"  p95 {percentile(timings, 0.95):.2f} ms  p99 {percentile(timings, 0.99):.2f} ms"
+        )
+    finally:
+        if temporary:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BM25 queries on the search index")
+    parser.add_argument("--path", help="Existing index to query; a synthetic one is built if omitted")
+    parser.add_argument("--documents", type=int, default=1_000_000, help="Synthetic pages to index")
+    parser.add_argument("--segments", type=int, default=8, help="Segments the synthetic corpus is split into")
+    parser.add_argument("--length", type=int, default=150, help="Average terms per synthetic page")
+    parser.add_argument("--vocabulary", type=int, default=100_000, help="Distinct terms in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=500, help="Queries to time")
+    parser.add_argument("--top-k", type=int, default=20, help="Results per query")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
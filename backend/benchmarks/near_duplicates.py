@@ -0,0 +1,112 @@
+"""
+Near-duplicate detection benchmark
+Signs a synthetic corpus in which some documents are rescans (copies with OCR-style word
+errors), then measures LSH lookup latency, rescan recall and false positives, and the
+corpus clustering job, in a scratch SQLite database.
+
+Usage:
+    python -m benchmarks.near_duplicates --documents 50000 --rescans 0.2 --error-rate 0.02
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from database.connection import Base
+from database.models import Document, DocumentType, SearchIndex, DocumentSignature, SignatureBucket
+from agents.dedup.service import DedupService
+
+
+def synthetic_corpus(args, rng) -> tuple:
+    """
+    (texts, originals): Zipf-distributed pages, followed by rescans of randomly chosen pages.
+    originals maps a rescan's index to the index of the page it copies.
+    """
+    cdf = np.cumsum(1.0 / np.arange(1, args.vocabulary + 1))
+    cdf /= cdf[-1]
+    words = np.array([f"w{rank}" for rank in range(args.vocabulary)], dtype=object)
+
+    originals_count = int(args.documents / (1 + args.rescans))
+    pages = []
+    for _ in range(originals_count):
+        ranks = np.minimum(np.searchsorted(cdf, rng.random(rng.poisson(args.length) + 10)), args.vocabulary - 1)
+        pages.append(list(words[ranks]))
+
+    texts = [" ".join(page) for page in pages]
+    originals = {}
+    for source in rng.integers(0, originals_count, args.documents - originals_count):
+        # OCR errors: a share of the words come out garbled
+        page = list(pages[source])
+        for position in np.flatnonzero(rng.random(len(page)) < args.error_rate):
+            page[position] = page[position] + "~"
+        originals[len(texts)] = int(source)
+        texts.append(" ".join(page))
+    return texts, originals
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    workdir = tempfile.mkdtemp(prefix="near-duplicates-")
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'dedup.db')}")
+        Base.metadata.create_all(engine, tables=[Document.__table__, SearchIndex.__table__, DocumentSignature.__table__, SignatureBucket.__table__])
+        db = Session(engine)
+        service = DedupService(db)
+
+        texts, originals = synthetic_corpus(args, rng)
+        db.execute(insert(Document), [
+            {"id": index + 1, "filename": f"page-{index}.pdf", "original_filename": f"page-{index}.pdf", "file_type": DocumentType.PDF}
+            for index in range(len(texts))
+        ])
+        db.commit()
+
+        start = time.perf_counter()
+        for first in range(0, len(texts), args.batch_size):
+            batch = texts[first:first + args.batch_size]
+            service.sign_texts(list(range(first + 1, first + len(batch) + 1)), batch)
+            db.commit()
+        elapsed = time.perf_counter() - start
+        print(f"signed {len(texts)} documents ({len(originals)} rescans) in {elapsed:.1f} s, {len(texts) / elapsed:.0f} documents/s")
+
+        # Each rescan looked up should find the page it copies
+        rescans = rng.choice(list(originals), min(args.queries, len(originals)), replace=False)
+        timings, found, false_positives = [], 0, 0
+        for index in rescans:
+            start = time.perf_counter()
+            matches = service.near_duplicates(int(index) + 1)
+            timings.append((time.perf_counter() - start) * 1000)
+            matched = {match["id"] - 1 for match in matches}
+            source = originals[int(index)]
+            found += source in matched
+            # Other rescans of the same page are true duplicates too
+            false_positives += len({other for other in matched if other != source and originals.get(other) != source})
+        timings.sort()
+        print(
+            f"lookup mean {statistics.mean(timings):.2f} ms  p50 {timings[len(timings) // 2]:.2f} ms  "
+            f"p95 {timings[int(0.95 * (len(timings) - 1))]:.2f} ms"
+        )
+        print(f"rescans matched to their original {found / len(rescans):.3f}  false positives {false_positives}")
+
+        start = time.perf_counter()
+        summary = service.cluster()
+        print(f"clustered in {time.perf_counter() - start:.1f} s: {summary}")
+        db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MinHash LSH near-duplicate detection")
+    parser.add_argument("--documents", type=int, default=50_000, help="Synthetic documents, rescans included")
+    parser.add_argument("--rescans", type=float, default=0.2, help="Rescans per original page")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Share of words garbled in a rescan")
+    parser.add_argument("--length", type=int, default=300, help="Average words per page")
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="Distinct words in the synthetic corpus")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents signed per transaction")
+    parser.add_argument("--queries", type=int, default=500, help="Rescans looked up")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
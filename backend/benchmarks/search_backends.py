@@ -0,0 +1,120 @@
+"""
+Search backend benchmark
+Compares bulk index build time and query latency of the backends on a synthetic corpus.
+The SearchBackend contract itself is checked by tests/test_search_backends.py.
+
+Usage:
+    python -m benchmarks.search_backends --backends inverted sqlite --documents 100000
+    python -m benchmarks.search_backends --backends postgres  (uses DATABASE_URL, in a scratch table)
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+from agents.search.backends import InvertedIndexBackend, SQLiteSearchBackend, PostgresSearchBackend
+
+
+def open_backend(name: str, workdir: str):
+    """
+    A fresh backend of the given kind that does not touch the application's own index
+    """
+    if name == "inverted":
+        return InvertedIndexBackend(os.path.join(workdir, "inverted"))
+    if name == "sqlite":
+        return SQLiteSearchBackend(os.path.join(workdir, "search.db"))
+    if name == "postgres":
+        backend = PostgresSearchBackend(table_name="search_documents_benchmark")
+        backend.table.create(backend.engine, checkfirst=True)
+        return backend
+    raise ValueError(f"Unknown search backend {name}")
+
+
+def close_backend(backend):
+    """
+    Drop scratch state that lives outside the work directory
+    """
+    if isinstance(backend, PostgresSearchBackend):
+        backend.table.drop(backend.engine, checkfirst=True)
+
+
+def synthetic_texts(documents: int, length: int, vocabulary: int, seed: int):
+    """
+    Pages of Zipf-distributed words, in batches of 1000 (document_id, text)
+    """
+    rng = np.random.default_rng(seed)
+    cdf = np.cumsum(1.0 / np.arange(1, vocabulary + 1))
+    cdf /= cdf[-1]
+    words = np.array([f"w{rank}" for rank in range(vocabulary)], dtype=object)
+    for first in range(0, documents, 1000):
+        count = min(1000, documents - first)
+        lengths = rng.poisson(length, count) + 1
+        ranks = np.minimum(np.searchsorted(cdf, rng.random(lengths.sum())), vocabulary - 1)
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        yield [
+            (first + i + 1, " ".join(words[ranks[bounds[i]:bounds[i + 1]]]))
+            for i in range(count)
+        ]
+
+
+def benchmark(backend, args) -> dict:
+    """
+    Bulk build time and top-k query latency percentiles
+    """
+    backend.clear()
+    start = time.perf_counter()
+    for batch in synthetic_texts(args.documents, args.length, args.vocabulary, args.seed):
+        backend.index_documents(batch)
+    backend.optimize()
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed + 1)
+    ranks = rng.integers(1, args.vocabulary // 10, size=(args.queries, 3))
+    widths = rng.integers(1, 4, size=args.queries)
+    queries = [" ".join(f"w{rank}" for rank in row[:width]) for row, width in zip(ranks, widths)]
+    for query in queries[:10]:
+        backend.search(query, args.top_k)
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        backend.search(query, args.top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "build_s": build,
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+    }
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="search-backends-")
+    try:
+        for name in args.backends:
+            backend = open_backend(name, workdir)
+            try:
+                result = benchmark(backend, args)
+                print(
+                    f"{name:<10} build {args.documents} documents {result['build_s']:8.1f} s  "
+                    f"query mean {result['mean_ms']:.2f} ms  p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms"
+                )
+            finally:
+                close_backend(backend)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark search backends")
+    parser.add_argument("--backends", nargs="+", default=["inverted", "sqlite"], choices=["inverted", "sqlite", "postgres"])
+    parser.add_argument("--documents", type=int, default=100_000, help="Synthetic pages to benchmark with")
+    parser.add_argument("--length", type=int, default=150, help="Average words per synthetic page")
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="Distinct words in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=300, help="Queries to time")
+    parser.add_argument("--top-k", type=int, default=20, help="Results per query")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -1,3 +1,16 @@
 from .utils import format_file_size, validate_mime_type
+from .concurrency import offload, run_blocking, run_cpu_bound, get_process_pool, shutdown_process_pool
+from .cache import stage_cache
+from .registry import model_registry
 
-__all__ = ["format_file_size", "validate_mime_type"]
+__all__ = [
+    "format_file_size",
+    "validate_mime_type",
+    "offload",
+    "run_blocking",
+    "run_cpu_bound",
+    "get_process_pool",
+    "shutdown_process_pool",
+    "stage_cache",
+    "model_registry"
+]
@@ -0,0 +1,131 @@
+"""
+Stage result cache
+Reuses OCR, classification and metadata results for identical inputs
+"""
+import copy
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from config.settings import settings
+
+
+class StageResultCache:
+    """
+    In-process LRU cache keyed by (input key, stage, engine/model version). The input key is
+    the file checksum for OCR and a content_key of the OCR text for the stages that read it.
+    Entries are evicted least-recently-used first once the size budget is exceeded;
+    sizes are estimated from the JSON encoding of each value.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def get(self, checksum: str, stage: str, version: str):
+        """
+        Return a copy of the cached result, or None on a miss
+        """
+        if not checksum:
+            return None
+        
+        key = (checksum, stage, version)
+        with self._lock:
+            stats = self._stage_stats(stage)
+            entry = self._entries.get(key)
+            if entry is None:
+                stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            stats["hits"] += 1
+            return copy.deepcopy(entry[0])
+    
+    def put(self, checksum: str, stage: str, version: str, value):
+        """
+        Store a result, evicting older entries to stay within the size budget
+        """
+        if not checksum:
+            return
+        
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        
+        key = (checksum, stage, version)
+        with self._lock:
+            value = copy.deepcopy(value)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            
+            self._entries[key] = (value, size)
+            self._size += size
+            
+            while self._size > self.max_bytes:
+                (_, evicted_stage, _), (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._stage_stats(evicted_stage)["evictions"] += 1
+    
+    def invalidate(self, checksum: str, stage: str = None):
+        """
+        Drop cached results for a checksum (optionally only one stage)
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == checksum and (stage is None or k[1] == stage)]:
+                self._size -= self._entries.pop(key)[1]
+    
+    def clear(self):
+        """
+        Drop every entry and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._stats = {}
+    
+    def stats(self) -> dict:
+        """
+        Hit/miss/eviction counters per stage and current usage
+        """
+        with self._lock:
+            stages = {}
+            for stage, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                stages[stage] = {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0
+                }
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "stages": stages
+            }
+    
+    def _stage_stats(self, stage: str) -> dict:
+        """
+        Counters for a stage, created on first use (caller holds the lock)
+        """
+        if stage not in self._stats:
+            self._stats[stage] = {"hits": 0, "misses": 0, "evictions": 0}
+        return self._stats[stage]
+
+
+def content_key(*parts) -> str:
+    """
+    Cache key for results derived from text (strings or lists of page strings) rather than from
+    the stored file. Re-OCRed pages change the key, so no process reuses results of the old text.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        for page in part if isinstance(part, list) else [part]:
+            digest.update((page or "").encode())
+            digest.update(b"\0")
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+
+stage_cache = StageResultCache(settings.STAGE_CACHE_MAX_BYTES)
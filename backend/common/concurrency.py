@@ -0,0 +1,62 @@
+"""
+Helpers for keeping blocking work off the event loop
+"""
+import os
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from starlette.concurrency import run_in_threadpool
+from config.settings import settings
+
+_process_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Shared process pool for CPU-heavy stages, created on first use
+    """
+    global _process_pool
+    if _process_pool is None:
+        workers = settings.CPU_WORKERS or os.cpu_count() or 1
+        # spawn avoids forking a process that already has database and thread-pool state
+        _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """
+    Stop the shared process pool
+    """
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run blocking code (database calls, file IO) in the thread pool and await the result
+    """
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+def offload(func):
+    """
+    Decorator exposing a blocking method as a coroutine that runs in the thread pool.
+    Callers keep awaiting it as before, but the event loop stays free while it runs.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_threadpool(func, *args, **kwargs)
+    return wrapper
+
+
+def run_cpu_bound(func, *args, work_size: int = None):
+    """
+    Run a picklable CPU-heavy function on the process pool and wait for it.
+    Meant to be called from worker threads; small inputs (work_size below
+    CPU_OFFLOAD_MIN_CHARS) run inline because pickling would cost more than it saves.
+    """
+    if work_size is not None and work_size < settings.CPU_OFFLOAD_MIN_CHARS:
+        return func(*args)
+    return get_process_pool().submit(func, *args).result()
@@ -0,0 +1,137 @@
+"""
+Cursor pagination and cheap totals
+Cursors are opaque to clients: URL-safe base64 of a small JSON object. Document lists page by
+keyset on (upload_date, id), so a deep page costs the same as the first; ranked search pages by
+rank offset. Totals come from planner statistics or a short-lived cache unless an exact count
+is requested.
+"""
+import json
+import time
+import zlib
+import base64
+import binascii
+import threading
+from datetime import datetime
+from sqlalchemy import select, func, text, and_, or_
+from config.settings import settings
+
+
+def encode_cursor(state: dict) -> str:
+    """
+    Opaque cursor for a pagination state
+    """
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Pagination state of a cursor; raises ValueError for anything this module did not produce
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def keyset_cursor(upload_date: datetime, document_id: int) -> str:
+    """
+    Cursor pointing after a document in newest-first (upload_date, id) order
+    """
+    return encode_cursor({"upload_date": upload_date.isoformat(), "id": document_id})
+
+
+def keyset_after(cursor: str, date_column, id_column):
+    """
+    Filter selecting the rows after a keyset cursor in newest-first (upload_date, id) order
+    """
+    state = decode_cursor(cursor)
+    try:
+        upload_date, document_id = datetime.fromisoformat(state["upload_date"]), int(state["id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    # Expanded rather than a row-value comparison so every database can use the (upload_date, id) index
+    return or_(date_column < upload_date, and_(date_column == upload_date, id_column < document_id))
+
+
+def offset_cursor(params: list, offset: int) -> str:
+    """
+    Cursor for the page of a ranked result starting at `offset`, bound to the request parameters
+    """
+    return encode_cursor({"search": _params_key(params), "offset": offset})
+
+
+def cursor_offset(cursor: str, params: list) -> int:
+    """
+    Rank offset of an offset cursor (0 without one); raises ValueError if it was issued for other parameters
+    """
+    if not cursor:
+        return 0
+    state = decode_cursor(cursor)
+    if state.get("search") != _params_key(params) or not isinstance(state.get("offset"), int) or state["offset"] < 0:
+        raise ValueError("Cursor does not belong to this search")
+    return state["offset"]
+
+
+def _params_key(params: list) -> int:
+    """
+    Short fingerprint of request parameters
+    """
+    return zlib.crc32(json.dumps(params, default=str).encode())
+
+
+class CountCache:
+    """
+    Row counts reused for `ttl` seconds, so list totals do not scan a table on every page
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._counts = {}  # key -> (count, computed at)
+        self._lock = threading.Lock()
+    
+    def get(self, key: str):
+        """
+        Cached count, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._counts.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+    
+    def put(self, key: str, count: int):
+        """
+        Store a freshly computed count
+        """
+        with self._lock:
+            self._counts[key] = (count, time.monotonic())
+
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL)
+
+
+async def table_total(db, model, exact: bool = False) -> tuple:
+    """
+    (total rows of a model's table, whether the total is exact) for an async session.
+    PostgreSQL answers from planner statistics (pg_class.reltuples, kept current by autovacuum);
+    other databases, or tables never analyzed, use a count cached for COUNT_CACHE_TTL seconds.
+    """
+    table = model.__table__.name
+    if not exact:
+        if db.get_bind().dialect.name == "postgresql":
+            estimate = await db.scalar(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": table}
+            )
+            if estimate is not None and estimate >= 0:
+                return int(estimate), False
+        cached = count_cache.get(table)
+        if cached is not None:
+            return cached, False
+    
+    total = await db.scalar(select(func.count()).select_from(model))
+    count_cache.put(table, total)
+    return total, True
@@ -0,0 +1,200 @@
+"""
+Model registry
+Loads versioned model artifacts once per process and hot-swaps them without dropping requests
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of model artifacts, one active version per kind.
+    Layout: <root>/<kind>/<version>/ holds an artifact and <root>/<kind>/CURRENT names the
+    active version. Weights are memory-mapped by the loaders, so every worker process shares
+    the same pages. Processes notice a new CURRENT within MODEL_REGISTRY_POLL_SECONDS.
+    Callers take one reference per request; a swap only affects later calls.
+    """
+    
+    CURRENT_FILE = "CURRENT"
+    
+    def __init__(self, root: str, poll_interval: float):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._loaders = {}  # kind -> (loader, sizer)
+        self._loaded = {}  # (kind, version) -> entry
+        self._current = {}  # kind -> {"version", "mtime", "checked"}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+    
+    def register_loader(self, kind: str, loader, sizer=None):
+        """
+        Register how to load artifacts of a kind: loader(path) -> model, sizer(model) -> bytes
+        """
+        self._loaders[kind] = (loader, sizer)
+    
+    def get(self, kind: str, version: str = None):
+        """
+        Active model of a kind (or a specific version), loading it on first use.
+        Returns None when no version has been published.
+        """
+        version = version or self.current_version(kind)
+        if not version:
+            return None
+        
+        entry = self._loaded.get((kind, version))
+        if entry is None:
+            entry = self._load(kind, version)
+        return entry["model"]
+    
+    def current_version(self, kind: str) -> str:
+        """
+        Active version of a kind, re-reading the CURRENT pointer at most once per poll interval
+        """
+        now = time.monotonic()
+        state = self._current.get(kind)
+        if state and now - state["checked"] < self.poll_interval:
+            return state["version"]
+        
+        path = os.path.join(self.root, kind, self.CURRENT_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        
+        if state and state["mtime"] == mtime:
+            version = state["version"]
+        elif mtime is None:
+            version = None
+        else:
+            with open(path) as f:
+                version = f.read().strip() or None
+        
+        self._set_current(kind, version, mtime, now)
+        return version
+    
+    def activate(self, kind: str, version: str) -> dict:
+        """
+        Make a version active: load it fully first, then flip the CURRENT pointer atomically.
+        Requests already holding the previous model finish with it.
+        """
+        if not os.path.isdir(self.artifact_path(kind, version)):
+            raise ValueError(f"Unknown {kind} model version {version}")
+        
+        entry = self._loaded.get((kind, version)) or self._load(kind, version)
+        
+        path = os.path.join(self.root, kind, self.CURRENT_FILE)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(version)
+        os.replace(temp_path, path)
+        
+        self._set_current(kind, version, os.stat(path).st_mtime_ns, time.monotonic())
+        logger.info("Activated %s model %s", kind, version)
+        return self._describe(entry)
+    
+    def artifact_path(self, kind: str, version: str) -> str:
+        """
+        Directory holding an artifact version
+        """
+        if not version or os.sep in version or version.startswith("."):
+            raise ValueError(f"Invalid model version {version}")
+        return os.path.join(self.root, kind, version)
+    
+    def versions(self, kind: str) -> list:
+        """
+        Published versions of a kind
+        """
+        kind_path = os.path.join(self.root, kind)
+        if not os.path.isdir(kind_path):
+            return []
+        return sorted(
+            name for name in os.listdir(kind_path)
+            if os.path.isdir(os.path.join(kind_path, name)) and not name.startswith(".")
+        )
+    
+    def warm(self):
+        """
+        Load the active version of every registered kind (e.g. at startup)
+        """
+        for kind in self._loaders:
+            try:
+                self.get(kind)
+            except Exception:
+                logger.exception("Failed to warm %s model", kind)
+    
+    def stats(self) -> dict:
+        """
+        Active and available versions per kind, with load time and memory of loaded models
+        """
+        kinds = {}
+        for kind in sorted(set(self._loaders) | set(os.listdir(self.root) if os.path.isdir(self.root) else [])):
+            if not os.path.isdir(os.path.join(self.root, kind)) and kind not in self._loaders:
+                continue
+            kinds[kind] = {
+                "active": self.current_version(kind),
+                "versions": self.versions(kind),
+                "loaded": [
+                    self._describe(entry)
+                    for (entry_kind, _), entry in list(self._loaded.items())
+                    if entry_kind == kind
+                ]
+            }
+        return {"pid": os.getpid(), "models": kinds}
+    
+    def _load(self, kind: str, version: str) -> dict:
+        """
+        Load a version once, even when several requests ask for it concurrently
+        """
+        if kind not in self._loaders:
+            raise ValueError(f"No loader registered for {kind} models")
+        
+        with self._lock:
+            load_lock = self._load_locks.setdefault((kind, version), threading.Lock())
+        
+        with load_lock:
+            entry = self._loaded.get((kind, version))
+            if entry is not None:
+                return entry
+            
+            loader, sizer = self._loaders[kind]
+            start = time.perf_counter()
+            model = loader(self.artifact_path(kind, version))
+            entry = {
+                "kind": kind,
+                "version": version,
+                "model": model,
+                "load_time_ms": int((time.perf_counter() - start) * 1000),
+                "memory_bytes": sizer(model) if sizer else None,
+                "loaded_at": datetime.utcnow().isoformat()
+            }
+            self._loaded[(kind, version)] = entry
+            logger.info("Loaded %s model %s in %d ms", kind, version, entry["load_time_ms"])
+            return entry
+    
+    def _set_current(self, kind: str, version: str, mtime, checked: float):
+        """
+        Record the active version and drop other loaded versions of the kind.
+        Dropped models stay alive until in-flight requests release them.
+        """
+        with self._lock:
+            self._current[kind] = {"version": version, "mtime": mtime, "checked": checked}
+            for key in [key for key in self._loaded if key[0] == kind and key[1] != version]:
+                del self._loaded[key]
+                self._load_locks.pop(key, None)
+    
+    @staticmethod
+    def _describe(entry: dict) -> dict:
+        """
+        Public view of a loaded entry
+        """
+        return {key: value for key, value in entry.items() if key != "model"}
+
+
+# Module-level registry shared by every service in this process
+model_registry = ModelRegistry(settings.MODEL_REGISTRY_PATH, settings.MODEL_REGISTRY_POLL_SECONDS)
@@ -23,9 +23,7 @@ def validate_mime_type(mime_type: str) -> bool:
         'image/jpeg',
         'image/png',
         'image/tiff',
-        'application/msword',
         'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'application/vnd.ms-excel',
         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     ]
     return mime_type in allowed_types
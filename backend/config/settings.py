@@ -21,10 +21,30 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+    
     # Redis settings
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     
+    # Background job settings
+    JOB_QUEUE_BACKEND: str = "redis"  # redis, sqlite
+    JOB_QUEUE_REDIS_DB: int = 0
+    JOB_QUEUE_PATH: str = "./storage/jobs.db"  # Used by the sqlite backend
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF: float = 5.0  # Seconds before the first retry, doubled on each attempt
+    JOB_RETRY_BACKOFF_MAX: float = 300.0
+    JOB_VISIBILITY_TIMEOUT: int = 900  # Seconds before a claimed job is considered abandoned
+    WORKER_CONCURRENCY: str = "pipeline=2,ocr=1,classification=1,metadata=1,index=1"  # Processes per stage
+    
+    # Backfill settings (python -m agents.backfill.run)
+    BACKFILL_BATCH_SIZE: int = 256  # Documents per batch, classified or indexed with one bulk write
+    BACKFILL_WORKERS: int = 2  # Batches processed concurrently
+    BACKFILL_RATE_LIMIT: float = 50.0  # Documents per second, so live traffic keeps the CPU pool; 0 disables
+    BACKFILL_CHECKPOINT_PATH: str = "./storage/backfill"
+    
     # Security settings
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
@@ -37,8 +57,50 @@ class Settings(BaseSettings):
     STORAGE_TYPE: str = "local"  # local, s3, minio
     STORAGE_PATH: str = "./storage"
     
+    # Concurrency settings
+    CPU_WORKERS: int = 0  # Processes for CPU-heavy stages; 0 uses every core
+    CPU_OFFLOAD_MIN_CHARS: int = 200_000  # Smaller texts are processed in-thread, skipping the pickling cost
+    
+    # Stage result cache settings
+    STAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # Per process
+    
+    # Pagination settings
+    COUNT_CACHE_TTL: int = 60  # Seconds a table row count is reused for estimated list totals
+    
+    # Ingestion settings
+    INGESTION_BATCH_WORKERS: int = 4  # Concurrent uploads staged per batch request
+    
     # OCR settings
     TESSERACT_PATH: str = "/usr/bin/tesseract"
+    OCR_ENGINE: str = "tesseract"  # tesseract or simulated
+    OCR_LANGUAGES: str = "eng"  # Tesseract language codes, e.g. "eng+mal"
+    OCR_DPI: int = 300  # PDF rasterisation and target resolution for scanned pages
+    TEXT_LAYER_MIN_CHARS: int = 20  # PDF pages with less embedded text than this are OCR'd
+    OCR_PAGE_BATCH_SIZE: int = 4  # Pages per worker task; buffers are reused within a worker
+    PREPROCESSING_ENABLED: bool = True
+    PREPROCESSING_PROFILES: dict = {}  # Per document type overrides, e.g. {"image": {"deskew": false}}
+    
+    # Search index settings
+    SEARCH_BACKEND: str = "inverted"  # inverted, sqlite (FTS5) or postgres (tsvector + GIN); rebuild with python -m agents.search.backends --rebuild
+    SEARCH_INDEX_PATH: str = "./storage/search_index"  # Segments of the inverted backend
+    SEARCH_SQLITE_PATH: str = "./storage/search.db"  # Used by the sqlite backend
+    SEARCH_MAX_SEGMENTS: int = 10  # More segments than this triggers a merge
+    SEARCH_MERGE_FACTOR: int = 4  # Smallest segments merged at a time
+    SEARCH_MAX_CANDIDATES: int = 10000  # Ranked text matches considered when combined with other filters
+    SEARCH_HYBRID_CANDIDATES: int = 200  # Results taken from each retriever before hybrid fusion
+    SEARCH_RRF_K: int = 60  # Reciprocal-rank fusion constant; larger values flatten the rank weights
+    SEARCH_SEMANTIC_WEIGHT: float = 0.5  # Share of vector similarity in weighted fusion
+    
+    # Vector index settings (find_similar)
+    VECTOR_INDEX_PATH: str = "./storage/vectors"  # Float32 embedding matrices, one directory per embedding version
+    ANN_NPROBE: int = 8  # IVF lists scanned per query; more is slower with better recall
+    ANN_TRAIN_MIN_ROWS: int = 5000  # Smaller indexes are searched exactly
+    
+    # Near-duplicate detection settings (MinHash LSH)
+    DEDUP_NUM_PERM: int = 128  # MinHash values per signature
+    DEDUP_BANDS: int = 16  # LSH bands; 16 bands of 8 values make pairs above ~0.7 similarity candidates
+    DEDUP_SHINGLE_WORDS: int = 3  # Words per shingle
+    DEDUP_THRESHOLD: float = 0.8  # Estimated Jaccard similarity of OCR text reported as a near-duplicate
     
     # Elasticsearch settings
     ELASTICSEARCH_HOST: str = "localhost"
@@ -47,6 +109,10 @@ class Settings(BaseSettings):
     # AI Model settings
     HUGGINGFACE_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     OPENAI_API_KEY: str = ""
+    MODEL_REGISTRY_PATH: str = "./models"  # <kind>/<version>/ artifacts plus <kind>/CURRENT; keyword matcher if no classifier
+    MODEL_REGISTRY_POLL_SECONDS: float = 5  # How often each process checks for a newly activated version
+    CLASSIFY_BATCH_SIZE: int = 256  # Documents scored per matrix multiply in batch classification
+    EMBEDDING_BATCH_SIZE: int = 32  # Texts per forward pass of a published embedding model
     
     class Config:
         env_file = ".env"
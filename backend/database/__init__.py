@@ -1,13 +1,17 @@
-from .connection import Base, engine, get_db
-from .models import Document, OCRResult, DocumentMetadata, DocumentClassification, SearchIndex
+from .connection import Base, engine, get_db, get_async_db
+from .models import Document, OCRResult, DocumentMetadata, MetadataValue, DocumentClassification, SearchIndex, DocumentSignature, SignatureBucket
 
 __all__ = [
     "Base",
     "engine",
     "get_db",
+    "get_async_db",
     "Document",
     "OCRResult",
     "DocumentMetadata",
+    "MetadataValue",
     "DocumentClassification",
-    "SearchIndex"
+    "SearchIndex",
+    "DocumentSignature",
+    "SignatureBucket"
 ]
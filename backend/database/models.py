@@ -1,7 +1,7 @@
 """
 Database models for document automation system
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Date, Numeric, Text, JSON, LargeBinary, ForeignKey, Enum, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -10,6 +10,7 @@ from database.connection import Base
 
 class DocumentStatus(enum.Enum):
     UPLOADED = "uploaded"
+    QUEUED = "queued"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
@@ -25,6 +26,10 @@ class DocumentType(enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Keyset pagination of document lists, newest first
+        Index("ix_documents_upload_date_id", "upload_date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
@@ -39,7 +44,8 @@ class Document(Base):
     
     # Relationships
     ocr_results = relationship("OCRResult", back_populates="document")
-    metadata = relationship("DocumentMetadata", back_populates="document")
+    metadata_entries = relationship("DocumentMetadata", back_populates="document")
+    metadata_values = relationship("MetadataValue", back_populates="document")
     classification = relationship("DocumentClassification", back_populates="document")
 
 
@@ -47,7 +53,7 @@ class OCRResult(Base):
     __tablename__ = "ocr_results"
     
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
     extracted_text = Column(Text)
     confidence_score = Column(Integer)
     page_number = Column(Integer)
@@ -59,6 +65,10 @@ class OCRResult(Base):
 
 class DocumentMetadata(Base):
     __tablename__ = "document_metadata"
+    __table_args__ = (
+        # One value per key; also serves lookups by document_id. Target of the upsert in MetadataService.
+        UniqueConstraint("document_id", "key", name="uq_document_metadata_document_key"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"))
@@ -66,21 +76,46 @@ class DocumentMetadata(Base):
     value = Column(Text)
     extracted_by = Column(String(50))
     confidence = Column(Integer)
+    is_stale = Column(Boolean, default=False)  # Set when the OCR text changed after extraction
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    document = relationship("Document", back_populates="metadata")
+    document = relationship("Document", back_populates="metadata_entries")
+
+
+class MetadataValue(Base):
+    """
+    One typed value of a metadata key (a list value has one row per element), for filtering
+    """
+    __tablename__ = "metadata_values"
+    __table_args__ = (
+        # document_id last so filters are answered from the index alone
+        Index("ix_metadata_values_key_date", "key", "value_date", "document_id"),
+        Index("ix_metadata_values_key_number", "key", "value_number", "document_id"),
+        Index("ix_metadata_values_key_text", "key", "value_text", "document_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    key = Column(String(100), nullable=False)
+    position = Column(Integer, default=0)  # Order within a list value
+    value_text = Column(String(500))
+    value_date = Column(Date, nullable=True)
+    value_number = Column(Numeric(20, 2), nullable=True)
+    
+    document = relationship("Document", back_populates="metadata_values")
 
 
 class DocumentClassification(Base):
     __tablename__ = "document_classifications"
     
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
     category = Column(String(100))
     subcategory = Column(String(100), nullable=True)
     confidence_score = Column(Integer)
     tags = Column(JSON)
     model_version = Column(String(50))
+    is_stale = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     document = relationship("Document", back_populates="classification")
@@ -90,8 +125,39 @@ class SearchIndex(Base):
     __tablename__ = "search_indices"
     
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
     vector_embedding = Column(JSON)
     indexed_text = Column(Text)
+    index_version = Column(String(50), nullable=True)
+    is_stale = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DocumentSignature(Base):
+    """
+    MinHash signature of a document's OCR text, for near-duplicate detection
+    """
+    __tablename__ = "document_signatures"
+    
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True, autoincrement=False)
+    signature = Column(LargeBinary, nullable=False)  # uint32 MinHash values
+    signature_version = Column(String(50), nullable=False)  # Hash functions and shingle size used
+    cluster_id = Column(Integer, nullable=True, index=True)  # Smallest document id of its near-duplicate cluster
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SignatureBucket(Base):
+    """
+    LSH bucket of one band of a document signature; documents sharing a bucket are near-duplicate candidates
+    """
+    __tablename__ = "signature_buckets"
+    __table_args__ = (
+        # document_id last so candidate lookups are answered from the index alone
+        Index("ix_signature_buckets_band_bucket", "band", "bucket", "document_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
@@ -4,6 +4,8 @@ Main FastAPI Application for Intelligent Document Automation System
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import router as api_router
+from common.concurrency import shutdown_process_pool, run_blocking
+from common.registry import model_registry
 from config.settings import settings
 
 app = FastAPI(
@@ -24,6 +26,15 @@ app.add_middleware(
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def startup():
+    # Load active models before the first request rather than during it
+    await run_blocking(model_registry.warm)
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_process_pool()
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,73 @@
+"""
+Alembic environment
+Runs migrations against the application database (config.settings.DATABASE_URL), or the URL
+given with `alembic -x url=... upgrade head` (or sqlalchemy.url when run through the Python API).
+"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from config.settings import settings
+from database.connection import Base
+import database.models  # noqa: F401  Registers the tables on Base.metadata for autogenerate
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Tables without an ORM model, created by the migrations for a search backend
+UNMAPPED_TABLES = {"search_documents"}
+
+
+def database_url() -> str:
+    return (
+        context.get_x_argument(as_dictionary=True).get("url")
+        or config.get_main_option("sqlalchemy.url")
+        or settings.DATABASE_URL
+    )
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Keep autogenerate from dropping the tables that have no model
+    """
+    return not (type_ == "table" and name in UNMAPPED_TABLES)
+
+
+def run_migrations_offline():
+    """
+    Emit the migration SQL without connecting
+    """
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """
+    Run the migrations on a connection; batch mode lets SQLite alter tables by copying them
+    """
+    engine = create_engine(database_url())
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            render_as_batch=True
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
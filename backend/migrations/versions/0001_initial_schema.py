@@ -0,0 +1,104 @@
+"""Initial schema
+
+Tables as they were before migrations were introduced. Databases created earlier with
+Base.metadata.create_all already have them; existing tables are left alone, so
+`alembic upgrade head` works on both new and existing databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENT_STATUS = sa.Enum("UPLOADED", "PROCESSING", "COMPLETED", "FAILED", name="documentstatus")
+DOCUMENT_TYPE = sa.Enum("PDF", "IMAGE", "WORD", "EXCEL", "OTHER", name="documenttype")
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "documents" not in existing:
+        op.create_table(
+            "documents",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("filename", sa.String(255), nullable=False),
+            sa.Column("original_filename", sa.String(255), nullable=False),
+            sa.Column("file_type", DOCUMENT_TYPE, nullable=False),
+            sa.Column("file_size", sa.Integer()),
+            sa.Column("status", DOCUMENT_STATUS),
+            sa.Column("upload_date", sa.DateTime()),
+            sa.Column("processed_date", sa.DateTime(), nullable=True),
+            sa.Column("storage_path", sa.String(500)),
+            sa.Column("checksum", sa.String(64))
+        )
+        op.create_index("ix_documents_id", "documents", ["id"])
+
+    if "ocr_results" not in existing:
+        op.create_table(
+            "ocr_results",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id")),
+            sa.Column("extracted_text", sa.Text()),
+            sa.Column("confidence_score", sa.Integer()),
+            sa.Column("page_number", sa.Integer()),
+            sa.Column("processing_time", sa.Integer()),
+            sa.Column("created_at", sa.DateTime())
+        )
+        op.create_index("ix_ocr_results_id", "ocr_results", ["id"])
+
+    if "document_metadata" not in existing:
+        op.create_table(
+            "document_metadata",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id")),
+            sa.Column("key", sa.String(100)),
+            sa.Column("value", sa.Text()),
+            sa.Column("extracted_by", sa.String(50)),
+            sa.Column("confidence", sa.Integer()),
+            sa.Column("created_at", sa.DateTime())
+        )
+        op.create_index("ix_document_metadata_id", "document_metadata", ["id"])
+
+    if "document_classifications" not in existing:
+        op.create_table(
+            "document_classifications",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id")),
+            sa.Column("category", sa.String(100)),
+            sa.Column("subcategory", sa.String(100), nullable=True),
+            sa.Column("confidence_score", sa.Integer()),
+            sa.Column("tags", sa.JSON()),
+            sa.Column("model_version", sa.String(50)),
+            sa.Column("created_at", sa.DateTime())
+        )
+        op.create_index("ix_document_classifications_id", "document_classifications", ["id"])
+
+    if "search_indices" not in existing:
+        op.create_table(
+            "search_indices",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id")),
+            sa.Column("vector_embedding", sa.JSON()),
+            sa.Column("indexed_text", sa.Text()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime())
+        )
+        op.create_index("ix_search_indices_id", "search_indices", ["id"])
+
+
+def downgrade() -> None:
+    for table in ["search_indices", "document_classifications", "document_metadata", "ocr_results", "documents"]:
+        op.drop_table(table)
+    DOCUMENT_STATUS.drop(op.get_bind(), checkfirst=True)
+    DOCUMENT_TYPE.drop(op.get_bind(), checkfirst=True)
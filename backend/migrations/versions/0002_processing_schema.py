@@ -0,0 +1,101 @@
+"""Processing schema: metadata upsert key, stale flags, queue status
+
+- documents: QUEUED status
+- document_metadata: duplicate (document_id, key) rows removed, then the unique constraint the
+  upsert targets (ON CONFLICT needs a matching unique index)
+- is_stale on document_metadata, document_classifications and search_indices, index_version on
+  search_indices; existing rows are not stale
+- document_id indexes on ocr_results, document_classifications and search_indices
+
+Steps already present (e.g. in a database created by create_all from the current models) are skipped.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Of each group of duplicates keep a manual value over extracted ones, then the newest row
+DELETE_DUPLICATE_METADATA = """
+DELETE FROM document_metadata
+WHERE id NOT IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY document_id, key
+            ORDER BY CASE WHEN extracted_by = 'manual' THEN 0 ELSE 1 END, created_at DESC, id DESC
+        ) AS position
+        FROM document_metadata
+    ) ranked
+    WHERE position = 1
+)
+"""
+
+NEW_INDEXES = [
+    ("ix_ocr_results_document_id", "ocr_results", ["document_id"]),
+    ("ix_document_classifications_document_id", "document_classifications", ["document_id"]),
+    ("ix_search_indices_document_id", "search_indices", ["document_id"])
+]
+
+STALE_TABLES = ["document_metadata", "document_classifications", "search_indices"]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {table: {column["name"] for column in inspector.get_columns(table)} for table in STALE_TABLES}
+    indexes = {
+        table: {index["name"] for index in inspector.get_indexes(table)}
+        for table in {table for _, table, _ in NEW_INDEXES}
+    }
+
+    if bind.dialect.name == "postgresql":
+        # Enum values cannot be added inside a transaction block before PostgreSQL 12
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE documentstatus ADD VALUE IF NOT EXISTS 'QUEUED'")
+
+    for name, table, index_columns in NEW_INDEXES:
+        if name not in indexes[table]:
+            op.create_index(name, table, index_columns)
+
+    op.execute(DELETE_DUPLICATE_METADATA)
+    constraints = {constraint["name"] for constraint in inspector.get_unique_constraints("document_metadata")}
+    with op.batch_alter_table("document_metadata") as batch:
+        if "uq_document_metadata_document_key" not in constraints:
+            batch.create_unique_constraint("uq_document_metadata_document_key", ["document_id", "key"])
+        if "is_stale" not in columns["document_metadata"]:
+            batch.add_column(sa.Column("is_stale", sa.Boolean(), server_default=sa.false()))
+
+    if "is_stale" not in columns["document_classifications"]:
+        with op.batch_alter_table("document_classifications") as batch:
+            batch.add_column(sa.Column("is_stale", sa.Boolean(), server_default=sa.false()))
+
+    with op.batch_alter_table("search_indices") as batch:
+        if "index_version" not in columns["search_indices"]:
+            batch.add_column(sa.Column("index_version", sa.String(50), nullable=True))
+        if "is_stale" not in columns["search_indices"]:
+            batch.add_column(sa.Column("is_stale", sa.Boolean(), server_default=sa.false()))
+
+
+def downgrade() -> None:
+    # The QUEUED enum value stays: PostgreSQL cannot drop values from an enum type
+    with op.batch_alter_table("search_indices") as batch:
+        batch.drop_column("is_stale")
+        batch.drop_column("index_version")
+    with op.batch_alter_table("document_classifications") as batch:
+        batch.drop_column("is_stale")
+    with op.batch_alter_table("document_metadata") as batch:
+        batch.drop_column("is_stale")
+        batch.drop_constraint("uq_document_metadata_document_key", type_="unique")
+    for name, table, _ in reversed(NEW_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,47 @@
+"""Typed metadata values for filtered search
+
+metadata_values holds one typed row per metadata value (a list value has one row per element),
+with (key, value, document_id) indexes. Skipped if the table already exists (e.g. in a database
+created by create_all from the current models); it is filled as metadata is re-extracted or edited.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if "metadata_values" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "metadata_values",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id")),
+        sa.Column("key", sa.String(100), nullable=False),
+        sa.Column("position", sa.Integer()),
+        sa.Column("value_text", sa.String(500)),
+        sa.Column("value_date", sa.Date(), nullable=True),
+        sa.Column("value_number", sa.Numeric(20, 2), nullable=True)
+    )
+    op.create_index("ix_metadata_values_id", "metadata_values", ["id"])
+    op.create_index("ix_metadata_values_document_id", "metadata_values", ["document_id"])
+    op.create_index("ix_metadata_values_key_date", "metadata_values", ["key", "value_date", "document_id"])
+    op.create_index("ix_metadata_values_key_number", "metadata_values", ["key", "value_number", "document_id"])
+    op.create_index("ix_metadata_values_key_text", "metadata_values", ["key", "value_text", "document_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("metadata_values")
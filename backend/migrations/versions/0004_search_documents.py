@@ -0,0 +1,39 @@
+"""PostgreSQL full-text search table
+
+search_documents holds a tsvector per document with a GIN index for SEARCH_BACKEND=postgres.
+tsvector exists only in PostgreSQL, so other databases are left unchanged.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.create_table(
+        "search_documents",
+        sa.Column("document_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("document", postgresql.TSVECTOR(), nullable=False)
+    )
+    op.create_index("ix_search_documents_document", "search_documents", ["document"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_table("search_documents")
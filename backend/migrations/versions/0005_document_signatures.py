@@ -0,0 +1,54 @@
+"""Near-duplicate detection tables
+
+document_signatures holds each document's MinHash signature and cluster; signature_buckets holds
+its LSH band buckets. Skipped where the tables already exist (e.g. in a database created by
+create_all from the current models); signatures are computed as documents are next processed.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "document_signatures" not in tables:
+        op.create_table(
+            "document_signatures",
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id"), primary_key=True, autoincrement=False),
+            sa.Column("signature", sa.LargeBinary(), nullable=False),
+            sa.Column("signature_version", sa.String(50), nullable=False),
+            sa.Column("cluster_id", sa.Integer(), nullable=True),
+            sa.Column("updated_at", sa.DateTime())
+        )
+        op.create_index("ix_document_signatures_cluster_id", "document_signatures", ["cluster_id"])
+
+    if "signature_buckets" not in tables:
+        op.create_table(
+            "signature_buckets",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id")),
+            sa.Column("band", sa.Integer(), nullable=False),
+            sa.Column("bucket", sa.BigInteger(), nullable=False)
+        )
+        op.create_index("ix_signature_buckets_id", "signature_buckets", ["id"])
+        op.create_index("ix_signature_buckets_document_id", "signature_buckets", ["document_id"])
+        op.create_index("ix_signature_buckets_band_bucket", "signature_buckets", ["band", "bucket", "document_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("signature_buckets")
+    op.drop_table("document_signatures")
@@ -0,0 +1,31 @@
+"""Keyset pagination index on documents
+
+(upload_date, id) index for newest-first cursor pages of document lists and filtered searches.
+Skipped if it already exists (e.g. in a database created by create_all from the current models).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("documents")}
+    if "ix_documents_upload_date_id" not in indexes:
+        op.create_index("ix_documents_upload_date_id", "documents", ["upload_date", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_upload_date_id", table_name="documents")
@@ -0,0 +1,99 @@
+"""
+Shared fixtures: a scratch storage directory and an in-memory SQLite database per test
+"""
+import os
+import tempfile
+import zipfile
+
+# Settings are read once at import time, so point every storage path at a scratch directory first
+STORAGE = tempfile.mkdtemp(prefix="document-automation-tests-")
+os.environ.setdefault("STORAGE_PATH", STORAGE)
+os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(STORAGE, "jobs.db"))
+os.environ.setdefault("BACKFILL_CHECKPOINT_PATH", os.path.join(STORAGE, "backfill"))
+os.environ.setdefault("SEARCH_INDEX_PATH", os.path.join(STORAGE, "search_index"))
+os.environ.setdefault("SEARCH_SQLITE_PATH", os.path.join(STORAGE, "search.db"))
+os.environ.setdefault("VECTOR_INDEX_PATH", os.path.join(STORAGE, "vectors"))
+os.environ.setdefault("MODEL_REGISTRY_PATH", os.path.join(STORAGE, "models"))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database.connection import Base
+from database.models import Document, DocumentType, DocumentStatus
+from common.cache import stage_cache
+
+
+@pytest.fixture
+def db():
+    """
+    Session on a fresh in-memory database with every table created
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    stage_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+class StaticEngine:
+    """
+    OCR engine stand-in for tests; documents with a text layer never reach it
+    """
+    
+    name = "static"
+    parallel = False
+    
+    def version(self) -> str:
+        return "1"
+
+
+@pytest.fixture
+def ocr_engine(monkeypatch):
+    """
+    Replace the configured OCR engine so no Tesseract install is needed
+    """
+    engine = StaticEngine()
+    monkeypatch.setattr("agents.ocr.service.get_engine", lambda: engine)
+    return engine
+
+
+def write_docx(path: str, pages: list):
+    """
+    Minimal DOCX with one paragraph per line and a page break between pages
+    """
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    page_break = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+    body = page_break.join(
+        "".join(f"<w:p><w:r><w:t>{line}</w:t></w:r></w:p>" for line in page.splitlines())
+        for page in pages
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+
+
+@pytest.fixture
+def make_document(db):
+    """
+    Factory storing a DOCX with the given page texts and its Document row
+    """
+    def make(pages: list, filename: str = "document.docx") -> Document:
+        path = os.path.join(STORAGE, f"{len(os.listdir(STORAGE))}-{filename}")
+        write_docx(path, pages)
+        document = Document(
+            filename=os.path.basename(path),
+            original_filename=filename,
+            file_type=DocumentType.WORD,
+            file_size=os.path.getsize(path),
+            status=DocumentStatus.UPLOADED,
+            storage_path=path,
+            checksum=os.path.basename(path)
+        )
+        db.add(document)
+        db.commit()
+        return document
+    return make
@@ -0,0 +1,73 @@
+"""
+Document deletion
+"""
+import asyncio
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from database.connection import Base
+from database.models import (
+    Document, DocumentType, DocumentStatus, OCRResult, DocumentMetadata, MetadataValue,
+    DocumentClassification, SearchIndex, DocumentSignature, SignatureBucket
+)
+from agents.search.vector_index import get_vector_index
+from api.endpoints.documents import delete_document
+
+CHILDREN = [
+    OCRResult, DocumentMetadata, MetadataValue, DocumentClassification,
+    SearchIndex, DocumentSignature, SignatureBucket
+]
+
+
+@pytest.fixture
+def vector_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr("agents.search.vector_index.settings.VECTOR_INDEX_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr("agents.search.vector_index._indexes", {})
+    return [get_vector_index(version) for version in ("hashing-v1", "minilm-2")]
+
+
+def test_delete_removes_dependent_rows_and_vectors(tmp_path, vector_versions):
+    pytest.importorskip("aiosqlite")
+    path = tmp_path / "documents.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    documents = [
+        Document(
+            filename=name, original_filename=name, file_type=DocumentType.PDF,
+            status=DocumentStatus.COMPLETED, checksum=name
+        )
+        for name in ("deleted.pdf", "kept.pdf")
+    ]
+    db.add_all(documents)
+    db.commit()
+    for document in documents:
+        db.add_all([
+            OCRResult(document_id=document.id, page_number=1, extracted_text="Tax invoice"),
+            DocumentMetadata(document_id=document.id, key="dates", value="[]"),
+            MetadataValue(document_id=document.id, key="dates", value_text="2024-03-05"),
+            DocumentClassification(document_id=document.id, category="invoice"),
+            SearchIndex(document_id=document.id, indexed_text="Tax invoice"),
+            DocumentSignature(document_id=document.id, signature=b"\0", signature_version="minhash-1"),
+            SignatureBucket(document_id=document.id, band=0, bucket=1)
+        ])
+    db.commit()
+    deleted, kept = (document.id for document in documents)
+    for index in vector_versions:
+        index.upsert([deleted, kept], np.eye(2, 3))
+    
+    async def delete():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(async_engine) as session:
+            await delete_document(deleted, db=session)
+        await async_engine.dispose()
+    
+    asyncio.run(delete())
+    for model in CHILDREN:
+        assert {row.document_id for row in db.query(model)} == {kept}, model.__name__
+    for index in vector_versions:
+        assert index.get(deleted) is None and index.get(kept) is not None
+    db.close()
+    engine.dispose()
@@ -0,0 +1,18 @@
+"""
+Upload validation
+"""
+import asyncio
+import pytest
+from agents.ingestion.service import IngestionService
+from agents.ingestion.resumable import ResumableUploadService
+
+
+@pytest.mark.parametrize("filename, suggested", [("minutes.doc", ".docx"), ("ridership.xls", ".xlsx")])
+def test_legacy_office_formats_are_rejected(db, filename, suggested):
+    with pytest.raises(ValueError, match=f"save the file as {suggested}"):
+        asyncio.run(ResumableUploadService(db).create_session(filename, 1024))
+
+
+def test_supported_extensions_are_accepted():
+    assert IngestionService.extension_error(".docx") is None
+    assert IngestionService.extension_error(".exe") == "File type .exe not allowed"
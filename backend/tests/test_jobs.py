@@ -0,0 +1,65 @@
+"""
+Background jobs
+"""
+import asyncio
+import json
+import pytest
+from database.models import Document, DocumentStatus
+from agents.jobs.queue import SQLiteJobQueue, RedisJobQueue
+from agents.jobs.service import JobService
+
+
+class FastWorkerQueue(SQLiteJobQueue):
+    """
+    Queue whose job finishes before enqueue even returns, like a worker that claims it immediately
+    """
+    
+    def __init__(self, db, path: str):
+        super().__init__(path)
+        self.db = db
+    
+    def enqueue(self, stage: str, document_id: int, max_attempts: int = None) -> dict:
+        job = super().enqueue(stage, document_id, max_attempts)
+        self.db.query(Document).filter(Document.id == document_id).update({Document.status: DocumentStatus.COMPLETED})
+        self.db.commit()
+        return job
+
+
+def test_queued_status_does_not_overwrite_worker_progress(db, make_document, tmp_path):
+    first, second = make_document(["one"]), make_document(["two"])
+    service = JobService(db, FastWorkerQueue(db, str(tmp_path / "jobs.db")))
+    
+    asyncio.run(service.enqueue("pipeline", first.id))
+    asyncio.run(service.enqueue_batch("pipeline", [second.id]))
+    
+    db.expire_all()
+    assert first.status == DocumentStatus.COMPLETED
+    assert second.status == DocumentStatus.COMPLETED
+
+
+@pytest.fixture
+def redis_queue():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # Lua scripting
+    return RedisJobQueue(fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_redis_claim_marks_job_running(redis_queue):
+    job = redis_queue.enqueue("ocr", 7)
+    
+    claimed = redis_queue.claim("ocr", timeout=0)
+    assert claimed["id"] == job["id"]
+    assert claimed["status"] == "running" and claimed["attempts"] == 1
+    assert redis_queue.get(job["id"])["status"] == "running"
+    assert redis_queue.redis.lrange(redis_queue._processing_key("ocr"), 0, -1) == [job["id"]]
+    assert redis_queue.claim("ocr", timeout=0) is None
+
+
+def test_redis_requeue_recovers_unfinished_claims(redis_queue):
+    job = redis_queue.enqueue("ocr", 7)
+    # A worker that died between taking the job off the ready list and marking it running
+    redis_queue.redis.lmove(redis_queue._ready_key("ocr"), redis_queue._processing_key("ocr"), "RIGHT", "LEFT")
+    assert json.loads(redis_queue.redis.get(redis_queue._job_key(job["id"])))["status"] == "queued"
+    
+    assert redis_queue.requeue_stale("ocr") == 1
+    assert redis_queue.claim("ocr", timeout=0)["id"] == job["id"]
@@ -0,0 +1,43 @@
+"""
+Metadata entity extraction
+"""
+import pytest
+from agents.metadata.extractors import extract_entities, normalize_date, normalize_work_order
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5 Mar 2024", "2024-03-05"),
+    ("5th March 2024", "2024-03-05"),
+    ("1st Sept, 2023", "2023-09-01"),
+    ("22nd-Feb-2023", "2023-02-22"),
+    ("3rd october 2021", "2021-10-03"),
+    ("Mar 5, 2024", "2024-03-05"),
+    ("March 5 2024", "2024-03-05"),
+    ("Sept. 1st, 2023", "2023-09-01"),
+    ("June 30 2024", "2024-06-30"),
+    ("05/03/24", "2024-03-05"),
+    ("2024-03-05", "2024-03-05"),
+    ("31st Feb 2024", None)
+])
+def test_normalize_date(value, expected):
+    assert normalize_date(value) == expected
+
+
+def test_ordinal_dates_are_extracted():
+    entities = extract_entities(["Payment due 5th March 2024.", "Inspected on 1st Sept, 2023 and 5 Mar 2024"])
+    assert sorted(entities["dates"]["value"]) == ["2023-09-01", "2024-03-05"]
+
+
+def test_month_first_dates_are_extracted():
+    entities = extract_entities(["Invoice dated Mar 5, 2024", "Delivered March 5 2024, paid June 30 2024"])
+    assert entities["dates"]["value"] == ["2024-03-05", "2024-06-30"]
+
+
+@pytest.mark.parametrize("value", ["WO-2024-193", "WO-2024-0193", "wo/2024/00193", "Work Order No. 2024-193"])
+def test_work_order_serials_lose_zero_padding(value):
+    assert normalize_work_order(value) == "WO-2024-193"
+
+
+def test_zero_padded_work_orders_are_one_value():
+    entities = extract_entities(["Ref WO-2024-193", "Ref WO-2024-0193 and WO/2024/0200"])
+    assert entities["work_orders"]["value"] == ["WO-2024-193", "WO-2024-200"]
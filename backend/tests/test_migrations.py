@@ -0,0 +1,59 @@
+"""
+Alembic migrations
+"""
+import os
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.autogenerate import compare_metadata
+from sqlalchemy import create_engine, text
+from database.connection import Base
+import database.models  # noqa: F401  Registers the tables on Base.metadata
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def migrate(tmp_path):
+    """
+    Run alembic commands against a scratch SQLite database; yields (command, engine)
+    """
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = Config(os.path.join(BACKEND, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    engine = create_engine(url)
+    yield lambda name, revision: getattr(command, name)(config, revision), engine
+    engine.dispose()
+
+
+def test_upgrade_matches_models(migrate):
+    run, engine = migrate
+    run("upgrade", "head")
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+    
+    run("downgrade", "base")
+    run("upgrade", "head")
+
+
+def test_duplicate_metadata_is_removed(migrate):
+    run, engine = migrate
+    run("upgrade", "0001")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO documents (id, filename, original_filename, file_type) VALUES (1, 'a.pdf', 'a.pdf', 'PDF')"
+        ))
+        connection.execute(text(
+            "INSERT INTO document_metadata (id, document_id, key, value, extracted_by, created_at) VALUES "
+            "(1, 1, 'dates', 'old', 'auto', '2024-01-01'), "
+            "(2, 1, 'dates', 'new', 'auto', '2024-02-01'), "
+            "(3, 1, 'amounts', 'edited', 'manual', '2024-01-01'), "
+            "(4, 1, 'amounts', 'newer', 'auto', '2024-03-01')"
+        ))
+    
+    run("upgrade", "head")
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT key, value, is_stale FROM document_metadata ORDER BY key")).all()
+    assert [tuple(row) for row in rows] == [("amounts", "edited", 0), ("dates", "new", 0)]
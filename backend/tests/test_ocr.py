@@ -0,0 +1,116 @@
+"""
+OCR page reprocessing
+"""
+import asyncio
+import pytest
+from database.models import Document, DocumentType, DocumentStatus, OCRResult
+from agents.ocr.service import OCRService
+from common.cache import stage_cache
+
+
+@pytest.fixture
+def make_scan(db):
+    """
+    Factory for a processed PDF or image document with the given (text, confidence) pages
+    """
+    def make(file_type: DocumentType, pages: list) -> Document:
+        filename = "scan.pdf" if file_type == DocumentType.PDF else "scan.png"
+        document = Document(
+            filename=filename,
+            original_filename=filename,
+            file_type=file_type,
+            file_size=0,
+            status=DocumentStatus.COMPLETED,
+            storage_path=filename,
+            checksum="scan"
+        )
+        db.add(document)
+        db.commit()
+        db.add_all([
+            OCRResult(document_id=document.id, page_number=number, extracted_text=text, confidence_score=confidence)
+            for number, (text, confidence) in enumerate(pages, start=1)
+        ])
+        db.commit()
+        return document
+    return make
+
+
+@pytest.fixture
+def reocr(monkeypatch):
+    """
+    Stand-in for the OCR task; records the (pages, profile, language) of each call
+    """
+    calls = []
+    
+    def ocr_pages_task(engine_name, file_path, file_type, page_numbers, profile=None, language=None):
+        calls.append((page_numbers, profile, language))
+        return [
+            {"page_number": number, "text": "Tax invoice", "confidence": 90, "processing_time": 0, "method": "ocr"}
+            for number in page_numbers
+        ]
+    
+    monkeypatch.setattr("agents.ocr.service.ocr_pages_task", ocr_pages_task)
+    return calls
+
+
+def test_reprocess_pages_with_overrides(db, ocr_engine, make_scan, reocr):
+    document = make_scan(DocumentType.IMAGE, [("Tax lnvoice", 40)])
+    result = asyncio.run(OCRService(db).reprocess_pages(
+        document.id,
+        below_confidence=70,
+        overrides={"target_dpi": 400, "binarize": False},
+        language="eng+mal"
+    ))
+    
+    _, profile, language = reocr[0]
+    assert profile["target_dpi"] == 400 and profile["binarize"] is False and profile["deskew"] is True
+    assert language == "eng+mal"
+    assert result["pages"] == [{"page": 1, "previous_confidence": 40, "confidence": 90}]
+    assert OCRService(db).load_text(document.id) == "Tax invoice"
+
+
+def test_reprocessed_pages_replace_cached_pages(db, ocr_engine, make_scan, reocr):
+    document = make_scan(DocumentType.IMAGE, [("Tax lnvoice", 40)])
+    service = OCRService(db)
+    stage_cache.put(document.checksum, "ocr", service.engine_version, {"pages": [
+        {"page_number": 1, "text": "Tax lnvoice", "confidence": 40, "processing_time": 0, "method": "ocr"}
+    ]})
+    asyncio.run(service.reprocess_pages(document.id, pages=[1]))
+    
+    result = service.run_ocr(document)
+    db.commit()
+    assert result["cached"] and result["text"] == "Tax invoice"
+    assert service.load_text(document.id) == "Tax invoice"
+
+
+def test_text_layer_pages_are_not_reprocessed(db, ocr_engine, make_scan, reocr, monkeypatch):
+    document = make_scan(DocumentType.PDF, [("Purchase order " * 10, 100), ("Purchase 0rder", 45)])
+    monkeypatch.setattr("agents.ocr.service.extract_text_pages", lambda path: [
+        {"page_number": 1, "text": "Purchase order " * 10, "confidence": 100, "processing_time": 0},
+        {"page_number": 2, "text": "", "confidence": 100, "processing_time": 0}
+    ])
+    service = OCRService(db)
+    
+    with pytest.raises(ValueError, match="text layer"):
+        asyncio.run(service.reprocess_pages(document.id, pages=[1, 2]))
+    assert reocr == []
+    result = asyncio.run(service.reprocess_pages(document.id, below_confidence=100))
+    assert [page["page"] for page in result["pages"]] == [2]
+    assert [pages for pages, _, _ in reocr] == [[2]]
+
+
+def test_documents_without_ocr_are_rejected(db, ocr_engine, make_document, reocr):
+    document = make_document(["Tax invoice"], "invoice.docx")
+    with pytest.raises(ValueError, match="text layer"):
+        asyncio.run(OCRService(db).reprocess_pages(document.id, pages=[1]))
+    assert reocr == []
+
+
+@pytest.mark.parametrize("overrides, language", [
+    ({"dpi": 400}, None),
+    (None, "eng; rm -rf")
+])
+def test_reprocess_pages_rejects_invalid_settings(db, ocr_engine, make_scan, overrides, language):
+    document = make_scan(DocumentType.IMAGE, [("Tax lnvoice", 40)])
+    with pytest.raises(ValueError):
+        asyncio.run(OCRService(db).reprocess_pages(document.id, pages=[1], overrides=overrides, language=language))
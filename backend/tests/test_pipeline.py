@@ -0,0 +1,38 @@
+"""
+Pipeline re-runs
+"""
+import asyncio
+from database.models import OCRResult, DocumentClassification, DocumentMetadata
+from agents.pipeline.service import PipelineService
+from agents.ocr.service import OCRService
+
+
+def test_rerun_replaces_results(db, ocr_engine, make_document):
+    document = make_document([
+        "Tax invoice INV-1042\nAmount due 12,500 by 5 Mar 2024",
+        "Payment terms: 30 days"
+    ], "invoice.docx")
+    service = PipelineService(db)
+    
+    first = asyncio.run(service.run(document.id))
+    assert first["status"] == "completed"
+    pages = db.query(OCRResult).filter(OCRResult.document_id == document.id).count()
+    metadata = db.query(DocumentMetadata).filter(DocumentMetadata.document_id == document.id).count()
+    text = OCRService(db).load_text(document.id)
+    
+    second = asyncio.run(service.run(document.id))
+    assert second["status"] == "completed"
+    assert pages == 2
+    assert db.query(OCRResult).filter(OCRResult.document_id == document.id).count() == pages
+    assert db.query(DocumentClassification).filter(DocumentClassification.document_id == document.id).count() == 1
+    assert db.query(DocumentMetadata).filter(DocumentMetadata.document_id == document.id).count() == metadata
+    assert OCRService(db).load_text(document.id) == text
+
+
+def test_document_without_text_completes(db, ocr_engine, make_document):
+    document = make_document([""], "blank.docx")
+    
+    result = asyncio.run(PipelineService(db).run(document.id))
+    assert result["status"] == "completed"
+    assert result["ocr"]["pages"] == 1
+    assert OCRService(db).load_text(document.id) == ""
@@ -0,0 +1,55 @@
+"""
+Resumable uploads
+"""
+import asyncio
+import pytest
+from agents.ingestion.resumable import ResumableUploadService, UploadInProgress
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_offset_is_moved_back_to_data_on_disk(db):
+    service = ResumableUploadService(db)
+    state = asyncio.run(service.create_session("scan.pdf", 100))
+    upload_id = state["upload_id"]
+    asyncio.run(service.append_chunk(upload_id, 0, chunks(b"%PDF-1.4 ", b"x" * 11)))
+    
+    # A crash after the offset was saved but before the data reached the disk
+    state = service.store.load(upload_id)
+    state["offset"] = 60
+    service.store.save(state)
+    
+    assert asyncio.run(service.get_session(upload_id))["offset"] == 20
+    state = asyncio.run(service.append_chunk(upload_id, 20, chunks(b"y" * 80)))
+    assert state["offset"] == 100
+    with open(service.store.data_path(upload_id), "rb") as f:
+        assert f.read() == b"%PDF-1.4 " + b"x" * 11 + b"y" * 80
+
+
+def test_concurrent_append_is_rejected(db):
+    service = ResumableUploadService(db)
+    upload_id = asyncio.run(service.create_session("scan.pdf", 100))["upload_id"]
+    
+    async def append_both():
+        release = asyncio.Event()
+        
+        async def slow():
+            yield b"a" * 10
+            await release.wait()
+            yield b"b" * 10
+        
+        first = asyncio.create_task(service.append_chunk(upload_id, 0, slow()))
+        await asyncio.sleep(0.1)
+        try:
+            with pytest.raises(UploadInProgress):
+                await service.append_chunk(upload_id, 0, chunks(b"c" * 10))
+        finally:
+            release.set()
+        return await first
+    
+    assert asyncio.run(append_both())["offset"] == 20
+    with open(service.store.data_path(upload_id), "rb") as f:
+        assert f.read() == b"a" * 10 + b"b" * 10
@@ -0,0 +1,102 @@
+"""
+Search backend conformance: every backend follows the SearchBackend contract on a small corpus.
+PostgreSQL runs too when TEST_POSTGRES_URL points at a scratch database.
+"""
+import os
+import pytest
+from agents.search.backends import InvertedIndexBackend, SQLiteSearchBackend, PostgresSearchBackend
+
+CORPUS = [
+    (1, "Brake pad replacement for train set TS-07. Brake pads worn, brake discs inspected."),
+    (2, "Invoice for depot cleaning services, March 2024"),
+    (3, "Brake inspection report for TS-03"),
+    (4, "Signalling maintenance schedule and safety circular"),
+    (5, "Safety circular: brake testing procedure before revenue service")
+]
+
+
+def ids(hits) -> list:
+    return [document_id for document_id, _ in hits]
+
+
+@pytest.fixture(params=["inverted", "sqlite", "postgres"])
+def backend(request, tmp_path):
+    """
+    A fresh backend of each kind holding the corpus
+    """
+    if request.param == "inverted":
+        backend = InvertedIndexBackend(str(tmp_path / "inverted"))
+    elif request.param == "sqlite":
+        backend = SQLiteSearchBackend(str(tmp_path / "search.db"))
+    else:
+        url = os.environ.get("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+        from sqlalchemy import create_engine
+        backend = PostgresSearchBackend(create_engine(url), table_name="search_documents_test")
+        backend.table.create(backend.engine, checkfirst=True)
+    backend.clear()
+    backend.index_documents(CORPUS)
+    yield backend
+    if request.param == "postgres":
+        backend.table.drop(backend.engine, checkfirst=True)
+        backend.engine.dispose()
+
+
+def test_indexes_every_document(backend):
+    assert backend.stats()["documents"] == len(CORPUS)
+
+
+def test_ranking(backend):
+    hits, total = backend.search("brake", 10)
+    assert sorted(ids(hits)) == [1, 3, 5]
+    assert total == 3
+    assert ids(hits)[0] == 1
+    assert all(a[1] >= b[1] for a, b in zip(hits, hits[1:]))
+
+
+def test_top_k_limits_results_but_not_total(backend):
+    hits, total = backend.search("brake", 2)
+    assert len(hits) == 2 and total == 3
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("brakes", [1, 3, 5]),
+    ("safety invoice", [2, 4, 5])
+])
+def test_query_terms(backend, query, expected):
+    assert sorted(ids(backend.search(query, 10)[0])) == expected
+
+
+def test_query_without_terms_matches_nothing(backend):
+    assert backend.search("the and of", 10) == ([], 0)
+
+
+def test_punctuation_is_not_query_syntax(backend):
+    assert backend.search('brake" OR NOT (x', 10)[1] == 3
+
+
+def test_reindexing_replaces_a_document(backend):
+    backend.index_documents([(3, "Bogie inspection report for TS-03")])
+    hits, total = backend.search("brake", 10)
+    assert 3 not in ids(hits) and total == 2
+    assert ids(backend.search("bogie", 10)[0]) == [3]
+
+
+def test_deleted_documents_are_not_returned(backend):
+    backend.delete_documents([1, 3])
+    hits, total = backend.search("brake", 10)
+    assert ids(hits) == [5] and total == 1
+
+
+def test_optimize_keeps_live_documents(backend):
+    backend.delete_documents([1])
+    backend.optimize()
+    assert backend.stats()["documents"] == len(CORPUS) - 1
+    assert backend.search("report", 10)[1] == 1
+
+
+def test_clear_removes_everything(backend):
+    backend.clear()
+    assert backend.search("report", 10) == ([], 0)
+    assert backend.stats()["documents"] == 0
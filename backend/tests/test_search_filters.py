@@ -0,0 +1,28 @@
+"""
+Search filters
+"""
+import asyncio
+from database.models import DocumentClassification
+from agents.search.service import SearchService
+
+
+def categories_matching(db, category: str) -> list:
+    result = asyncio.run(SearchService(db).advanced_search(category=category))
+    return sorted(document["id"] for document in result["documents"])
+
+
+def test_category_filter_uses_latest_classification(db, make_document):
+    reclassified = make_document(["Purchase order"], "order.docx")
+    unchanged = make_document(["Tax invoice"], "invoice.docx")
+    db.add_all([
+        DocumentClassification(document_id=reclassified.id, category="invoice", model_version="keywords-kmrl-1"),
+        DocumentClassification(document_id=unchanged.id, category="invoice", model_version="keywords-kmrl-1")
+    ])
+    db.commit()
+    assert categories_matching(db, "invoice") == [reclassified.id, unchanged.id]
+    
+    # A backfill with a new model adds a row and keeps the earlier one as history
+    db.add(DocumentClassification(document_id=reclassified.id, category="contract", model_version="tfidf-2"))
+    db.commit()
+    assert categories_matching(db, "invoice") == [unchanged.id]
+    assert categories_matching(db, "contract") == [reclassified.id]
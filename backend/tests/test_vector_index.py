@@ -0,0 +1,21 @@
+"""
+Vector index files
+"""
+import numpy as np
+from agents.search.vector_index import VectorIndex
+
+
+def test_upsert_after_interrupted_append(tmp_path):
+    index = VectorIndex(str(tmp_path), train_min_rows=1000)
+    index.upsert([1], np.array([[1.0, 0.0, 0.0]]))
+    
+    # A writer that died after appending its vector but before its list number and id
+    generation = index.refresh().meta["generation"]
+    with open(index._file("vectors", generation), "ab") as f:
+        f.write(np.array([0.0, 0.0, 1.0], dtype=np.float32).tobytes())
+    
+    index.upsert([2], np.array([[0.0, 1.0, 0.0]]))
+    assert index.stats()["rows"] == 2
+    assert index.get(1).tolist() == [1.0, 0.0, 0.0]
+    assert index.get(2).tolist() == [0.0, 1.0, 0.0]
+    assert [document_id for document_id, _ in index.search(np.array([0.0, 1.0, 0.0]), k=1)] == [2]
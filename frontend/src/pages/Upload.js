@@ -48,7 +48,7 @@ function Upload() {
             type="file"
             id="file"
             onChange={handleFileChange}
-            accept=".pdf,.jpg,.jpeg,.png,.tiff,.doc,.docx,.xls,.xlsx"
+            accept=".pdf,.jpg,.jpeg,.png,.tiff,.docx,.xlsx"
             disabled={uploading}
           />
         </div>
@@ -63,8 +63,8 @@ function Upload() {
         <ul>
           <li>PDF (.pdf)</li>
           <li>Images (.jpg, .jpeg, .png, .tiff)</li>
-          <li>Word Documents (.doc, .docx)</li>
-          <li>Excel Spreadsheets (.xls, .xlsx)</li>
+          <li>Word Documents (.docx)</li>
+          <li>Excel Spreadsheets (.xlsx)</li>
         </ul>
         <p>Maximum file size: 50MB</p>
       </div>
@@ -11,8 +11,10 @@ const api = axios.create({
 
 // Document Service
 export const documentService = {
-  getDocuments: async (skip = 0, limit = 100) => {
-    const response = await api.get(`/documents?skip=${skip}&limit=${limit}`);
+  getDocuments: async (cursor = null, limit = 100) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    const response = await api.get('/documents', { params });
     return response.data;
   },
 
@@ -129,8 +131,10 @@ export const metadataService = {
 
 // Search Service
 export const searchService = {
-  search: async (query, skip = 0, limit = 20) => {
-    const response = await api.get(`/search?query=${encodeURIComponent(query)}&skip=${skip}&limit=${limit}`);
+  search: async (query, cursor = null, limit = 20) => {
+    const params = { query, limit };
+    if (cursor) params.cursor = cursor;
+    const response = await api.get('/search', { params });
     return response.data;
   },
 